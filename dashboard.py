@@ -1,40 +1,148 @@
 import json
-import logging
 import os
 from typing import TextIO
 
-import matplotlib.pyplot as plt
-import pandas as pd
+import numpy as np
 import streamlit as st
 
+from scripts.storage.columnar import META_FILE, ColumnStore
+from scripts.storage.journal import JournalReader
+from scripts.uilities.charting import CHART_POINTS, downsample, drawdown, file_signature, trade_markers
+from scripts.uilities.log_config import ensure_logging
+from scripts.uilities.log_tail import LEVELS, LogTailer
+from scripts.uilities.metrics import METRICS_PORT, fetch_metrics
+
 # ============================ Configuration ============================
 
 CONFIG_FILE = 'config.json'
 TRADE_LOG_FILE = 'trade_log.csv'
 PORTFOLIO_FILE = 'portfolio_values.csv'
 LOG_FILE = 'bot.log'
+TRADE_STORE_DIR = 'history/trades'
+PORTFOLIO_STORE_DIR = 'history/portfolio'
+DEFAULT_HISTORY_ROWS = 5000
+LOG_BUFFER_LINES = 2000
+LOG_DISPLAY_LINES = 500
 
-# Setup logging
-logging.basicConfig(filename='dashboard.log', level=logging.INFO,
-                    format='%(asctime)s %(levelname)s %(message)s')
+# Setup logging once per server process; Streamlit re-executes this script on every rerun
+ensure_logging('dashboard.log')
 
 # ============================ Helper Functions ============================
 
-def load_data():
-    if os.path.exists(TRADE_LOG_FILE):
-        trade_df = pd.read_csv(TRADE_LOG_FILE)
-    else:
-        trade_df = pd.DataFrame()
-    if os.path.exists(PORTFOLIO_FILE):
-        portfolio_df = pd.read_csv(PORTFOLIO_FILE, parse_dates=['timestamp'])
+def load_store(store_dir, journal_file):
+    """Opens a column store and ingests journal records written since the last rerun."""
+    store = ColumnStore(store_dir)
+    store.sync_from_journal(JournalReader(journal_file))
+    return store
+
+def read_store(store, start=None, end=None, last_n=None):
+    if start is not None or end is not None:
+        columns = store.window(start, end)
+        if last_n:
+            columns = {name: values[-last_n:] for name, values in columns.items()}
+    elif last_n:
+        columns = store.last(last_n)
     else:
-        portfolio_df = pd.DataFrame()
+        columns = store.columns()
+    return ColumnStore.to_frame(columns)
+
+@st.cache_resource
+def get_log_tailer():
+    """One tailer per server process, so its offset and line buffer survive reruns."""
+    return LogTailer(LOG_FILE, max_lines=LOG_BUFFER_LINES)
+
+def load_data(start=None, end=None, last_n=None, log_level=None, log_filter=None):
+    """Loads trades in [start, end), optionally only the last N rows, and syncs the portfolio store.
+
+    The portfolio chart reads its store through portfolio_chart_data(), not here.
+    """
+    trade_df = read_store(load_store(TRADE_STORE_DIR, TRADE_LOG_FILE), start, end, last_n)
+    load_store(PORTFOLIO_STORE_DIR, PORTFOLIO_FILE)
     if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, 'r') as file:
-            logs = file.read()
+        tailer = get_log_tailer()
+        tailer.poll()
+        logs = tailer.text(log_level, log_filter, limit=LOG_DISPLAY_LINES)
     else:
         logs = "No logs available."
-    return trade_df, portfolio_df, logs
+    return trade_df, logs
+
+# ============================ Charts ============================
+
+def store_signature(store_dir):
+    """Cache key for a store: meta.json is rewritten on every append."""
+    return file_signature(os.path.join(store_dir, META_FILE))
+
+def store_time_range(store_dir):
+    """(first, last) timestamp in a store, or None when it is empty."""
+    store = ColumnStore(store_dir)
+    if not len(store) or 'timestamp' not in store.schema:
+        return None
+    times = store.columns(names=['timestamp'])['timestamp']
+    return times[0].astype('M8[s]').item(), times[-1].astype('M8[s]').item()
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def portfolio_chart_data(signature, start=None, end=None, points=CHART_POINTS):
+    """Value and drawdown series for [start, end), downsampled to `points`.
+
+    Only the rows in the window are read from the memory-mapped store, and
+    results are cached per (store signature, window), so a rerun without
+    new snapshots does no work at all.
+    """
+    store = ColumnStore(PORTFOLIO_STORE_DIR)
+    if 'Portfolio_Value' not in store.schema:
+        return None
+    columns = store.window(start, end, names=['timestamp', 'Portfolio_Value'])
+    times = np.asarray(columns['timestamp'])
+    values = np.asarray(columns['Portfolio_Value'], dtype=np.float64)
+    if not len(values):
+        return None
+    losses = drawdown(values)
+    return {
+        "rows": len(values),
+        "value": downsample(times, values, points),
+        # min/max buckets, so the deepest drawdowns are never averaged away
+        "drawdown": downsample(times, losses, points, method='minmax'),
+        "max_drawdown": float(np.nanmin(losses)),
+    }
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def trade_marker_data(signature, start=None, end=None):
+    """(times, sides) of the fills executed in [start, end).
+
+    log_trade stamps each fill's 'timestamp' with its execution time, in
+    local time like the portfolio snapshots, so the window is a lookup on
+    the store's index and the markers line up with the value chart.
+    """
+    store = ColumnStore(TRADE_STORE_DIR)
+    side_column = next((c for c in ('type', 'side') if c in store.schema), None)
+    if side_column is None or 'timestamp' not in store.schema:
+        return np.array([], dtype='M8[ns]'), np.array([])
+    columns = store.window(start, end, names=['timestamp', side_column])
+    sides = np.char.lower(np.asarray(columns[side_column]).astype(str))
+    return np.asarray(columns['timestamp']), sides
+
+def render_portfolio_chart(chart, markers):
+    """Value with buy/sell markers above drawdown, from the downsampled series only."""
+    import matplotlib.pyplot as plt
+
+    fig, (ax, dd_ax) = plt.subplots(2, 1, figsize=(14, 7), sharex=True,
+                                    gridspec_kw={'height_ratios': [3, 1]})
+    times, values = chart['value']
+    ax.plot(times, values, label='Portfolio Value', color='green', linewidth=1)
+    for side, color, shape in (('buy', 'tab:blue', '^'), ('sell', 'tab:red', 'v')):
+        if side in markers:
+            ax.scatter(*markers[side], color=color, marker=shape, s=24, label=side.title(), zorder=3)
+    ax.set_ylabel('Portfolio Value (USD)')
+    ax.set_title('Portfolio Value Over Time')
+    ax.legend()
+    ax.grid(True)
+    dd_times, losses = chart['drawdown']
+    dd_ax.fill_between(dd_times, losses * 100, 0, color='tab:red', alpha=0.3, step='post')
+    dd_ax.set_ylabel('Drawdown (%)')
+    dd_ax.set_xlabel('Date')
+    dd_ax.grid(True)
+    st.pyplot(fig)
+    plt.close(fig)  # Streamlit has rendered it; don't keep a figure per rerun
 
 def save_config(config):
     """Saves configuration to the config.json file."""
@@ -57,6 +165,28 @@ def load_config():
         }
     return config
 
+@st.cache_data(ttl=5, show_spinner=False)
+def bot_metrics(port):
+    """The running bot's /metrics.json, refetched at most every 5 seconds."""
+    return fetch_metrics(port)
+
+def tick_to_order_latency(snapshot):
+    """{source: latency summary} from a /metrics.json snapshot."""
+    prefix = 'tick_to_order_seconds{source="'
+    return {key[len(prefix):-2]: summary for key, summary in (snapshot or {}).get('latency', {}).items()
+            if key.startswith(prefix)}
+
+def render_latency(snapshot):
+    latency = tick_to_order_latency(snapshot)
+    st.markdown("**Tick-to-order**")
+    if not latency:
+        st.caption("No orders traced yet." if snapshot else "Bot metrics endpoint not reachable.")
+        return
+    for source, summary in sorted(latency.items()):
+        st.metric(f"p50 ({source})", f"{summary['p50_ms']:.1f} ms")
+        st.metric(f"p99 ({source})", f"{summary['p99_ms']:.1f} ms")
+        st.caption(f"{summary['count']:,} orders")
+
 # ============================ Streamlit Dashboard ============================
 
 def main():
@@ -107,9 +237,19 @@ def main():
         save_config(config)
         st.sidebar.success("Configuration updated successfully.")
 
+    # History window
+    st.sidebar.subheader("Display Settings")
+    history_rows = st.sidebar.number_input("Rows of history to load",
+                                           min_value=100, max_value=1_000_000,
+                                           value=DEFAULT_HISTORY_ROWS, step=100)
+    log_level = st.sidebar.selectbox("Minimum log level", list(LEVELS), index=1)
+    log_filter = st.sidebar.text_input("Log filter", value="")
+
     # Display Trade Log
     st.subheader("Trade Log")
-    trade_df, portfolio_df, logs = load_data()
+    trade_df, logs = load_data(last_n=int(history_rows),
+                               log_level=log_level,
+                               log_filter=log_filter or None)
     if not trade_df.empty:
         st.dataframe(trade_df)
     else:
@@ -117,18 +257,29 @@ def main():
 
     # Display Portfolio Performance
     st.subheader("Portfolio Performance Over Time")
-    if not portfolio_df.empty:
-        fig, ax = plt.subplots(figsize=(14, 7))
-        ax.plot(portfolio_df['timestamp'], portfolio_df['Portfolio_Value'],
-                label='Portfolio Value', color='green')
-        ax.set_xlabel('Date')
-        ax.set_ylabel('Portfolio Value (USD)')
-        ax.set_title('Portfolio Value Over Time')
-        ax.legend()
-        ax.grid(True)
-        st.pyplot(fig)
-    else:
-        st.write("No portfolio data to display.")
+    time_range = store_time_range(PORTFOLIO_STORE_DIR)
+    chart = None
+    if time_range:
+        first, last = time_range
+        start, end = first, last
+        if first < last:
+            start, end = st.slider("Chart window", min_value=first, max_value=last, value=(first, last),
+                                   format="YYYY-MM-DD HH:mm")
+        # end is inclusive on the slider; the store window is half-open
+        end = np.datetime64(end, 'ns') + np.timedelta64(1, 's')
+        chart = portfolio_chart_data(store_signature(PORTFOLIO_STORE_DIR), start, end)
+    chart_column, latency_column = st.columns([5, 1])
+    with chart_column:
+        if chart:
+            trade_times, sides = trade_marker_data(store_signature(TRADE_STORE_DIR), start, end)
+            markers = trade_markers(trade_times, sides, *chart['value'])
+            render_portfolio_chart(chart, markers)
+            st.caption(f"{chart['rows']:,} snapshots in window, {len(chart['value'][0]):,} plotted; "
+                       f"max drawdown {chart['max_drawdown']:.2%}; {len(trade_times):,} trades.")
+        else:
+            st.write("No portfolio data to display.")
+    with latency_column:
+        render_latency(bot_metrics(config.get('metrics_port', METRICS_PORT)))
 
     # Display Logs
     st.subheader("Trading Bot Logs")
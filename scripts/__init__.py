@@ -1,22 +1,40 @@
-# Import all necessary modules and functions for the package
-import logging
-
-# For self-upgrader functionality
-from scripts.uilities.xrp_self_upgrader import SelfUpgrader
-# For trading bot functionality
-# For fallback web knowledge trader functionality
-from scripts.uilities.xrp_web_knowledge_trader import WebKnowledgeTrader
-# For machine learning model
-from .xrp_ml_model import MLModel
-
-# Initialize logging for the package
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    filename="../logs/trading_bot.log",
-    filemode="a",
-)
+# Package entry points, resolved on first attribute access (PEP 562) so that
+# `import scripts.<anything>` does not pull in requests, numpy or torch.
+import importlib
+
+_LAZY_ATTRIBUTES = {
+    # For self-upgrader functionality
+    "SelfUpgrader": "scripts.uilities.xrp_self_upgrader",
+    # For trading bot functionality
+    "MLModel": "scripts.xrp_ml_model",
+    # For fallback web knowledge trader functionality
+    "WebKnowledgeTrader": "scripts.uilities.xrp_web_knowledge_trader",
+}
+
+__all__ = ["SelfUpgrader", "MLModel", "WebKnowledgeTrader", "utilities"]
+
+# Logging is configured by the entry point (bot or dashboard), not on import,
+# so that importing a helper module does not hijack its log file.
+
+
+def __getattr__(name):
+    """Imports `scripts.X.Y` for attribute X.Y and the entry points above on first use."""
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    else:
+        try:
+            value = importlib.import_module(f"{__name__}.{name}")
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
 
 
 def utilities():
-    return None
\ No newline at end of file
+    return None
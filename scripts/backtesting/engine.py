@@ -0,0 +1,265 @@
+"""Offline backtester for the bots' trading rules.
+
+    python -m scripts.backtesting.engine [--strategy threshold|interval] [--data PATH]
+"""
+import argparse
+import json
+import logging
+import os
+
+import numpy as np
+
+# ============================ Configuration ============================
+
+HISTORICAL_DATA_FILE = os.path.join('data', 'historical_data.csv')
+CONFIG_FILE = 'config.json'
+# config.json section the sweep writes tuned thresholds to, {pair: {buy_threshold, sell_threshold}};
+# SHIBSnipingBot reads it, and no runner is chosen by it
+TUNED_KEY = 'tuned'
+
+INITIAL_EQUITY = 1000.0
+FEE_RATE = 0.0026        # Kraken taker fee
+SLIPPAGE = 0.0005        # 5 bps against us on every fill
+EXIT_SCAN_WINDOW = 256   # bars checked per step when searching for a stop/target hit
+
+DEFAULT_SETTINGS = {
+    "stop_loss": 0.95,
+    "take_profit": 1.05,
+    "risk_per_trade": 0.01,
+}
+
+# ============================ Data Loading ============================
+
+def load_bars(path=HISTORICAL_DATA_FILE):
+    """Loads OHLCV bars (or ticks) into contiguous float64 arrays.
+
+    Accepts `timestamp,open,high,low,close,volume` bars or `timestamp,price[,volume]`
+    ticks. Timestamps may be Unix seconds or date strings; they are returned
+    as int64 nanoseconds.
+    """
+    import pandas as pd
+
+    try:
+        df = pd.read_csv(path)
+    except pd.errors.EmptyDataError:   # a zero-byte file, as shipped
+        df = pd.DataFrame()
+    if df.empty:
+        raise ValueError(f"No historical data in {path}; fetch some with "
+                         f"`python -m scripts.storage.backfill --csv {path}`")
+    df.columns = [c.strip().lower() for c in df.columns]
+    time_col = next(c for c in ('timestamp', 'time', 'date') if c in df.columns)
+    if pd.api.types.is_numeric_dtype(df[time_col]):
+        timestamps = (df[time_col].to_numpy(dtype=np.float64) * 1e9).astype(np.int64)
+    else:
+        timestamps = pd.to_datetime(df[time_col]).to_numpy(dtype='datetime64[ns]').view(np.int64)
+    if 'close' not in df.columns:
+        for column in ('open', 'high', 'low', 'close'):
+            df[column] = df['price']
+    bars = {'timestamp': np.ascontiguousarray(timestamps)}
+    for column in ('open', 'high', 'low', 'close'):
+        bars[column] = np.ascontiguousarray(df[column].to_numpy(dtype=np.float64))
+    bars['volume'] = np.ascontiguousarray(
+        df['volume'].to_numpy(dtype=np.float64) if 'volume' in df.columns
+        else np.zeros(len(df)))
+    order = np.argsort(bars['timestamp'], kind='stable')
+    if np.any(order != np.arange(len(order))):
+        bars = {name: values[order] for name, values in bars.items()}
+    return bars
+
+def load_settings(path=CONFIG_FILE):
+    """Risk settings from config.json, with the bot's defaults for missing keys."""
+    settings = dict(DEFAULT_SETTINGS)
+    if os.path.exists(path):
+        with open(path, 'r') as file:
+            config = json.load(file)
+        settings.update({k: config[k] for k in DEFAULT_SETTINGS if k in config})
+    return settings
+
+def load_thresholds(pair, path=CONFIG_FILE):
+    """Swept (buy_threshold, sell_threshold) for a pair from config.json; None where unset."""
+    tuned = {}
+    if os.path.exists(path):
+        with open(path, 'r') as file:
+            tuned = (json.load(file).get(TUNED_KEY) or {}).get(pair) or {}
+    return tuned.get('buy_threshold'), tuned.get('sell_threshold')
+
+# ============================ Strategies ============================
+
+def threshold_signals(bars, buy_threshold=None, sell_threshold=None):
+    """SHIBSnipingBot.trade_decision's rule, evaluated on every bar close at once."""
+    from scripts.xrp_ml_model import BUY_THRESHOLD, SELL_THRESHOLD, price_signal
+
+    buy_threshold = BUY_THRESHOLD if buy_threshold is None else buy_threshold
+    sell_threshold = SELL_THRESHOLD if sell_threshold is None else sell_threshold
+    return price_signal(bars['close'], buy_threshold, sell_threshold).astype(np.int8)
+
+def interval_signals(bars, interval=None):
+    """smart_trading_bot.trading_strategy: the strategy_order() action once per interval."""
+    from scripts.training.models.smart_trading_bot import STRATEGY_INTERVAL, strategy_order
+
+    interval = interval or STRATEGY_INTERVAL
+    order = strategy_order({'live_trading': True})
+    side = 1 if order['type'] == 'buy' else -1
+    buckets = bars['timestamp'] // int(interval * 1e9)
+    first_in_bucket = np.empty(len(buckets), dtype=bool)
+    first_in_bucket[:1] = True
+    first_in_bucket[1:] = buckets[1:] != buckets[:-1]
+    return np.where(first_in_bucket, side, 0).astype(np.int8)
+
+STRATEGIES = {
+    'threshold': threshold_signals,
+    'interval': interval_signals,
+}
+
+# ============================ Simulation ============================
+
+def _find_exit(start, limit, stop_price, target_price, low, high):
+    """First bar in [start, limit) that touches the stop or the target, or None.
+
+    Scans in geometrically growing windows, so the cost follows the holding
+    period rather than the length of the history.
+    """
+    window = EXIT_SCAN_WINDOW
+    while start < limit:
+        stop = min(limit, start + window)
+        hits = np.flatnonzero((low[start:stop] <= stop_price) | (high[start:stop] >= target_price))
+        if hits.size:
+            return start + int(hits[0])
+        start = stop
+        window *= 2
+    return None
+
+def simulate(bars, signals, stop_loss=0.95, take_profit=1.05, risk_per_trade=0.01,
+             fee_rate=FEE_RATE, slippage=SLIPPAGE, initial_equity=INITIAL_EQUITY):
+    """Replays long-only trades for a signal array (1 buy, -1 sell, 0 hold).
+
+    A buy signal opens a position at that bar's close when flat, sized so
+    that hitting the stop loses `risk_per_trade` of equity. It is closed at
+    the stop (stop_loss * entry) or target (take_profit * entry) on the first
+    later bar whose range touches either, or at the close of the next sell
+    signal, whichever comes first. If a bar touches both, the stop is assumed.
+    Returns (trades, equity) where equity is marked to market on every bar.
+    """
+    opens, highs, lows, closes = bars['open'], bars['high'], bars['low'], bars['close']
+    n = len(closes)
+    buy_idx = np.flatnonzero(signals > 0)
+    sell_idx = np.flatnonzero(signals < 0)
+    stop_distance = 1.0 - stop_loss
+
+    cash = initial_equity
+    cash_delta = np.zeros(n)
+    position = np.zeros(n)
+    trades = []
+    cursor = 0
+    while True:
+        k = np.searchsorted(buy_idx, cursor)
+        if k >= len(buy_idx) or buy_idx[k] >= n - 1:
+            break
+        i = int(buy_idx[k])
+        entry = closes[i] * (1 + slippage)
+        notional = cash * risk_per_trade / stop_distance if stop_distance > 0 else cash * risk_per_trade
+        notional = min(notional, cash / (1 + fee_rate))
+        if notional <= 0:
+            break
+        qty = notional / entry
+        entry_fee = notional * fee_rate
+
+        s = np.searchsorted(sell_idx, i, side='right')
+        limit = int(sell_idx[s]) if s < len(sell_idx) else n
+        stop_price, target_price = entry * stop_loss, entry * take_profit
+        j = _find_exit(i + 1, limit, stop_price, target_price, lows, highs)
+        if j is not None:
+            if lows[j] <= stop_price:
+                reason, exit_price = 'stop_loss', min(opens[j], stop_price)
+            else:
+                reason, exit_price = 'take_profit', max(opens[j], target_price)
+        elif limit < n:
+            j, reason, exit_price = limit, 'signal', closes[limit]
+        else:
+            j, reason, exit_price = n - 1, 'end', closes[n - 1]
+        exit_price *= (1 - slippage)
+        proceeds = qty * exit_price
+        exit_fee = proceeds * fee_rate
+
+        pnl = proceeds - exit_fee - notional - entry_fee
+        cash += pnl
+        cash_delta[i] -= notional + entry_fee
+        cash_delta[j] += proceeds - exit_fee
+        position[i:j] = qty
+        trades.append({
+            "entry_index": i, "exit_index": j,
+            "entry_time": int(bars['timestamp'][i]), "exit_time": int(bars['timestamp'][j]),
+            "entry_price": entry, "exit_price": exit_price, "volume": qty,
+            "fees": entry_fee + exit_fee, "pnl": pnl, "reason": reason,
+        })
+        cursor = j + 1
+
+    equity = initial_equity + np.cumsum(cash_delta) + position * closes
+    return trades, equity
+
+# ============================ Reporting ============================
+
+def summarize(trades, equity, timestamps, initial_equity=INITIAL_EQUITY):
+    """PnL, drawdown and trade statistics for one run."""
+    pnls = np.array([t['pnl'] for t in trades])
+    wins, losses = pnls[pnls > 0], pnls[pnls <= 0]
+    peak = np.maximum.accumulate(equity)
+    drawdown = equity / peak - 1.0
+    returns = np.diff(equity) / equity[:-1] if len(equity) > 1 else np.zeros(0)
+    sharpe = 0.0
+    if len(timestamps) > 1 and returns.std() > 0:
+        bar_seconds = np.median(np.diff(timestamps)) / 1e9
+        bars_per_year = 365 * 24 * 3600 / bar_seconds if bar_seconds > 0 else 0
+        sharpe = float(returns.mean() / returns.std() * np.sqrt(bars_per_year))
+    held = sum(t['exit_index'] - t['entry_index'] for t in trades)
+    return {
+        "final_equity": float(equity[-1]) if len(equity) else initial_equity,
+        "pnl": float(equity[-1] - initial_equity) if len(equity) else 0.0,
+        "return_pct": float((equity[-1] / initial_equity - 1) * 100) if len(equity) else 0.0,
+        "max_drawdown_pct": float(drawdown.min() * 100) if len(drawdown) else 0.0,
+        "sharpe": sharpe,
+        "trades": len(trades),
+        "win_rate": float(len(wins) / len(pnls)) if len(pnls) else 0.0,
+        "avg_win": float(wins.mean()) if len(wins) else 0.0,
+        "avg_loss": float(losses.mean()) if len(losses) else 0.0,
+        "profit_factor": float(wins.sum() / -losses.sum()) if losses.sum() < 0 else float('inf'),
+        "fees": float(sum(t['fees'] for t in trades)),
+        "exposure_pct": float(held / max(1, len(equity)) * 100),
+    }
+
+def run_backtest(bars, strategy='threshold', settings=None, strategy_params=None, **costs):
+    """Signals + simulation + summary for one strategy and parameter set."""
+    settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+    signals = STRATEGIES[strategy](bars, **(strategy_params or {}))
+    trades, equity = simulate(bars, signals, settings['stop_loss'], settings['take_profit'],
+                              settings['risk_per_trade'], **costs)
+    stats = summarize(trades, equity, bars['timestamp'],
+                      costs.get('initial_equity', INITIAL_EQUITY))
+    return {"stats": stats, "trades": trades, "equity": equity}
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest a bot strategy on historical data.")
+    parser.add_argument('--data', default=HISTORICAL_DATA_FILE)
+    parser.add_argument('--config', default=CONFIG_FILE)
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), default='threshold')
+    parser.add_argument('--buy-threshold', type=float)
+    parser.add_argument('--sell-threshold', type=float)
+    parser.add_argument('--fee-rate', type=float, default=FEE_RATE)
+    parser.add_argument('--slippage', type=float, default=SLIPPAGE)
+    args = parser.parse_args()
+
+    try:
+        bars = load_bars(args.data)
+    except ValueError as e:
+        parser.error(str(e))
+    params = {}
+    if args.strategy == 'threshold':
+        params = {'buy_threshold': args.buy_threshold, 'sell_threshold': args.sell_threshold}
+    result = run_backtest(bars, args.strategy, load_settings(args.config), params,
+                          fee_rate=args.fee_rate, slippage=args.slippage)
+    logging.info(f"Backtest {args.strategy} on {args.data}: {result['stats']}")
+    for key, value in result['stats'].items():
+        print(f"{key:18s} {value:,.4f}" if isinstance(value, float) else f"{key:18s} {value}")
+
+if __name__ == "__main__":
+    main()
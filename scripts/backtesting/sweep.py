@@ -0,0 +1,207 @@
+"""Parallel parameter sweep over the backtester.
+
+    python -m scripts.backtesting.sweep [--samples N] [--workers N] [--sort sharpe] [--write-best]
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from scripts.backtesting.engine import (CONFIG_FILE, HISTORICAL_DATA_FILE, TUNED_KEY, load_bars,
+                                        load_settings, simulate, summarize, threshold_signals)
+
+# ============================ Configuration ============================
+
+# Ranges accepted by the dashboard's number inputs; results outside them
+# could not be loaded back into the sidebar.
+PARAM_BOUNDS = {
+    "stop_loss": (0.80, 1.00),
+    "take_profit": (1.00, 1.50),
+    "risk_per_trade": (0.005, 0.05),
+}
+
+DEFAULT_GRID = {
+    "stop_loss": [0.90, 0.93, 0.95, 0.97, 0.99],
+    "take_profit": [1.01, 1.03, 1.05, 1.08, 1.12],
+    "risk_per_trade": [0.005, 0.01, 0.02, 0.05],
+    "buy_threshold": [None],
+    "sell_threshold": [None],
+}
+
+RISK_KEYS = ("stop_loss", "take_profit", "risk_per_trade")   # top-level config.json keys
+THRESHOLD_KEYS = ("buy_threshold", "sell_threshold")           # per pair, under config[TUNED_KEY]
+DEFAULT_PAIR = "SHIB/USD"   # threshold_signals replays SHIBSnipingBot's rule
+
+# ============================ Parameter Sets ============================
+
+def grid(space):
+    """Every combination of the listed values."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+def random_samples(ranges, count, seed=None):
+    """`count` parameter sets drawn uniformly from {name: (low, high)} ranges."""
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(count):
+        params = {name: rng.uniform(low, high) for name, (low, high) in ranges.items()}
+        if params.get('buy_threshold', 0) > params.get('sell_threshold', np.inf):
+            params['buy_threshold'], params['sell_threshold'] = \
+                params['sell_threshold'], params['buy_threshold']
+        samples.append(params)
+    return samples
+
+def default_ranges(bars):
+    """Random-search ranges: the dashboard bounds plus thresholds around the price history."""
+    low, high = np.percentile(bars['close'], [5, 95])
+    return dict(PARAM_BOUNDS, buy_threshold=(float(low), float(high)),
+                sell_threshold=(float(low), float(high)))
+
+# ============================ Shared Bars ============================
+
+class SharedBars:
+    """Publishes bar arrays in one shared-memory block so workers map, not unpickle, them."""
+
+    def __init__(self, bars):
+        self.layout = []
+        offset = 0
+        for name, values in bars.items():
+            values = np.ascontiguousarray(values)
+            self.layout.append((name, values.dtype.str, len(values), offset))
+            offset += values.nbytes
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, offset))
+        for name, dtype, length, start in self.layout:
+            view = np.ndarray((length,), dtype=dtype, buffer=self.shm.buf, offset=start)
+            view[:] = bars[name]
+
+    @property
+    def handle(self):
+        return self.shm.name, self.layout
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+_worker_shm = None
+_worker_bars = None
+
+def _attach(handle):
+    """Worker initializer: builds read-only views over the parent's shared block."""
+    global _worker_shm, _worker_bars
+    name, layout = handle
+    _worker_shm = shared_memory.SharedMemory(name=name)
+    _worker_bars = {}
+    for column, dtype, length, start in layout:
+        view = np.ndarray((length,), dtype=dtype, buffer=_worker_shm.buf, offset=start)
+        view.flags.writeable = False
+        _worker_bars[column] = view
+
+def _evaluate(params):
+    settings = dict(params)
+    signals = threshold_signals(_worker_bars, settings.get('buy_threshold'),
+                                settings.get('sell_threshold'))
+    trades, equity = simulate(_worker_bars, signals, settings['stop_loss'],
+                              settings['take_profit'], settings['risk_per_trade'])
+    return dict(params, **summarize(trades, equity, _worker_bars['timestamp']))
+
+# ============================ Sweep ============================
+
+def run_sweep(bars, param_sets, workers=None, sort_by='sharpe'):
+    """Evaluates every parameter set in a process pool and returns a sorted DataFrame."""
+    import pandas as pd
+
+    shared = SharedBars(bars)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(shared.handle,)) as pool:
+            chunksize = max(1, len(param_sets) // ((workers or os.cpu_count() or 1) * 4))
+            rows = list(pool.map(_evaluate, param_sets, chunksize=chunksize))
+    finally:
+        shared.close()
+    results = pd.DataFrame(rows)
+    if not results.empty:
+        results = results.sort_values(sort_by, ascending=False, ignore_index=True)
+    return results
+
+def _checked(row, key):
+    """The row's value for key, rounded, or None when unset/NaN; raises if out of bounds."""
+    value = row.get(key)
+    if value is None or value != value:
+        return None
+    low, high = PARAM_BOUNDS.get(key, (-np.inf, np.inf))
+    if not low <= value <= high:
+        raise ValueError(f"{key}={value} is outside the dashboard range [{low}, {high}]")
+    return round(float(value), 10)
+
+def write_config(row, path=CONFIG_FILE, pair=DEFAULT_PAIR):
+    """Writes one result row's parameters into config.json, keeping every other key.
+
+    Risk settings go at the top level, where the dashboard and backtester
+    read them. Thresholds go under config[TUNED_KEY][pair], which
+    SHIBSnipingBot, whose rule was swept, trades by. 'pairs' is left alone:
+    setting it would switch the bot to the multi-pair runner.
+    """
+    config = {}
+    if os.path.exists(path):
+        with open(path, 'r') as file:
+            config = json.load(file)
+    for key in RISK_KEYS:
+        value = _checked(row, key)
+        if value is not None:
+            config[key] = value
+    thresholds = {key: _checked(row, key) for key in THRESHOLD_KEYS}
+    thresholds = {key: value for key, value in thresholds.items() if value is not None}
+    if thresholds:
+        tuned = config.get(TUNED_KEY) or {}
+        tuned[pair] = dict(tuned.get(pair) or {}, **thresholds)
+        config[TUNED_KEY] = tuned
+        for key in THRESHOLD_KEYS:
+            config.pop(key, None)   # earlier sweeps wrote them here, where nothing reads them
+    with open(path, 'w') as file:
+        json.dump(config, file, indent=4)
+    logging.info(f"Wrote sweep parameters to {path}: {({k: config.get(k) for k in RISK_KEYS})}"
+                 + (f", {pair}: {config[TUNED_KEY][pair]}" if thresholds else ""))
+    return config
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep risk settings and thresholds over history.")
+    parser.add_argument('--data', default=HISTORICAL_DATA_FILE)
+    parser.add_argument('--config', default=CONFIG_FILE)
+    parser.add_argument('--samples', type=int, default=0,
+                        help="random parameter sets to draw (default: the built-in grid)")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--sort', default='sharpe')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--output', help="write the full result table to this CSV")
+    parser.add_argument('--write-best', action='store_true',
+                        help="write the top row's parameters into --config")
+    parser.add_argument('--pair', default=DEFAULT_PAIR,
+                        help="pair whose tuned thresholds --write-best sets")
+    args = parser.parse_args()
+
+    try:
+        bars = load_bars(args.data)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.samples:
+        param_sets = random_samples(default_ranges(bars), args.samples, args.seed)
+    else:
+        param_sets = grid(DEFAULT_GRID)
+    results = run_sweep(bars, param_sets, args.workers, args.sort)
+    print(results.head(args.top).to_string())
+    if args.output:
+        results.to_csv(args.output, index=False)
+    if args.write_best and not results.empty:
+        current = load_settings(args.config)
+        logging.info(f"Replacing settings {current} with the best sweep result.")
+        write_config(results.iloc[0].to_dict(), args.config, args.pair)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Cold-start check: how long a fresh interpreter takes to import a bot module.
+
+Each run imports the module in a new `python -X importtime` process, so
+nothing is cached in sys.modules. Exits non-zero when the median import
+time exceeds --budget or when a heavy dependency that should only load on
+first use (requests, websockets, numpy, pandas, torch) was imported, so it
+can guard restarts against import-time regressions. --profile prints the
+slowest imports by cumulative time.
+
+    python -m scripts.bench.cold_start [module] [--runs N] [--budget SECONDS] [--profile]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+DEFAULT_MODULE = "scripts.training.models.smart_trading_bot"
+BUDGET = 0.25   # seconds; the bot imports in well under 0.1s on a laptop
+DEFERRED = ("requests", "websockets", "numpy", "pandas", "torch", "matplotlib")
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(elapsed)
+print(",".join(name for name in {deferred!r} if name in sys.modules))
+"""
+
+def repo_root():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def cold_import(module, cwd):
+    """Imports `module` in a fresh interpreter: (seconds, deferred modules loaded, importtime lines)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, deferred=DEFERRED)],
+        cwd=cwd, capture_output=True, text=True, check=True,
+    )
+    elapsed, loaded = result.stdout.splitlines()[-2:]
+    return float(elapsed), [name for name in loaded.split(",") if name], result.stderr.splitlines()
+
+def parse_importtime(lines, module):
+    """[(cumulative_us, self_us, name)] for `module` and everything it imported.
+
+    -X importtime prints each import after the imports it triggered, so the
+    module's subtree is the run of nested lines just before its own line;
+    interpreter startup (site) and the probe's own imports are left out.
+    """
+    rows = []
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    end = next((i for i, row in enumerate(rows) if row[2].strip() == module and row[2][1] != " "), None)
+    if end is None:
+        return rows
+    start = end
+    while start > 0 and rows[start - 1][2][1] == " ":   # names are indented by nesting depth
+        start -= 1
+    return rows[start:end + 1]
+
+def print_profile(lines, module, top):
+    rows = parse_importtime(lines, module)
+    print(f"\n{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold-start import time of a module.")
+    parser.add_argument("module", nargs="?", default=DEFAULT_MODULE)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=BUDGET, help="seconds (median)")
+    parser.add_argument("--profile", action="store_true", help="print the slowest imports")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    env_path = os.environ.get("PYTHONPATH")
+    os.environ["PYTHONPATH"] = repo_root() + (os.pathsep + env_path if env_path else "")
+
+    times, loaded, lines = [], set(), []
+    # Import from a scratch directory so module-level side effects stay out of the repo
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(args.runs):
+            elapsed, deferred, lines = cold_import(args.module, cwd)
+            times.append(elapsed)
+            loaded.update(deferred)
+    median = statistics.median(times)
+    print(f"{args.module}: median {median * 1000:.1f} ms, min {min(times) * 1000:.1f} ms "
+          f"over {args.runs} cold imports (budget {args.budget * 1000:.0f} ms)")
+    if args.profile:
+        print_profile(lines, args.module, args.top)
+
+    failures = []
+    if median > args.budget:
+        failures.append(f"import took {median * 1000:.1f} ms, over the {args.budget * 1000:.0f} ms budget")
+    if loaded and args.module == DEFAULT_MODULE:
+        failures.append(f"imported at startup: {', '.join(sorted(loaded))}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
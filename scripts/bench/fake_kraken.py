@@ -0,0 +1,625 @@
+"""Local stand-in for Kraken: REST, the public WebSocket feed and the private feeds.
+
+REST serves Ticker, Balance, OpenOrders, TradesHistory, AddOrder,
+CancelAll and GetWebSocketsToken from an in-memory account, and replays
+Trades and OHLC pages from a recording (the JSON-lines files
+scripts.storage.backfill writes with --record). Private requests are
+checked the way Kraken checks them: API key, HMAC signature and a nonce
+within the key's nonce window. Orders fill at once at the current price
+and are reported on the private openOrders and ownTrades channels.
+
+One WebSocket port serves both feeds. Public book/ticker/ohlc
+subscriptions get a checksummed book-10 moved `tick_rate` times a second
+per pair by a bounded random walk; token-authenticated ownTrades and
+openOrders subscriptions get sequenced order updates and fills.
+
+Misbehaviour is configurable: `latency` (+ up to `jitter`) seconds on every
+REST response, an `error_rate` of REST calls answered with
+EService:Unavailable, Kraken's rate-limit counters for a verification
+`tier` (EAPI:Rate limit exceeded, EOrder:Rate limit exceeded), and
+`disconnect_every` seconds after which every WebSocket is dropped.
+
+    python -m scripts.bench.fake_kraken [--port N] [--ws-port N] [--pairs SHIB/USD ...]
+        [--latency S] [--error-rate P] [--tier starter] [--recording PATH]
+
+Bots are pointed at it with KRAKEN_API_URL, KRAKEN_WS_URL and KRAKEN_WS_AUTH_URL.
+"""
+import argparse
+import asyncio
+import base64
+import hmac
+import itertools
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+from scripts.kraken.market_data import BOOK_DEPTH, OrderBook
+from scripts.kraken.rate_limit import (ENDPOINT_COSTS, PUBLIC_BURST, PUBLIC_RATE, TIERS, TRADING_TIERS,
+                                       DecayingCounter)
+from scripts.kraken.signing import SigningContext
+from scripts.trading.positions import normalise_pair
+
+# ============================ Configuration ============================
+
+RECORDING = os.path.join('data', 'fixtures', 'kraken_public_rest.jsonl')
+
+BENCH_API_KEY = "bench-key"
+BENCH_API_SECRET = base64.b64encode(b"fake-kraken-bench-secret" * 2).decode()
+
+TICK_RATE = 20            # book updates per pair per second
+HEARTBEAT_INTERVAL = 1.0  # seconds; Kraken sends one about every second
+NONCE_WINDOW = 1_000_000  # how far (in nonce units, here microseconds) a nonce may lag the highest seen
+FEE_RATE = 0.0026
+STARTING_BALANCE = "1000000000.0000"
+
+# (tick size, centre, half-width) of each pair's price walk, in ticks. SHIB/USD
+# wanders across the sniping bot's BUY/SELL thresholds (0.0000075/0.0000085).
+MARKETS = {
+    "SHIB/USD": (1e-8, 800, 100),
+    "XRP/USD": (1e-5, 230_000, 2_000),
+    "XBT/USD": (0.1, 945_000, 5_000),
+}
+DEFAULT_MARKET = (1e-4, 10_000, 500)
+
+# Kraken's legacy X/Z asset codes used in Balance results
+ASSET_CODES = {"XBT": "XXBT", "XRP": "XXRP", "ETH": "XETH", "USD": "ZUSD", "EUR": "ZEUR"}
+
+# ============================ Markets ============================
+
+def market_params(pair):
+    """(tick, centre, half-width) for a pair; unknown pairs get DEFAULT_MARKET."""
+    return MARKETS.get(pair, DEFAULT_MARKET)
+
+def centre_price(pair):
+    tick, centre, _ = market_params(pair)
+    return centre * tick
+
+class Market:
+    """One pair's bounded random walk and the book-10 around it.
+
+    The book is mirrored in an OrderBook so every update carries the CRC32
+    checksum MarketDataFeed verifies.
+    """
+
+    def __init__(self, pair, rng):
+        self.pair = pair
+        self.rng = rng
+        self.tick, centre, width = market_params(pair)
+        self.decimals = max(0, -math.floor(math.log10(self.tick) + 1e-9))
+        self.lo, self.hi = centre - width, centre + width
+        self.step_ticks = max(1, width // 8)
+        self.mid = centre
+        self.book = OrderBook(pair)
+        self.channel_ids = {}
+
+    def price_str(self, ticks):
+        return f"{ticks * self.tick:.{self.decimals}f}"
+
+    @property
+    def price(self):
+        return self.mid * self.tick
+
+    def _levels(self, sign):
+        now = f"{time.time():.6f}"
+        return [[self.price_str(self.mid + sign * k), f"{self.rng.uniform(0.1, 50):.8f}", now]
+                for k in range(1, BOOK_DEPTH + 1)]
+
+    def snapshot(self):
+        """The current book as a Kraken snapshot payload."""
+        if not self.book.valid:
+            self.book.apply_snapshot({"as": self._levels(1), "bs": self._levels(-1)})
+        now = f"{time.time():.6f}"
+        return {side: [[price_str, volume_str, now]
+                       for price_str, volume_str in (book[p] for p in sorted(book, reverse=reverse))]
+                for side, book, reverse in (("as", self.book.asks, False), ("bs", self.book.bids, True))}
+
+    def step(self):
+        """Moves the price and returns the two update parts of a book message."""
+        if not self.book.valid:
+            self.snapshot()
+        mid = self.mid + round(self.rng.gauss(0, self.step_ticks))
+        if mid < self.lo:
+            mid = 2 * self.lo - mid
+        elif mid > self.hi:
+            mid = 2 * self.hi - mid
+        self.mid = min(self.hi, max(self.lo, mid))
+        parts = []
+        for key, book, sign in (("a", self.book.asks, 1), ("b", self.book.bids, -1)):
+            levels = self._levels(sign)
+            keep = {float(level[0]) for level in levels}
+            removed = [[book[price][0], "0.00000000", levels[0][2]] for price in book if price not in keep]
+            parts.append({key: removed + levels})
+        self.book.apply_update(*parts)
+        parts[-1]["c"] = str(self.book.checksum())
+        return parts
+
+    def ticker(self):
+        ask, bid, last = self.price_str(self.mid + 1), self.price_str(self.mid - 1), self.price_str(self.mid)
+        return {"a": [ask, "1", "1.000"], "b": [bid, "1", "1.000"], "c": [last, "0.10000000"],
+                "v": ["1000.0", "1000.0"], "p": [last, last], "t": [100, 100],
+                "l": [self.price_str(self.lo), self.price_str(self.lo)],
+                "h": [self.price_str(self.hi), self.price_str(self.hi)], "o": last}
+
+# ============================ Recorded Pages ============================
+
+def _request_key(path, params):
+    return path, tuple(sorted((name, str(value)) for name, value in params.items()))
+
+class RecordedPages:
+    """Trades/OHLC pages from a --record file, answered by path and parameters.
+
+    A known pair asked for a `since` that was never recorded gets an empty
+    page, which is how Kraken answers at the end of the history.
+    """
+
+    def __init__(self, path=RECORDING):
+        self.pages = {}
+        self.result_keys = {}   # (path, pair) -> the pair name Kraken used in the result
+        with open(path, 'r') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self.pages[_request_key(entry['path'], entry['params'])] = entry['response']
+                result = entry['response'].get('result') or {}
+                name = next((key for key in result if key != 'last'), None)
+                if name:
+                    self.result_keys[(entry['path'], str(entry['params'].get('pair')))] = name
+
+    def respond(self, path, params):
+        response = self.pages.get(_request_key(path, params))
+        if response is not None:
+            return response
+        name = self.result_keys.get((path, str(params.get('pair'))))
+        if name is None:
+            return {"error": ["EQuery:Unknown asset pair"]}
+        return {"error": [], "result": {name: [], "last": params.get('since', '0')}}
+
+# ============================ Fake Kraken ============================
+
+class FakeKraken:
+    def __init__(self, pairs=tuple(MARKETS), host='127.0.0.1', port=0, ws_port=0,
+                 api_key=BENCH_API_KEY, api_secret=BENCH_API_SECRET, recording=None,
+                 latency=0.0, jitter=0.0, error_rate=0.0, tier=None, tick_rate=TICK_RATE,
+                 disconnect_every=None, nonce_window=NONCE_WINDOW, seed=None):
+        self.rng = random.Random(seed)
+        self.markets = {pair: Market(pair, random.Random(self.rng.random())) for pair in pairs}
+        self.host, self.port, self.ws_port = host, port, ws_port
+        self.api_key = api_key
+        self.signer = SigningContext(api_key, api_secret)
+        self.pages = RecordedPages(recording) if recording else None
+        self.latency, self.jitter, self.error_rate = latency, jitter, error_rate
+        self.tick_rate = tick_rate
+        self.disconnect_every = disconnect_every
+        self.nonce_window = nonce_window
+        self.tier = tier
+        if tier:
+            self.private_counter = DecayingCounter(*TIERS[tier])
+            self.public_counter = DecayingCounter(PUBLIC_BURST, PUBLIC_RATE)
+            self.trading_counters = defaultdict(lambda: DecayingCounter(*TRADING_TIERS[tier]))
+        self.balances = {self._asset_code(asset): STARTING_BALANCE
+                         for pair in pairs for asset in pair.split('/')}
+        self.trades = {}
+        self.tokens = set()
+        self.stats = Counter()
+        self._last_nonce = 0
+        self._ids = itertools.count(1)
+        self._channel_ids = itertools.count(100)
+        self._lock = threading.Lock()
+        self._connections = set()
+        self._loop = None
+        self._http = None
+        self._thread = None
+
+    # ---- lifecycle ----
+
+    def start(self):
+        """Starts the REST server and the WebSocket loop on daemon threads; returns self."""
+        from http.server import ThreadingHTTPServer
+
+        self._http = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self._http.daemon_threads = True
+        threading.Thread(target=self._http.serve_forever, daemon=True, name="fake-kraken-rest").start()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(ready,), daemon=True,
+                                        name="fake-kraken-ws")
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        self._http.shutdown()
+        self._http.server_close()
+        if self._loop:
+            asyncio.run_coroutine_threadsafe(self._stop_websocket(), self._loop).result(timeout=5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+    @property
+    def base_url(self):
+        host, port = self._http.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def ws_url(self):
+        return f"ws://{self.host}:{self.ws_port}/"
+
+    def requests(self):
+        """REST calls answered so far."""
+        return sum(count for key, count in self.stats.items() if key.startswith('/'))
+
+    def environment(self):
+        """The environment variables that point a bot process at this server."""
+        return {"KRAKEN_API_URL": self.base_url, "KRAKEN_WS_URL": self.ws_url,
+                "KRAKEN_WS_AUTH_URL": self.ws_url}
+
+    # ---- REST ----
+
+    def _handler_class(self):
+        from http.server import BaseHTTPRequestHandler
+        from urllib.parse import parse_qsl, urlsplit
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'   # keep-alive, like api.kraken.com
+            # Headers and body go out as separate writes; with Nagle on, the
+            # body waits for the client's delayed ACK (~40 ms) on kept-alive
+            # connections, which would swamp everything the bench measures
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                self._reply(fake.handle(url.path, dict(parse_qsl(url.query))))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+                self._reply(fake.handle(urlsplit(self.path).path, None, self.headers, body))
+
+            def _reply(self, response):
+                if fake.latency or fake.jitter:
+                    time.sleep(fake.latency + fake.rng.uniform(0, fake.jitter))
+                body = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def handle(self, path, params, headers=None, body=None):
+        """One REST call: (path, query params) for public, (path, headers, body) for private."""
+        with self._lock:
+            self.stats[path] += 1
+        private = path.startswith('/0/private/')
+        if private:
+            error, data = self._authenticate(path, headers, body)
+        else:
+            error, data = None, params
+        error = error or self._rate_limited(path, data) or self._injected_error()
+        if not error:
+            handler = self._endpoints().get(path)
+            if handler is None:
+                error = "EGeneral:Unknown method"
+            else:
+                response = handler(data)
+                if response.get('error'):
+                    error = response['error'][0]
+                else:
+                    return response
+        with self._lock:
+            self.stats[f"error {error}"] += 1
+        return {"error": [error]}
+
+    def _endpoints(self):
+        return {
+            "/0/public/Ticker": self.ticker,
+            "/0/public/Trades": self.recorded('/0/public/Trades'),
+            "/0/public/OHLC": self.recorded('/0/public/OHLC'),
+            "/0/private/Balance": self.balance,
+            "/0/private/OpenOrders": self.open_orders,
+            "/0/private/TradesHistory": self.trades_history,
+            "/0/private/AddOrder": self.add_order,
+            "/0/private/CancelAll": self.cancel_all,
+            "/0/private/GetWebSocketsToken": self.websockets_token,
+        }
+
+    def _authenticate(self, path, headers, body):
+        if headers.get('API-Key') != self.api_key:
+            return "EAPI:Invalid key", None
+        try:
+            data = json.loads(body)
+            nonce = int(data['nonce'])
+        except (ValueError, KeyError, TypeError):
+            return "EAPI:Invalid nonce", None
+        if not hmac.compare_digest(headers.get('API-Sign') or '', self.signer.sign(path, nonce, body)):
+            return "EAPI:Invalid signature", None
+        with self._lock:
+            if nonce <= self._last_nonce - self.nonce_window:
+                return "EAPI:Invalid nonce", None
+            self._last_nonce = max(self._last_nonce, nonce)
+        return None, data
+
+    def _rate_limited(self, path, data):
+        if not self.tier:
+            return None
+        with self._lock:
+            if path.startswith('/0/public/'):
+                counter, cost, error = self.public_counter, 1, "EGeneral:Too many requests"
+            elif path == '/0/private/AddOrder':
+                counter, cost, error = (self.trading_counters[normalise_pair(data.get('pair'))], 1,
+                                        "EOrder:Rate limit exceeded")
+            else:
+                counter, cost, error = (self.private_counter, ENDPOINT_COSTS.get(path, 1),
+                                        "EAPI:Rate limit exceeded")
+            if counter.level() + cost > counter.max_count:
+                return error
+            counter.add(cost)
+        return None
+
+    def _injected_error(self):
+        if self.error_rate and self.rng.random() < self.error_rate:
+            return "EService:Unavailable"
+        return None
+
+    def _market(self, pair):
+        return self.markets.get(normalise_pair(pair or ''))
+
+    @staticmethod
+    def _asset_code(asset):
+        return ASSET_CODES.get(asset, asset)
+
+    # ---- endpoints ----
+
+    def ticker(self, params):
+        result = {}
+        for name in (params.get('pair') or '').split(','):
+            market = self._market(name)
+            if market is None:
+                return {"error": ["EQuery:Unknown asset pair"]}
+            result[market.pair.replace('/', '')] = market.ticker()
+        return {"error": [], "result": result}
+
+    def recorded(self, path):
+        def respond(params):
+            if self.pages is None:
+                return {"error": ["EGeneral:Unknown method"]}
+            return self.pages.respond(path, params)
+        return respond
+
+    def balance(self, data):
+        with self._lock:
+            return {"error": [], "result": dict(self.balances)}
+
+    def open_orders(self, data):
+        return {"error": [], "result": {"open": {}}}   # orders fill as soon as they are placed
+
+    def trades_history(self, data):
+        start = float(data.get('start') or 0)
+        with self._lock:
+            trades = {txid: trade for txid, trade in self.trades.items() if float(trade['time']) > start}
+        return {"error": [], "result": {"trades": trades, "count": len(trades)}}
+
+    def cancel_all(self, data):
+        return {"error": [], "result": {"count": 0}}
+
+    def websockets_token(self, data):
+        token = base64.b64encode(os.urandom(18)).decode()
+        with self._lock:
+            self.tokens.add(token)
+        return {"error": [], "result": {"token": token, "expires": 900}}
+
+    def add_order(self, data):
+        market = self._market(data.get('pair'))
+        if market is None:
+            return {"error": ["EQuery:Unknown asset pair"]}
+        side, ordertype = data.get('type'), data.get('ordertype', 'market')
+        try:
+            volume = float(data['volume'])
+            price = float(data['price']) if ordertype == 'limit' else market.price
+        except (KeyError, TypeError, ValueError):
+            return {"error": ["EGeneral:Invalid arguments"]}
+        if side not in ('buy', 'sell') or volume <= 0 or price <= 0:
+            return {"error": ["EGeneral:Invalid arguments"]}
+        number = next(self._ids)
+        txid, trade_id = f"O{number:06d}-FAKE-KRAKEN", f"T{number:06d}-FAKE-KRAKEN"
+        price_str = market.price_str(round(price / market.tick))
+        cost, now = price * volume, f"{time.time():.6f}"
+        description = f"{side} {data['volume']} {market.pair.replace('/', '')} @ {ordertype} {price_str}"
+        order = {"status": "closed", "vol": f"{volume:.8f}", "vol_exec": f"{volume:.8f}",
+                 "avg_price": price_str, "cost": f"{cost:.8f}", "fee": f"{cost * FEE_RATE:.8f}",
+                 "opentm": now, "closetm": now,
+                 "descr": {"pair": market.pair, "type": side, "ordertype": ordertype,
+                           "price": price_str, "order": description}}
+        trade = {"ordertxid": txid, "postxid": f"P{number:06d}-FAKE-KRAKEN", "pair": market.pair,
+                 "time": now, "type": side, "ordertype": ordertype, "price": price_str,
+                 "cost": f"{cost:.8f}", "fee": f"{cost * FEE_RATE:.8f}", "vol": f"{volume:.8f}",
+                 "margin": "0.00000"}
+        base, quote = (self._asset_code(asset) for asset in market.pair.split('/'))
+        sign = 1 if side == 'buy' else -1
+        with self._lock:
+            self.trades[trade_id] = trade
+            self.balances[base] = f"{float(self.balances.get(base, 0)) + sign * volume:.8f}"
+            self.balances[quote] = f"{float(self.balances.get(quote, 0)) - sign * cost - cost * FEE_RATE:.4f}"
+            self.stats['orders'] += 1
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._publish_fill, txid, order, trade_id, trade)
+        return {"error": [], "result": {"descr": {"order": description}, "txid": [txid]}}
+
+    # ---- WebSocket ----
+
+    def _run_loop(self, ready):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._start_websocket())
+        ready.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _start_websocket(self):
+        from websockets.asyncio.server import serve
+
+        self._ws_server = server = await serve(self._ws_handler, self.host, self.ws_port)
+        self.ws_port = server.sockets[0].getsockname()[1]
+        self._tasks = [asyncio.ensure_future(self._tick_loop()),
+                       asyncio.ensure_future(self._heartbeat_loop())]
+        if self.disconnect_every:
+            self._tasks.append(asyncio.ensure_future(self._disconnect_loop()))
+
+    async def _stop_websocket(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._ws_server.close()
+        await self._ws_server.wait_closed()
+
+    async def _ws_handler(self, websocket):
+        from websockets.exceptions import ConnectionClosed
+
+        websocket.public = set()     # (market, channel name) subscriptions
+        websocket.private = {}       # channel name -> next sequence number
+        self._connections.add(websocket)
+        await websocket.send(json.dumps({"connectionID": id(websocket), "event": "systemStatus",
+                                         "status": "online", "version": "1.9.1"}))
+        try:
+            async for raw in websocket:
+                message = json.loads(raw)
+                if message.get('event') == 'ping':
+                    await websocket.send(json.dumps({"event": "pong", "reqid": message.get('reqid')}))
+                elif message.get('event') in ('subscribe', 'unsubscribe'):
+                    await self._subscription(websocket, message)
+        except ConnectionClosed:
+            pass
+        finally:
+            self._connections.discard(websocket)
+
+    async def _subscription(self, websocket, message):
+        subscription = message.get('subscription') or {}
+        name = subscription.get('name')
+        subscribe = message['event'] == 'subscribe'
+        if name in ('ownTrades', 'openOrders'):
+            if subscription.get('token') not in self.tokens:
+                await websocket.send(json.dumps({"event": "subscriptionStatus", "status": "error",
+                                                 "errorMessage": "ESession:Invalid session",
+                                                 "subscription": {"name": name}}))
+                return
+            if not subscribe:
+                websocket.private.pop(name, None)
+            else:
+                websocket.private[name] = 1
+                await websocket.send(json.dumps({"event": "subscriptionStatus", "status": "subscribed",
+                                                 "channelName": name, "subscription": {"name": name}}))
+                if name == 'openOrders':
+                    self._send_private(websocket, name, [])
+            return
+        channel = {"book": f"book-{subscription.get('depth', BOOK_DEPTH)}", "ticker": "ticker",
+                   "ohlc": f"ohlc-{subscription.get('interval', 1)}"}.get(name)
+        for pair in message.get('pair') or []:
+            market = self.markets.get(pair)
+            if market is None or channel is None:
+                await websocket.send(json.dumps({"event": "subscriptionStatus", "status": "error",
+                                                 "pair": pair, "subscription": subscription,
+                                                 "errorMessage": "Subscription failed"}))
+                continue
+            if name not in market.channel_ids:
+                market.channel_ids[name] = next(self._channel_ids)
+            channel_id = market.channel_ids[name]
+            status = {"channelID": channel_id, "channelName": channel, "event": "subscriptionStatus",
+                      "pair": pair, "status": "subscribed" if subscribe else "unsubscribed",
+                      "subscription": subscription}
+            await websocket.send(json.dumps(status))
+            if not subscribe:
+                websocket.public.discard((market, name))
+                continue
+            websocket.public.add((market, name))
+            if name == 'book':
+                await websocket.send(json.dumps([channel_id, market.snapshot(), channel, pair]))
+
+    def _send_private(self, websocket, channel, payload):
+        from websockets.asyncio.server import broadcast
+
+        sequence = websocket.private[channel]
+        websocket.private[channel] = sequence + 1
+        broadcast([websocket], json.dumps([payload, channel, {"sequence": sequence}]))
+
+    def _publish_fill(self, txid, order, trade_id, trade):
+        for websocket in list(self._connections):
+            if 'openOrders' in websocket.private:
+                self._send_private(websocket, 'openOrders', [{txid: order}])
+            if 'ownTrades' in websocket.private:
+                self._send_private(websocket, 'ownTrades', [{trade_id: trade}])
+
+    async def _tick_loop(self):
+        from websockets.asyncio.server import broadcast
+
+        interval = 1.0 / self.tick_rate
+        next_tick = time.monotonic()
+        while True:
+            for market in self.markets.values():
+                parts = market.step()
+                subscribers = {name: [ws for ws in self._connections if (market, name) in ws.public]
+                               for name in ('book', 'ticker')}
+                if subscribers['book']:
+                    broadcast(subscribers['book'], json.dumps(
+                        [market.channel_ids['book'], *parts, f"book-{BOOK_DEPTH}", market.pair]))
+                if subscribers['ticker']:
+                    broadcast(subscribers['ticker'], json.dumps(
+                        [market.channel_ids['ticker'], market.ticker(), "ticker", market.pair]))
+            self.stats['ticks'] += 1
+            next_tick += interval
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+
+    async def _heartbeat_loop(self):
+        from websockets.asyncio.server import broadcast
+
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            broadcast(list(self._connections), '{"event":"heartbeat"}')
+
+    async def _disconnect_loop(self):
+        while True:
+            await asyncio.sleep(self.disconnect_every)
+            for websocket in list(self._connections):
+                websocket.transport.abort()
+            self.stats['disconnects'] += 1
+
+# ============================ Main ============================
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for Kraken's REST and WebSocket APIs.")
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--ws-port', type=int, default=8091)
+    parser.add_argument('--pairs', nargs='+', default=list(MARKETS))
+    parser.add_argument('--recording', default=RECORDING, help="Trades/OHLC pages to serve")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every REST response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="up to this many seconds more")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of REST calls that fail")
+    parser.add_argument('--tier', choices=sorted(TIERS), help="enforce this tier's rate limits")
+    parser.add_argument('--tick-rate', type=float, default=TICK_RATE)
+    parser.add_argument('--disconnect-every', type=float, help="drop WebSockets every N seconds")
+    args = parser.parse_args()
+
+    fake = FakeKraken(args.pairs, port=args.port, ws_port=args.ws_port, recording=args.recording,
+                      latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                      tier=args.tier, tick_rate=args.tick_rate,
+                      disconnect_every=args.disconnect_every).start()
+    for name, value in fake.environment().items():
+        print(f"export {name}={value}")
+    print(f"API key {BENCH_API_KEY}, secret {BENCH_API_SECRET} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(dict(fake.stats))
+        fake.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""End-to-end load benchmark: the bots against scripts.bench.fake_kraken.
+
+Starts a FakeKraken and runs each scenario in its own child process,
+pointed at it through KRAKEN_API_URL / KRAKEN_WS_URL / KRAKEN_WS_AUTH_URL,
+so CPU time and memory are the bot's alone:
+
+    shib    --workers SHIBSnipingBots sharing one MarketDataFeed, each
+            deciding (and ordering) on every SHIB/USD book update
+    smart   smart_trading_bot's async runner evaluating its strategy every
+            --strategy-interval seconds (60 in production), with the fills
+            coming back on ownTrades
+    engine  the async runner with a MultiPairEngine over --pairs pairs,
+            cycling back to back (cycle_interval 0)
+
+After --warmup seconds the child resets the metrics registry and measures
+for --duration seconds: orders per second, merged tick_to_order_seconds
+percentiles, API errors, CPU time and resident memory. Each scenario runs
+--repeat times and the median of every figure is reported. Kraken's rate
+limits are lifted in the child unless --client-limits is given, so the
+numbers measure the bot rather than the limiter.
+
+Results are compared with the saved baseline (--baseline); --save replaces
+it and --check exits non-zero when a scenario is more than --tolerance
+slower, busier or bigger than the baseline. Compare runs made with the
+same settings: the shib scenario's order rate follows the price path.
+
+    python -m scripts.bench.load [scenario ...] [--duration S] [--repeat N] [--workers N] [--pairs N]
+        [--strategy-interval S]
+        [--latency S] [--error-rate P] [--tier starter] [--save] [--check]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from scripts.bench.fake_kraken import (BENCH_API_KEY, BENCH_API_SECRET, MARKETS, FakeKraken,
+                                       centre_price)
+
+SCENARIOS = ("shib", "smart", "engine")
+BASELINE = os.path.join('data', 'bench', 'load_baseline.json')
+TOLERANCE = 0.5   # above one latency-histogram bucket step (x1.41), the smallest change p50/p90 can show
+
+# Compared against the baseline: (result key, True if higher is better, absolute
+# change always tolerated). Millisecond latencies jitter by a few ms run to run;
+# p99 is reported but not compared: a short run has too few orders for it.
+COMPARED = (
+    ("orders_per_second", True, 0),
+    ("p50_ms", False, 5),
+    ("p90_ms", False, 10),
+    ("cpu_ms_per_order", False, 0),
+    ("peak_rss_mb", False, 0),
+)
+
+def repo_root():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def engine_pairs(count):
+    """The fake's markets, then synthetic B01/USD, B02/USD, ... up to `count` pairs."""
+    pairs = list(MARKETS)[:count]
+    pairs += [f"B{i:02d}/USD" for i in range(1, count - len(pairs) + 1)]
+    return pairs
+
+# ============================ Child Process ============================
+
+class UnlimitedRateLimiter:
+    """Stands in for RateLimiter when the benchmark should not be throttled."""
+
+    tier = "unlimited"
+    waited = 0.0
+
+    def try_acquire(self, endpoint, data=None, priority=None):
+        return 0.0
+
+    def acquire(self, endpoint, data=None, priority=None):
+        pass
+
+    async def acquire_async(self, endpoint, data=None, priority=None):
+        pass
+
+    def penalise(self, endpoint, data=None, error=None):
+        pass
+
+    def utilisation(self):
+        return {}
+
+def rss_bytes():
+    with open('/proc/self/statm') as file:
+        return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def measure(warmup, duration, wait):
+    """Waits out the warm-up, resets the metrics and returns the measured window's result.
+
+    `wait(seconds)` lets the scenario keep running while the clock does.
+    """
+    from scripts.uilities.latency import LatencyHistogram
+    from scripts.uilities.metrics import metrics
+
+    wait(warmup)
+    metrics.reset()
+    cpu_started, started = cpu_seconds(), time.perf_counter()
+    wait(duration)
+    elapsed, cpu = time.perf_counter() - started, cpu_seconds() - cpu_started
+
+    latency = LatencyHistogram()
+    for (name, _), histogram in list(metrics.histograms.items()):
+        if name == 'tick_to_order_seconds':
+            latency.merge(histogram)
+    counters = metrics.snapshot()['counters']
+    requests = sum(v for k, v in counters.items() if k.startswith('api_requests_total'))
+    orders = counters.get('api_requests_total{endpoint="/0/private/AddOrder"}', 0)
+    summary = latency.snapshot()
+    rss = rss_bytes() / 2 ** 20
+    return {
+        "orders": int(orders),
+        "orders_per_second": orders / elapsed,
+        "requests_per_second": requests / elapsed,
+        "traced": summary["count"],
+        "p50_ms": summary["p50_ms"],
+        "p90_ms": summary["p90_ms"],
+        "p99_ms": summary["p99_ms"],
+        "max_ms": summary["max_ms"],
+        "api_errors": int(sum(v for k, v in counters.items() if k.startswith('api_errors_total'))),
+        "cpu_percent": 100 * cpu / elapsed,
+        "cpu_ms_per_order": 1000 * cpu / orders if orders else None,
+        # ru_maxrss is in kilobytes on Linux, and sampled less often than statm
+        "peak_rss_mb": max(rss, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+        "rss_mb": rss,
+    }
+
+def run_shib(args):
+    """--workers sniping bots, each deciding on every SHIB/USD book update."""
+    import contextlib
+
+    from scripts.kraken.market_data import MarketDataFeed
+    from scripts.xrp_ml_model import TRADE_AMOUNT_USD, SHIBSnipingBot
+
+    pair = "SHIB/USD"
+    feed = MarketDataFeed([pair])
+    updated = threading.Condition()
+    ticks = [0]
+    stop = threading.Event()
+
+    def on_update(channel, updated_pair, _feed):
+        if channel.startswith('book') and updated_pair == pair:
+            with updated:
+                ticks[0] += 1
+                updated.notify_all()
+
+    def worker(bot):
+        seen = 0
+        while not stop.is_set():
+            with updated:
+                updated.wait_for(lambda: ticks[0] != seen or stop.is_set(), timeout=1)
+                seen = ticks[0]
+            price = bot.current_price(pair)
+            if price:
+                bot.trade_decision(TRADE_AMOUNT_USD / price, price)
+
+    feed.add_listener(on_update)
+    feed.start_in_thread()
+    bots = [SHIBSnipingBot(BENCH_API_KEY, BENCH_API_SECRET, market_data=feed)
+            for _ in range(args.workers)]
+    # The bot reports every decision on stdout, which carries this process's result
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        threads = [threading.Thread(target=worker, args=(bot,), daemon=True) for bot in bots]
+        for thread in threads:
+            thread.start()
+        result = measure(args.warmup, args.duration, time.sleep)
+        stop.set()
+        with updated:
+            updated.notify_all()
+        for thread in threads:
+            thread.join(timeout=5)
+    feed.stop()
+    return result
+
+def run_async_bot(args, config):
+    """run_bot_async with `config` as a task on this loop, measured while it trades."""
+    from scripts.training.models import smart_trading_bot
+
+    # The production cadence would place one order per minute
+    smart_trading_bot.STRATEGY_INTERVAL = args.strategy_interval
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        bot = asyncio.create_task(smart_trading_bot.run_bot_async(config))
+        result = await loop.run_in_executor(None, measure, args.warmup, args.duration, time.sleep)
+        bot.cancel()
+        await asyncio.gather(bot, return_exceptions=True)
+        return result
+
+    return asyncio.run(main())
+
+def run_child(args):
+    from scripts.kraken.client import get_shared_client
+    from scripts.uilities.log_config import configure_logging
+
+    configure_logging('bench.log')
+    if not args.client_limits:
+        get_shared_client().rate_limiter = UnlimitedRateLimiter()
+    config = {"api_key": BENCH_API_KEY, "api_secret": BENCH_API_SECRET,
+              "live_trading": True, "async_runner": True}
+    if args.child == 'shib':
+        result = run_shib(args)
+    elif args.child == 'smart':
+        result = run_async_bot(args, config)
+    else:
+        pairs = engine_pairs(args.pairs)
+        # Thresholds at the centre of each walk: buy below it, sell above it
+        config["pairs"] = {pair: {"buy_threshold": centre_price(pair), "sell_threshold": centre_price(pair)}
+                           for pair in pairs}
+        config["cycle_interval"] = 0
+        result = run_async_bot(args, config)
+    print(json.dumps(result))
+
+# ============================ Orchestration ============================
+
+def run_scenario(scenario, fake, args, scratch):
+    """Runs one scenario in a fresh interpreter; its result dict, or None if it failed."""
+    env = dict(os.environ, **fake.environment())
+    env_path = env.get("PYTHONPATH")
+    env["PYTHONPATH"] = repo_root() + (os.pathsep + env_path if env_path else "")
+    cwd = os.path.join(scratch, scenario)
+    os.makedirs(cwd, exist_ok=True)
+    command = [sys.executable, "-m", "scripts.bench.load", "--child", scenario,
+               "--duration", str(args.duration), "--warmup", str(args.warmup),
+               "--workers", str(args.workers), "--pairs", str(args.pairs),
+               "--strategy-interval", str(args.strategy_interval)]
+    if args.client_limits:
+        command.append("--client-limits")
+    try:
+        completed = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True,
+                                   timeout=args.warmup + args.duration + 60)
+    except subprocess.TimeoutExpired:
+        print(f"{scenario}: timed out")
+        return None
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode or not lines:
+        print(f"{scenario}: exited with {completed.returncode}\n{completed.stderr[-2000:]}")
+        return None
+    return json.loads(lines[-1])
+
+def median_result(runs):
+    """Each metric's median over repeated runs of one scenario."""
+    import statistics
+
+    result = {}
+    for key in runs[0]:
+        values = [run[key] for run in runs if run.get(key) is not None]
+        result[key] = statistics.median(values) if values else None
+    return result
+
+def describe(scenario, result):
+    p = lambda value: "n/a" if value is None else f"{value:.1f}"
+    return (f"{scenario:7s} {result['orders_per_second']:8.1f} orders/s  "
+            f"p50 {p(result['p50_ms'])} ms  p90 {p(result['p90_ms'])} ms  p99 {p(result['p99_ms'])} ms  "
+            f"errors {result['api_errors']}  CPU {result['cpu_percent']:.0f}% "
+            f"({p(result['cpu_ms_per_order'])} ms/order)  "
+            f"RSS {result['rss_mb']:.0f} MB (peak {result['peak_rss_mb']:.0f} MB)")
+
+def compare(scenario, result, baseline, tolerance):
+    """Prints the change against the baseline; returns the regressions beyond `tolerance`."""
+    regressions, changes = [], []
+    for key, higher_is_better, slack in COMPARED:
+        old, new = baseline.get(key), result.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        changes.append(f"{key} {change:+.0%}")
+        if (-change if higher_is_better else change) > tolerance and abs(new - old) > slack:
+            regressions.append(f"{scenario}: {key} {old:.4g} -> {new:.4g} ({change:+.0%})")
+    if changes:
+        print(f"{'':7s} vs baseline: {', '.join(changes)}")
+    return regressions
+
+def environment_info(args):
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "duration": args.duration, "repeat": args.repeat, "workers": args.workers,
+            "pairs": args.pairs, "strategy_interval": args.strategy_interval, "latency": args.latency, "error_rate": args.error_rate,
+            "tier": args.tier, "client_limits": args.client_limits}
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the bots against a local fake Kraken.")
+    parser.add_argument('scenarios', nargs='*', help=f"any of {', '.join(SCENARIOS)} (default all)")
+    parser.add_argument('--duration', type=float, default=5.0, help="measured seconds per run")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per scenario; the median is reported")
+    parser.add_argument('--warmup', type=float, default=2.0, help="seconds before measuring")
+    parser.add_argument('--workers', type=int, default=4, help="sniping bots in the shib scenario")
+    parser.add_argument('--pairs', type=int, default=8, help="pairs in the engine scenario")
+    parser.add_argument('--strategy-interval', type=float, default=0.1,
+                        help="seconds between strategy runs in the smart scenario")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every REST response")
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of REST calls that fail")
+    parser.add_argument('--tier', help="have the fake enforce this tier's rate limits")
+    parser.add_argument('--client-limits', action='store_true', help="keep the client's rate limiter")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save', action='store_true', help="save the results as the baseline")
+    parser.add_argument('--check', action='store_true', help="fail on regressions beyond --tolerance")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--child', choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+    fake = FakeKraken(pairs=engine_pairs(max(args.pairs, len(MARKETS))), latency=args.latency,
+                      jitter=args.jitter, error_rate=args.error_rate, tier=args.tier, seed=1).start()
+    results, problems = {}, []
+    saved_with = baseline.get("environment", {})
+    changed = [key for key, value in environment_info(args).items()
+               if key in saved_with and saved_with[key] != value]
+    if changed:
+        print(f"Baseline was saved with different settings ({', '.join(changed)}); "
+              f"comparisons are only indicative")
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            for scenario in args.scenarios or SCENARIOS:
+                runs = [run_scenario(scenario, fake, args, scratch) for _ in range(args.repeat)]
+                if None in runs:
+                    problems.append(f"{scenario}: failed")
+                    continue
+                result = results[scenario] = median_result(runs)
+                print(describe(scenario, result))
+                if not result["orders"]:
+                    problems.append(f"{scenario}: placed no orders")
+                if scenario in baseline.get("results", {}):
+                    regressions = compare(scenario, result, baseline["results"][scenario], args.tolerance)
+                    if args.check:
+                        problems += regressions
+    finally:
+        print(f"fake Kraken: {dict(fake.stats)}")
+        fake.stop()
+
+    if args.save and results:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        saved = dict(baseline.get("results", {}), **results)
+        with open(args.baseline, 'w') as file:
+            json.dump({"environment": environment_info(args), "results": saved}, file, indent=2)
+            file.write('\n')
+        print(f"Saved baseline to {args.baseline}")
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark: WebSocket message handling, replayed from a JSON-lines message file.
+
+Compares the old hot loop (json.loads, an isinstance/.get("event") check,
+an if/elif chain on the channel name and an f-string logging.info of every
+message) with the decoder and Dispatcher table from scripts.kraken.messages,
+both feeding the same MarketDataFeed books. Input files have the format
+MarketDataFeed writes with record_path ({"ts": ..., "msg": ...}). The
+default, data/fixtures/kraken_public_ws.jsonl, is a synthesized session in
+Kraken's v1 message format, not a capture of the live feed; its checksums
+come from OrderBook itself (see scripts.bench.book_checksum).
+
+    python -m scripts.bench.ws_dispatch [recording] [passes]
+"""
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from scripts.kraken.market_data import MarketDataFeed
+from scripts.kraken.messages import get_decoder
+
+RECORDING = os.path.join('data', 'fixtures', 'kraken_public_ws.jsonl')
+
+def load_frames(path):
+    """The file's messages re-encoded as the raw text frames the socket delivers."""
+    with open(path, 'r') as file:
+        return [json.dumps(json.loads(line)['msg']) for line in file if line.strip()]
+
+def pairs_in(frames):
+    return sorted({msg[-1] for msg in map(json.loads, frames) if isinstance(msg, list)})
+
+def legacy_handler(feed):
+    """The per-message path before the dispatch table."""
+    def handle(raw):
+        data = json.loads(raw)
+        if isinstance(data, dict) and data.get("event"):
+            logging.info(f"WebSocket event: {data}")
+            return
+        logging.info(f"WebSocket data received: {data}")
+        channel, pair = data[-2], data[-1]
+        payload = data[1:-2]
+        if channel.startswith('book'):
+            feed._handle_book(pair, payload)
+        elif channel == 'ticker':
+            feed.tickers[pair] = payload[0]
+        elif channel.startswith('ohlc'):
+            feed.candles[pair] = payload[0]
+    return handle
+
+def dispatch_handler(feed, decoder):
+    loads, dispatch = decoder, feed.dispatcher.dispatch
+
+    def handle(raw):
+        dispatch(loads(raw))
+    return handle
+
+def percentile(sorted_samples, pct):
+    return sorted_samples[min(len(sorted_samples) - 1, int(pct / 100.0 * len(sorted_samples)))]
+
+def measure(handle, frames, passes):
+    """(messages/sec, p50 us, p99 us); exact percentiles, the histogram's floor is 50us."""
+    samples = []
+    clock = time.perf_counter
+    started = clock()
+    for _ in range(passes):
+        for raw in frames:
+            t0 = clock()
+            handle(raw)
+            samples.append(clock() - t0)
+    elapsed = clock() - started
+    samples.sort()
+    return len(samples) / elapsed, percentile(samples, 50) * 1e6, percentile(samples, 99) * 1e6
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else RECORDING
+    passes = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    frames = load_frames(path)
+    pairs = pairs_in(frames)
+
+    # Log to a real file, as the bots do, so per-message logging costs what it costs live
+    log_dir = tempfile.mkdtemp()
+    logging.basicConfig(filename=os.path.join(log_dir, 'bench.log'), level=logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+
+    cases = [("legacy: json + if/elif + log every message", legacy_handler(MarketDataFeed(pairs)))]
+    for name in ('json', 'orjson'):
+        try:
+            decoder = get_decoder(name)
+        except ImportError:
+            continue
+        feed = MarketDataFeed(pairs)
+        cases.append((f"dispatch table, {name} decoder", dispatch_handler(feed, decoder)))
+
+    print(f"{len(frames)} messages x {passes} passes from {path}")
+    for label, handle in cases:
+        rate, p50, p99 = measure(handle, frames, passes)
+        print(f"{label:46s} {rate:12,.0f} msg/s   p50 {p50:7.1f} us   p99 {p99:7.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Reconnect check: WebSocketSupervisor against a local stand-in for ws-auth.kraken.com.
+
+The stand-in server answers subscriptions like Kraken, streams sequenced
+ownTrades messages and misbehaves on purpose: it drops every connection
+after a few messages, skips a sequence number on some connections and goes
+silent on others. The supervisor must reconnect, resubscribe with its cached
+token, flag every gap and every stale connection, and keep the
+reconnect-to-first-message latency low.
+
+    python -m scripts.bench.ws_reconnect [connections]
+"""
+import asyncio
+import itertools
+import json
+import sys
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+from scripts.kraken.ws_supervisor import WebSocketSupervisor
+
+MESSAGES_PER_CONNECTION = 20
+GAP_EVERY = 3      # every 3rd connection skips a sequence number
+SILENT_EVERY = 5   # every 5th connection stops sending without closing
+
+class StandInServer:
+    def __init__(self):
+        self.connections = itertools.count(1)
+        self.tokens = []
+        self.expected_gaps = 0
+        self.expected_stale = 0
+
+    async def handler(self, websocket):
+        try:
+            await self.stream(websocket, next(self.connections))
+        except ConnectionClosed:
+            pass  # the client gave up on this connection first
+
+    async def stream(self, websocket, number):
+        subscribe = json.loads(await websocket.recv())
+        subscription = subscribe["subscription"]
+        self.tokens.append(subscription.get("token"))
+        await websocket.send(json.dumps({"event": "subscriptionStatus", "status": "subscribed",
+                                         "channelName": subscription["name"]}))
+        sequence = 1
+        for i in range(MESSAGES_PER_CONNECTION):
+            if number % GAP_EVERY == 0 and i == MESSAGES_PER_CONNECTION // 2:
+                sequence += 1
+                self.expected_gaps += 1
+            trade = {f"T{number}-{i}": {"ordertxid": "O1", "pair": "XBT/USD", "type": "buy",
+                                       "price": "100", "vol": "0.01", "time": "0"}}
+            await websocket.send(json.dumps([[trade], "ownTrades", {"sequence": sequence}]))
+            sequence += 1
+            await asyncio.sleep(0.001)
+        if number % SILENT_EVERY == 0:
+            self.expected_stale += 1
+            await websocket.wait_closed()
+        # otherwise drop the connection
+
+async def run(connections):
+    server = StandInServer()
+    received = []
+    token_counter = itertools.count(1)
+
+    async def token_provider():
+        return f"token-{next(token_counter)}"
+
+    async with serve(server.handler, "127.0.0.1", 0) as ws_server:
+        port = ws_server.sockets[0].getsockname()[1]
+        supervisor = WebSocketSupervisor(
+            f"ws://127.0.0.1:{port}/", [{"name": "ownTrades", "snapshot": False}], received.append,
+            token_provider=token_provider, name="stand-in", stale_after=0.3, backoff_base=0.01)
+        task = asyncio.create_task(supervisor.run())
+        while supervisor.connections < connections:
+            await asyncio.sleep(0.01)
+        await supervisor.stop()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    metrics = supervisor.metrics()
+    latency = metrics["reconnect_to_first_message_ms"]
+    print(f"connections           {metrics['connections']}")
+    print(f"messages              {metrics['messages']}")
+    print(f"sequence gaps         {metrics['sequence_gaps']} (server injected {server.expected_gaps})")
+    print(f"stale disconnects     {metrics['stale_disconnects']} (server went silent {server.expected_stale}x)")
+    print(f"tokens used           {len(set(server.tokens))} distinct over {len(server.tokens)} subscribes")
+    print(f"reconnect->first msg  p50 {latency['p50_ms']:.2f} ms  p99 {latency['p99_ms']:.2f} ms  "
+          f"max {latency['max_ms']:.2f} ms")
+    assert metrics["sequence_gaps"] >= server.expected_gaps - 1
+    assert metrics["stale_disconnects"] >= server.expected_stale - 1
+    assert all(server.tokens)
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 30))
@@ -0,0 +1,286 @@
+"""Rolling indicators computed one tick at a time, or over a whole history at once.
+
+Both modes run the same floating-point operations in the same order, so
+the batch output over data/historical_data.csv is bit-identical to what
+FeatureEngine.update() produces live:
+
+* rolling sums are differences of a running prefix sum (np.cumsum in
+  batch mode, a ring buffer of prefix sums when streaming);
+* recursive indicators (EMA, RSI's Wilder averages) use one scalar step
+  function, called directly when streaming and through
+  np.frompyfunc(...).accumulate in batch mode.
+
+    python -m scripts.features.pipeline [--data PATH] [--output PATH]
+"""
+import argparse
+import math
+
+import numpy as np
+
+# ============================ Configuration ============================
+
+EMA_SPANS = (12, 26)
+RSI_PERIOD = 14
+VOLATILITY_WINDOW = 20
+VWAP_WINDOW = 20
+IMBALANCE_DEPTH = 10   # book levels per side
+
+# ============================ Building Blocks ============================
+
+class RingBuffer:
+    """Fixed-size FIFO; push() returns the value that fell out, or None."""
+
+    def __init__(self, size):
+        self.values = [None] * size
+        self.index = 0
+
+    def push(self, value):
+        evicted = self.values[self.index]
+        self.values[self.index] = value
+        self.index = (self.index + 1) % len(self.values)
+        return evicted
+
+class RollingSum:
+    """Sum of the last `window` values as a difference of prefix sums."""
+
+    def __init__(self, window):
+        self.window = window
+        self.count = 0
+        self.prefix = 0.0
+        self.history = RingBuffer(window)
+
+    def update(self, value):
+        self.prefix = self.prefix + value if self.count else value
+        self.count += 1
+        oldest = self.history.push(self.prefix)
+        if self.count < self.window:
+            return math.nan
+        return self.prefix if oldest is None else self.prefix - oldest
+
+def rolling_sum(values, window):
+    """Batch RollingSum: NaN until the window is full."""
+    prefix = np.cumsum(values)
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1] = prefix[window - 1]
+        out[window:] = prefix[window:] - prefix[:-window]
+    return out
+
+def ema_step(alpha):
+    """The EMA recursion shared by both modes: prev + alpha * (value - prev)."""
+    def step(prev, value):
+        return prev + alpha * (value - prev)
+    return step
+
+def accumulate(step, values):
+    """Runs a scalar step function over an array, seeded with the first value."""
+    if not len(values):
+        return np.zeros(0)
+    return np.frompyfunc(step, 2, 1).accumulate(np.asarray(values, dtype=object)).astype(np.float64)
+
+def _rsi(avg_gain, avg_loss):
+    return 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+def _volatility(total, total_sq, window):
+    mean = total / window
+    return math.sqrt(max(total_sq / window - mean * mean, 0.0))
+
+def book_imbalance(bid_volume, ask_volume):
+    """(bids - asks) / (bids + asks) over the top of the book, in [-1, 1]."""
+    total = bid_volume + ask_volume
+    return (bid_volume - ask_volume) / total if total else 0.0
+
+# ============================ Streaming ============================
+
+class FeatureEngine:
+    """Incremental indicators for one pair, O(1) per update.
+
+    Call update(price, volume) once per bar close (or tick) and
+    update_book(book) on every order-book change; features() returns the
+    latest values, NaN while a window is still filling.
+    """
+
+    def __init__(self, ema_spans=EMA_SPANS, rsi_period=RSI_PERIOD,
+                 volatility_window=VOLATILITY_WINDOW, vwap_window=VWAP_WINDOW,
+                 imbalance_depth=IMBALANCE_DEPTH):
+        self.ema_spans = tuple(ema_spans)
+        self.rsi_period = rsi_period
+        self.volatility_window = volatility_window
+        self.vwap_window = vwap_window
+        self.imbalance_depth = imbalance_depth
+
+        self._ema_steps = [ema_step(2.0 / (span + 1)) for span in self.ema_spans]
+        self._rsi_step = ema_step(1.0 / rsi_period)
+        self._emas = [None] * len(self.ema_spans)
+        self._avg_gain = self._avg_loss = None
+        self._changes = 0
+        self._returns = RollingSum(volatility_window)
+        self._returns_sq = RollingSum(volatility_window)
+        self._notional = RollingSum(vwap_window)
+        self._volume = RollingSum(vwap_window)
+        self.last_price = None
+        self.values = {name: math.nan for name in self.feature_names()}
+
+    def feature_names(self):
+        return (["return"] + [f"ema_{span}" for span in self.ema_spans]
+                + [f"rsi_{self.rsi_period}", f"volatility_{self.volatility_window}",
+                   f"vwap_{self.vwap_window}", "imbalance"])
+
+    def update(self, price, volume=0.0):
+        """Folds in one bar close (or trade) and returns the updated features."""
+        price, volume = float(price), float(volume)
+        values = self.values
+        for i, step in enumerate(self._ema_steps):
+            self._emas[i] = price if self._emas[i] is None else step(self._emas[i], price)
+            values[f"ema_{self.ema_spans[i]}"] = self._emas[i]
+
+        if self.last_price is not None:
+            change = price - self.last_price
+            ret = price / self.last_price - 1.0
+            gain = change if change > 0 else 0.0
+            loss = -change if change < 0 else 0.0
+            if self._avg_gain is None:
+                self._avg_gain, self._avg_loss = gain, loss
+            else:
+                self._avg_gain = self._rsi_step(self._avg_gain, gain)
+                self._avg_loss = self._rsi_step(self._avg_loss, loss)
+            self._changes += 1
+            values["return"] = ret
+            values[f"rsi_{self.rsi_period}"] = (
+                _rsi(self._avg_gain, self._avg_loss) if self._changes >= self.rsi_period else math.nan)
+            total = self._returns.update(ret)
+            total_sq = self._returns_sq.update(ret * ret)
+            values[f"volatility_{self.volatility_window}"] = (
+                math.nan if math.isnan(total) else
+                _volatility(total, total_sq, self.volatility_window))
+
+        notional = self._notional.update(price * volume)
+        volume_sum = self._volume.update(volume)
+        values[f"vwap_{self.vwap_window}"] = notional / volume_sum if volume_sum > 0 else math.nan
+        self.last_price = price
+        return values
+
+    def update_book(self, book):
+        """Recomputes order-book imbalance from an OrderBook's top levels."""
+        depth = self.imbalance_depth
+        bid_volume = sum(volume for _, volume in book.levels('bid')[:depth])
+        ask_volume = sum(volume for _, volume in book.levels('ask')[:depth])
+        self.values["imbalance"] = book_imbalance(bid_volume, ask_volume)
+        return self.values["imbalance"]
+
+    def features(self):
+        return dict(self.values)
+
+    # ---- batch mode ----
+
+    def batch(self, close, volume=None, bid_volume=None, ask_volume=None):
+        """The same features for a whole price history, one array per name.
+
+        Row t equals features() after update(close[t], volume[t]). Imbalance
+        needs per-bar top-of-book volumes and is NaN without them.
+        """
+        close = np.asarray(close, dtype=np.float64)
+        volume = np.zeros(len(close)) if volume is None else np.asarray(volume, dtype=np.float64)
+        n = len(close)
+        out = {}
+
+        returns = np.full(n, np.nan)
+        returns[1:] = close[1:] / close[:-1] - 1.0
+        out["return"] = returns
+        for span, step in zip(self.ema_spans, self._ema_steps):
+            out[f"ema_{span}"] = accumulate(step, close)
+
+        rsi = np.full(n, np.nan)
+        changes = close[1:] - close[:-1]
+        if len(changes) >= self.rsi_period:
+            gains = np.where(changes > 0, changes, 0.0)
+            losses = np.where(changes < 0, -changes, 0.0)
+            avg_gain = accumulate(self._rsi_step, gains)
+            avg_loss = accumulate(self._rsi_step, losses)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+            rsi[self.rsi_period:] = values[self.rsi_period - 1:]
+        out[f"rsi_{self.rsi_period}"] = rsi
+
+        window = self.volatility_window
+        volatility = np.full(n, np.nan)
+        total = rolling_sum(returns[1:], window)
+        total_sq = rolling_sum(returns[1:] * returns[1:], window)
+        mean = total / window
+        volatility[1:] = np.sqrt(np.maximum(total_sq / window - mean * mean, 0.0))
+        out[f"volatility_{window}"] = volatility
+
+        notional = rolling_sum(close * volume, self.vwap_window)
+        volume_sum = rolling_sum(volume, self.vwap_window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[f"vwap_{self.vwap_window}"] = np.where(volume_sum > 0, notional / volume_sum, np.nan)
+
+        if bid_volume is not None and ask_volume is not None:
+            bid_volume = np.asarray(bid_volume, dtype=np.float64)
+            ask_volume = np.asarray(ask_volume, dtype=np.float64)
+            total_book = bid_volume + ask_volume
+            with np.errstate(divide='ignore', invalid='ignore'):
+                out["imbalance"] = np.where(total_book != 0, (bid_volume - ask_volume) / total_book, 0.0)
+        else:
+            out["imbalance"] = np.full(n, np.nan)
+        return out
+
+# ============================ Feed Integration ============================
+
+class FeedFeatures:
+    """Keeps a FeatureEngine per pair up to date from a MarketDataFeed.
+
+    Register with feed.add_listener(FeedFeatures(...)). Kraken resends the
+    open OHLC candle on every trade, so a bar is folded in only once it
+    closes (its end time changes), matching the historical 1-minute bars.
+    """
+
+    def __init__(self, pairs, **params):
+        self.engines = {pair: FeatureEngine(**params) for pair in pairs}
+        self._open_candles = {}
+
+    def __call__(self, channel, pair, feed):
+        engine = self.engines.get(pair)
+        if engine is None:
+            return
+        if channel.startswith('book'):
+            engine.update_book(feed.books[pair])
+        elif channel.startswith('ohlc'):
+            # [time, etime, open, high, low, close, vwap, volume, count]
+            candle = feed.candles[pair]
+            previous = self._open_candles.get(pair)
+            if previous is not None and previous[1] != candle[1]:
+                engine.update(float(previous[5]), float(previous[7]))
+            self._open_candles[pair] = candle
+
+    def features(self, pair):
+        engine = self.engines.get(pair)
+        return engine.features() if engine else None
+
+# ============================ Offline ============================
+
+def historical_features(path=None, **params):
+    """Batch features for data/historical_data.csv as a DataFrame indexed by time."""
+    import pandas as pd
+
+    from scripts.backtesting.engine import HISTORICAL_DATA_FILE, load_bars
+
+    bars = load_bars(path or HISTORICAL_DATA_FILE)
+    frame = pd.DataFrame(FeatureEngine(**params).batch(bars['close'], bars['volume']))
+    frame.index = pd.to_datetime(bars['timestamp'])
+    return frame
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute rolling features over historical bars.")
+    parser.add_argument('--data')
+    parser.add_argument('--output', help="CSV to write (default: print the last rows)")
+    args = parser.parse_args()
+
+    frame = historical_features(args.data)
+    if args.output:
+        frame.to_csv(args.output, index_label='timestamp')
+    else:
+        print(frame.tail(10).to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from scripts.kraken.client import get_shared_client
+
+# ============================ Configuration ============================
+
+# Overridable from the environment, like KRAKEN_API_URL
+KRAKEN_WS_URL = os.environ.get("KRAKEN_WS_URL", "wss://ws.kraken.com/")
+KRAKEN_WS_AUTH_URL = os.environ.get("KRAKEN_WS_AUTH_URL", "wss://ws-auth.kraken.com/")
+
+# REST calls in flight at once; matches the shared client's connection pool.
+REST_WORKERS = 8
+
+# ============================ Async Client ============================
+
+class AsyncKrakenClient:
+    """Kraken REST client for code running on an asyncio loop.
+
+    REST requests go through the shared pooled KrakenClient on a small
+    dedicated thread pool, so they never block the loop and keep the same
+    keep-alive connections, timeouts, retries and latency histograms as the
+    synchronous bots. WebSocket feeds go through WebSocketSupervisor
+    (scripts.kraken.ws_supervisor); the URLs are defined here.
+    """
+
+    def __init__(self, client=None, rest_workers=REST_WORKERS):
+        self.client = client or get_shared_client()
+        self._executor = ThreadPoolExecutor(max_workers=rest_workers,
+                                            thread_name_prefix="kraken-rest")
+
+    # ---- REST ----
+
+    async def public(self, endpoint, params=None):
+        # Wait for rate-limit budget on the loop, not in a pool thread
+        await self.client.rate_limiter.acquire_async(endpoint)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(self.client.public, endpoint, params, acquired=True))
+
+    async def private(self, endpoint, data, signer):
+        await self.client.rate_limiter.acquire_async(endpoint, data)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(self.client.private, endpoint, data, signer, acquired=True))
+
+    async def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,160 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scripts.kraken.rate_limit import RateLimiter
+from scripts.uilities.latency import LatencyHistogram
+from scripts.uilities.metrics import metrics
+
+# ============================ Configuration ============================
+
+# Overridable from the environment, e.g. to run a bot against scripts.bench.fake_kraken
+KRAKEN_API_URL = os.environ.get("KRAKEN_API_URL", "https://api.kraken.com")
+
+POOL_SIZE = 10
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.25  # seconds; attempt n sleeps uniform(0, BACKOFF_BASE * 2**n)
+BACKOFF_CAP = 4.0
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 10.0)
+ENDPOINT_TIMEOUTS = {
+    "/0/public/Ticker": (3.05, 5.0),
+    "/0/public/OHLC": (3.05, 15.0),
+    "/0/public/Trades": (3.05, 15.0),
+    "/0/private/Balance": (3.05, 10.0),
+    "/0/private/OpenOrders": (3.05, 10.0),
+    "/0/private/AddOrder": (3.05, 15.0),
+    "/0/private/CancelAll": (3.05, 15.0),
+    "/0/private/GetWebSocketsToken": (3.05, 10.0),
+}
+
+# Sending one of these twice may place or change an order twice, so a
+# failed attempt is reported to the caller rather than retried.
+NON_IDEMPOTENT = {
+    "/0/private/AddOrder",
+    "/0/private/AddOrderBatch",
+    "/0/private/EditOrder",
+}
+
+RETRY_STATUS = {429, 500, 502, 503, 504, 520, 522}
+RETRY_ERRORS = ("EService:Unavailable", "EService:Busy", "EGeneral:Temporary lockout",
+                "EAPI:Rate limit exceeded")
+RATE_LIMIT_ERRORS = ("EAPI:Rate limit exceeded", "EOrder:Rate limit exceeded")
+
+# ============================ Client ============================
+
+class KrakenClient:
+    """Kraken REST client sharing one keep-alive connection pool.
+
+    Private requests take a `signer(endpoint, data) -> (headers, body)`
+    callable that is invoked once per attempt, so a retried request always
+    carries a fresh nonce. Every attempt is scheduled through `rate_limiter`.
+    """
+
+    def __init__(self, base_url=KRAKEN_API_URL, pool_size=POOL_SIZE,
+                 max_retries=MAX_RETRIES, timeouts=None, rate_limiter=None):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.timeouts = dict(ENDPOINT_TIMEOUTS, **(timeouts or {}))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.latency = defaultdict(LatencyHistogram)
+        self.rate_limiter = rate_limiter or RateLimiter()
+
+    def public(self, endpoint, params=None, acquired=False):
+        """GETs a public endpoint and returns the decoded JSON response.
+
+        Pass acquired=True if the caller already reserved rate-limit budget
+        for the first attempt (the async client does this on its loop).
+        """
+        return self._request("GET", endpoint, lambda: ({}, None), params=params,
+                             acquired=acquired)
+
+    def private(self, endpoint, data, signer, acquired=False):
+        """POSTs a signed private request and returns the decoded JSON response."""
+        return self._request("POST", endpoint, lambda: signer(endpoint, dict(data)),
+                             data=data, acquired=acquired)
+
+    def latency_snapshot(self):
+        return {endpoint: hist.snapshot() for endpoint, hist in self.latency.items()}
+
+    def close(self):
+        self.session.close()
+
+    def _request(self, method, endpoint, build, params=None, data=None, acquired=False):
+        url = f"{self.base_url}{endpoint}"
+        timeout = self.timeouts.get(endpoint, DEFAULT_TIMEOUT)
+        retries = 0 if endpoint in NON_IDEMPOTENT else self.max_retries
+        attempt = 0
+        while True:
+            if attempt or not acquired:
+                self.rate_limiter.acquire(endpoint, data)
+            headers, body = build()
+            metrics.inc('api_requests_total', endpoint=endpoint)
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, params=params, data=body,
+                                                headers=headers, timeout=timeout)
+                result = self._decode(response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.latency[endpoint].record(time.perf_counter() - start)
+                metrics.inc('api_errors_total', endpoint=endpoint, kind=type(e).__name__)
+                if attempt >= retries:
+                    raise
+                logging.warning(f"{endpoint} attempt {attempt + 1} failed: {e}; retrying.")
+            else:
+                elapsed = time.perf_counter() - start
+                self.latency[endpoint].record(elapsed)
+                metrics.observe('api_seconds', elapsed, endpoint=endpoint)
+                errors = (result or {}).get("error") or []
+                if errors or result is None:
+                    kind = errors[0].split(':')[0] if errors else f"HTTP {response.status_code}"
+                    metrics.inc('api_errors_total', endpoint=endpoint, kind=kind)
+                for error in errors:
+                    if error.startswith(RATE_LIMIT_ERRORS):
+                        self.rate_limiter.penalise(endpoint, data, error)
+                if not self._should_retry(response, result) or attempt >= retries:
+                    if result is None:
+                        response.raise_for_status()
+                        raise requests.RequestException(f"Non-JSON response from {endpoint}")
+                    return result
+                logging.warning(f"{endpoint} attempt {attempt + 1} returned "
+                                f"{response.status_code} {result.get('error') if result else ''}; retrying.")
+            attempt += 1
+            time.sleep(random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+
+    @staticmethod
+    def _decode(response):
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _should_retry(response, result):
+        if response.status_code in RETRY_STATUS:
+            return True
+        errors = (result or {}).get("error") or []
+        return any(error.startswith(RETRY_ERRORS) for error in errors)
+
+# ============================ Shared Instance ============================
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+def get_shared_client():
+    """Returns the process-wide client, creating it on first use."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = KrakenClient()
+        return _shared_client
@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import zlib
+
+import websockets
+
+from scripts.kraken.async_client import KRAKEN_WS_URL
+from scripts.kraken.messages import Dispatcher, loads
+
+# ============================ Configuration ============================
+
+BOOK_DEPTH = 10       # Kraken checksums cover the top 10 levels per side
+OHLC_INTERVAL = 1     # minutes
+RECONNECT_DELAY = 5   # seconds
+
+# ============================ Order Book ============================
+
+def _checksum_digits(value):
+    """Price/volume string as Kraken checksums it: no decimal point, no leading zeros."""
+    return value.replace('.', '').lstrip('0')
+
+class OrderBook:
+    """Incrementally updated L2 book for one pair, verified by Kraken's CRC32 checksum.
+
+    Levels keep the exact price and volume strings Kraken sent, because the
+    checksum is computed over those strings.
+    """
+
+    def __init__(self, pair, depth=BOOK_DEPTH):
+        self.pair = pair
+        self.depth = depth
+        self.bids = {}   # price -> (price_str, volume_str)
+        self.asks = {}
+        self.valid = False
+        self.updated_at = 0.0
+
+    def apply_snapshot(self, data):
+        self.bids.clear()
+        self.asks.clear()
+        self._apply_levels(self.asks, data.get('as', []))
+        self._apply_levels(self.bids, data.get('bs', []))
+        self._truncate()
+        self.valid = True
+        self.updated_at = time.time()
+
+    def apply_update(self, *parts):
+        """Applies the one or two update dicts of a book message.
+
+        Returns False if the message carried a checksum that does not match.
+        """
+        checksum = None
+        for part in parts:
+            self._apply_levels(self.asks, part.get('a', []))
+            self._apply_levels(self.bids, part.get('b', []))
+            checksum = part.get('c', checksum)
+        self._truncate()
+        self.updated_at = time.time()
+        if checksum is not None and int(checksum) != self.checksum():
+            self.valid = False
+            return False
+        return True
+
+    def _apply_levels(self, side, levels):
+        for level in levels:
+            price_str, volume_str = level[0], level[1]
+            price = float(price_str)
+            if float(volume_str) == 0:
+                side.pop(price, None)
+            else:
+                side[price] = (price_str, volume_str)
+
+    def _truncate(self):
+        for side, reverse in ((self.asks, False), (self.bids, True)):
+            if len(side) > self.depth:
+                for price in sorted(side, reverse=reverse)[self.depth:]:
+                    del side[price]
+
+    def levels(self, side):
+        """Returns [(price, volume), ...] best first."""
+        book, reverse = (self.bids, True) if side == 'bid' else (self.asks, False)
+        return [(price, float(book[price][1])) for price in sorted(book, reverse=reverse)]
+
+    def checksum(self):
+        parts = []
+        for book, reverse in ((self.asks, False), (self.bids, True)):
+            for price in sorted(book, reverse=reverse)[:BOOK_DEPTH]:
+                price_str, volume_str = book[price]
+                parts.append(_checksum_digits(price_str) + _checksum_digits(volume_str))
+        return zlib.crc32(''.join(parts).encode()) & 0xffffffff
+
+    @property
+    def best_bid(self):
+        return max(self.bids) if self.bids else None
+
+    @property
+    def best_ask(self):
+        return min(self.asks) if self.asks else None
+
+    @property
+    def mid(self):
+        bid, ask = self.best_bid, self.best_ask
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+# ============================ Market Data Feed ============================
+
+class MarketDataFeed:
+    """Public ticker/book/ohlc subscriber keeping the latest state per pair.
+
+    Strategies read best_bid/best_ask/mid/last_price from memory instead of
+    polling the REST Ticker endpoint. Messages can also be fed in from a
+    recording with replay(), which is how the feed is exercised offline.
+    """
+
+    def __init__(self, pairs, depth=BOOK_DEPTH, ohlc_interval=OHLC_INTERVAL,
+                 url=KRAKEN_WS_URL, record_path=None):
+        self.pairs = list(pairs)
+        self.depth = depth
+        self.ohlc_interval = ohlc_interval
+        self.url = url
+        self.record_path = record_path
+        self.books = {pair: OrderBook(pair, depth) for pair in self.pairs}
+        self.tickers = {}
+        self.candles = {}
+        self.checksum_failures = 0
+        self.messages = 0
+        self.tick_at = {}   # pair -> time.perf_counter() of its last applied message
+        self._resync = set()
+        self._stop = threading.Event()
+        self._record_file = None
+        self.listeners = []
+        self.dispatcher = Dispatcher("Market data")
+        self.dispatcher.on('book', self._on_book)
+        self.dispatcher.on('ticker', self._on_ticker)
+        self.dispatcher.on('ohlc', self._on_ohlc)
+
+    # ---- accessors used by strategies ----
+
+    def best_bid(self, pair):
+        book = self.books.get(pair)
+        return book.best_bid if book and book.valid else None
+
+    def best_ask(self, pair):
+        book = self.books.get(pair)
+        return book.best_ask if book and book.valid else None
+
+    def mid(self, pair):
+        book = self.books.get(pair)
+        if book and book.valid and book.mid is not None:
+            return book.mid
+        ticker = self.tickers.get(pair)
+        if ticker:
+            return (float(ticker['b'][0]) + float(ticker['a'][0])) / 2
+        return None
+
+    def last_price(self, pair):
+        ticker = self.tickers.get(pair)
+        return float(ticker['c'][0]) if ticker else None
+
+    def tick_time(self, pair):
+        """time.perf_counter() of the pair's last update, for tick-to-order tracing."""
+        return self.tick_at.get(pair)
+
+    # ---- message handling ----
+
+    def add_listener(self, callback):
+        """Calls callback(channel, pair, feed) after each data message is applied."""
+        self.listeners.append(callback)
+
+    def subscriptions(self):
+        return [
+            {"name": "ticker"},
+            {"name": "book", "depth": self.depth},
+            {"name": "ohlc", "interval": self.ohlc_interval},
+        ]
+
+    def handle_message(self, data):
+        """Applies one decoded public-channel message."""
+        self.dispatcher.dispatch(data)
+
+    def _notify(self, channel, pair):
+        self.messages += 1
+        self.tick_at[pair] = time.perf_counter()
+        for listener in self.listeners:
+            try:
+                listener(channel, pair, self)
+            except Exception as e:
+                logging.error(f"Market data listener failed on {channel} {pair}: {e}")
+
+    # [channelID, payload..., channelName, pair]
+
+    def _on_ticker(self, channel, pair, data):
+        self.tickers[pair] = data[1]
+        self._notify(channel, pair)
+
+    def _on_ohlc(self, channel, pair, data):
+        self.candles[pair] = data[1]
+        self._notify(channel, pair)
+
+    def _on_book(self, channel, pair, data):
+        self._handle_book(pair, data[1:-2])
+        self._notify(channel, pair)
+
+    def _handle_book(self, pair, payload):
+        book = self.books.setdefault(pair, OrderBook(pair, self.depth))
+        if 'as' in payload[0] or 'bs' in payload[0]:
+            book.apply_snapshot(payload[0])
+            self._resync.discard(pair)
+        elif book.valid and not book.apply_update(*payload):
+            self.checksum_failures += 1
+            self._resync.add(pair)
+            logging.warning(f"Book checksum mismatch for {pair}; resubscribing.")
+
+    def replay(self, path, speed=None):
+        """Feeds a JSON-lines recording through handle_message.
+
+        With `speed` set, sleeps between messages to reproduce the recorded
+        timing (2.0 = twice as fast); otherwise replays as fast as possible.
+        """
+        previous = None
+        with open(path, 'r') as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = loads(line)
+                if speed and previous is not None:
+                    time.sleep(max(0.0, (entry['ts'] - previous) / speed))
+                previous = entry['ts']
+                self.handle_message(entry['msg'])
+        return self.messages
+
+    # ---- live connection ----
+
+    async def run(self):
+        """Connects, subscribes and applies messages until stop() is called."""
+        if self.record_path:
+            self._record_file = open(self.record_path, 'a')
+        try:
+            while not self._stop.is_set():
+                try:
+                    await self._run_once()
+                except (websockets.exceptions.WebSocketException, OSError) as e:
+                    logging.warning(f"Market data connection lost: {e}; reconnecting.")
+                    for book in self.books.values():
+                        book.valid = False
+                    await asyncio.sleep(RECONNECT_DELAY)
+        finally:
+            if self._record_file:
+                self._record_file.close()
+
+    async def _run_once(self):
+        async with websockets.connect(self.url) as websocket:
+            self.dispatcher.reset()
+            for subscription in self.subscriptions():
+                await websocket.send(json.dumps({"event": "subscribe", "pair": self.pairs,
+                                                 "subscription": subscription}))
+            logging.info(f"Subscribed to ticker/book/ohlc for {self.pairs}.")
+            while not self._stop.is_set():
+                try:
+                    raw = await asyncio.wait_for(websocket.recv(), timeout=1)
+                except asyncio.TimeoutError:
+                    continue
+                if self._record_file:
+                    # The frame is already JSON; embed it rather than re-encoding
+                    self._record_file.write(f'{{"ts": {time.time()}, "msg": {raw}}}\n')
+                self.dispatcher.dispatch(loads(raw))
+                if self._resync:
+                    await self._resubscribe_books(websocket)
+
+    async def _resubscribe_books(self, websocket):
+        pairs = sorted(self._resync)
+        self._resync.clear()
+        subscription = {"name": "book", "depth": self.depth}
+        await websocket.send(json.dumps({"event": "unsubscribe", "pair": pairs,
+                                         "subscription": subscription}))
+        await websocket.send(json.dumps({"event": "subscribe", "pair": pairs,
+                                         "subscription": subscription}))
+
+    def start_in_thread(self):
+        """Runs the feed on its own event loop in a daemon thread (for the sync bots)."""
+        thread = threading.Thread(target=lambda: asyncio.run(self.run()), daemon=True,
+                                  name="market-data")
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
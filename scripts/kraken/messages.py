@@ -0,0 +1,152 @@
+import json
+import logging
+import time
+from collections import Counter
+
+from scripts.uilities.metrics import metrics
+
+# ============================ Configuration ============================
+
+SUMMARY_INTERVAL = 60   # seconds between aggregated message-count log lines
+SAMPLE_EVERY = 1000     # log one full message in this many at DEBUG level
+
+# ============================ Decoder ============================
+
+def get_decoder(name=None):
+    """A json.loads-compatible decoder: orjson when installed (or asked for), else the stdlib.
+
+    Both return the same objects for Kraken's v1 messages, which carry
+    prices and volumes as strings.
+    """
+    if name in (None, 'orjson'):
+        try:
+            import orjson
+            return orjson.loads
+        except ImportError:
+            if name == 'orjson':
+                raise
+    return json.loads
+
+loads = get_decoder()
+
+# ============================ Counters ============================
+
+class MessageCounters:
+    """Per-channel message counts, logged as one summary line per interval.
+
+    Replaces logging every message: the hot loop only increments a counter,
+    and one message in `sample_every` is logged in full at DEBUG level.
+    """
+
+    def __init__(self, name, interval=SUMMARY_INTERVAL, sample_every=SAMPLE_EVERY):
+        self.name = name
+        self.interval = interval
+        self.sample_every = sample_every
+        self.counts = Counter()
+        self.total = 0
+        self._window = Counter()
+        self._window_started = time.monotonic()
+        metrics.add_collector(self)
+
+    def record(self, channel, data=None):
+        self.counts[channel] += 1
+        self._window[channel] += 1
+        self.total += 1
+        if self.sample_every and self.total % self.sample_every == 0:
+            logging.debug(f"{self.name}: sample {channel} message: {data}")
+        now = time.monotonic()
+        if now - self._window_started >= self.interval:
+            self.flush(now)
+
+    def collect(self):
+        """ws_messages_total samples for the metrics endpoint."""
+        for channel, count in list(self.counts.items()):
+            yield 'ws_messages_total', {"feed": self.name, "channel": channel}, count
+
+    def flush(self, now=None):
+        now = now or time.monotonic()
+        elapsed = now - self._window_started
+        if self._window:
+            rates = ', '.join(f"{channel} {count}" for channel, count in self._window.most_common())
+            logging.info(f"{self.name}: {sum(self._window.values())} messages in {elapsed:.0f}s ({rates})")
+        self._window.clear()
+        self._window_started = now
+
+# ============================ Dispatch ============================
+
+def _ignore(channel, pair, data):
+    pass
+
+class Dispatcher:
+    """Routes decoded Kraken v1 messages with one dict lookup per message.
+
+    Public data messages ([channelID, payload..., channelName, pair]) are
+    keyed by the channel id Kraken assigns in subscriptionStatus; the first
+    message on an id resolves its handler from the channel name ("book-10"
+    -> "book") and caches it. Private messages ([payload, channelName,
+    {"sequence": n}]) are keyed by channel name. Handlers are called as
+    handler(channel, pair, data) with the whole message; pair is None on
+    private channels. Events go to handler(event) by their "event" field.
+    """
+
+    def __init__(self, name="websocket", counters=None):
+        self.handlers = {}
+        self.event_handlers = {"subscriptionStatus": self._subscription_status}
+        self.routes = {}   # channel id or private channel name -> (handler, channel, pair)
+        self.counters = counters or MessageCounters(name)
+
+    def on(self, channel, handler):
+        """Registers handler for a channel name without its depth/interval suffix."""
+        self.handlers[channel] = handler
+        self.routes.clear()
+        return handler
+
+    def on_event(self, event, handler):
+        self.event_handlers[event] = handler
+        return handler
+
+    def reset(self):
+        """Forgets channel ids; they are only valid for one connection."""
+        self.routes.clear()
+
+    def _route(self, key, channel, pair):
+        handler = self.handlers.get(channel.split('-', 1)[0], _ignore)
+        route = self.routes[key] = (handler, channel, pair)
+        return route
+
+    def _subscription_status(self, event):
+        key = event.get('channelID', event.get('channelName'))
+        if key is None:
+            return
+        if event.get('status') == 'subscribed':
+            self._route(key, event.get('channelName', ''), event.get('pair'))
+        elif event.get('status') == 'unsubscribed':
+            self.routes.pop(key, None)
+        elif event.get('status') == 'error':
+            logging.error(f"{self.counters.name}: subscription failed: {event.get('errorMessage')}")
+
+    def dispatch(self, data):
+        if type(data) is dict:
+            event = data.get('event')
+            self.counters.record(event, data)
+            handler = self.event_handlers.get(event)
+            if handler is not None:
+                handler(data)
+            return
+        key = data[0]
+        if type(key) is not int:
+            key = data[1]
+        route = self.routes.get(key)
+        if route is None:
+            if type(data[0]) is int:
+                route = self._route(key, data[-2], data[-1])
+            else:
+                route = self._route(key, key, None)
+        handler, channel, pair = route
+        self.counters.record(channel, data)
+        handler(channel, pair, data)
+
+    def decode_and_dispatch(self, raw):
+        data = loads(raw)
+        self.dispatch(data)
+        return data
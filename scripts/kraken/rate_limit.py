@@ -0,0 +1,209 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+
+# ============================ Configuration ============================
+
+# Kraken's private REST call counter per verification tier: (max, decay per second)
+TIERS = {
+    "starter": (15, 0.33),
+    "intermediate": (20, 0.5),
+    "pro": (20, 1.0),
+}
+
+# Matching-engine (order placement) counter per pair: (max, decay per second)
+TRADING_TIERS = {
+    "starter": (60, 1.0),
+    "intermediate": (125, 2.34),
+    "pro": (180, 3.75),
+}
+
+PUBLIC_RATE = 1.0   # public requests per second per IP
+PUBLIC_BURST = 2
+
+PRIORITY_HIGH = 0    # order placement and cancellation
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2     # balance / open-order polling
+
+# Headroom on the private counter that only high-priority calls may use, so
+# polling can never leave an order cancellation waiting on the counter.
+HIGH_PRIORITY_RESERVE = 3
+
+# Cost on the private REST counter. AddOrder/EditOrder/CancelOrder are
+# limited by the per-pair trading counter instead and cost 0 here.
+ENDPOINT_COSTS = {
+    "/0/private/AddOrder": 0,
+    "/0/private/AddOrderBatch": 0,
+    "/0/private/EditOrder": 0,
+    "/0/private/CancelOrder": 0,
+    "/0/private/Ledgers": 2,
+    "/0/private/QueryLedgers": 2,
+    "/0/private/TradesHistory": 2,
+}
+TRADING_ENDPOINTS = {"/0/private/AddOrder", "/0/private/AddOrderBatch", "/0/private/EditOrder",
+                     "/0/private/CancelOrder"}
+
+ENDPOINT_PRIORITIES = {
+    "/0/private/AddOrder": PRIORITY_HIGH,
+    "/0/private/AddOrderBatch": PRIORITY_HIGH,
+    "/0/private/EditOrder": PRIORITY_HIGH,
+    "/0/private/CancelOrder": PRIORITY_HIGH,
+    "/0/private/CancelAll": PRIORITY_HIGH,
+    "/0/private/CancelAllOrdersAfter": PRIORITY_HIGH,
+    "/0/private/Balance": PRIORITY_LOW,
+    "/0/private/OpenOrders": PRIORITY_LOW,
+}
+
+# ============================ Counters ============================
+
+class DecayingCounter:
+    """Kraken-style counter: each call adds its cost, the total decays linearly."""
+
+    def __init__(self, max_count, decay_per_second):
+        self.max_count = max_count
+        self.decay = decay_per_second
+        self.value = 0.0
+        self._stamp = time.monotonic()
+
+    def level(self, now=None):
+        now = time.monotonic() if now is None else now
+        self.value = max(0.0, self.value - (now - self._stamp) * self.decay)
+        self._stamp = now
+        return self.value
+
+    def wait_time(self, cost, limit, now=None):
+        """Seconds until adding `cost` keeps the counter at or below `limit`."""
+        excess = self.level(now) + cost - limit
+        return 0.0 if excess <= 0 else excess / self.decay
+
+    def add(self, cost):
+        self.value += cost
+
+# ============================ Rate Limiter ============================
+
+class RateLimiter:
+    """Schedules Kraken REST calls against Kraken's own rate-limit model.
+
+    Private calls spend from a decaying per-key counter with per-endpoint
+    costs; order placement spends from a per-pair trading counter; public
+    calls use a separate per-IP bucket and never touch the private budget.
+    When calls compete, higher-priority ones go first, and low-priority
+    polling is kept out of the last HIGH_PRIORITY_RESERVE units of the
+    private counter.
+    """
+
+    def __init__(self, tier="starter", public_rate=PUBLIC_RATE, public_burst=PUBLIC_BURST):
+        max_count, decay = TIERS[tier]
+        trading_max, trading_decay = TRADING_TIERS[tier]
+        self.tier = tier
+        self.private = DecayingCounter(max_count, decay)
+        self.public = DecayingCounter(public_burst, public_rate)
+        self._trading = defaultdict(lambda: DecayingCounter(trading_max, trading_decay))
+        self._lock = threading.Condition()
+        self._waiting = defaultdict(int)  # priority -> callers currently blocked
+        self.waited = 0.0                 # total seconds callers spent waiting
+
+    @staticmethod
+    def priority_for(endpoint):
+        return ENDPOINT_PRIORITIES.get(endpoint, PRIORITY_NORMAL)
+
+    def _plan(self, endpoint, data, priority):
+        """Returns (wait_seconds, [(counter, cost), ...]) for one call. Lock held."""
+        now = time.monotonic()
+        if "/public/" in endpoint:
+            return self.public.wait_time(1, self.public.max_count, now), [(self.public, 1)]
+        cost = ENDPOINT_COSTS.get(endpoint, 1)
+        limit = self.private.max_count
+        if priority > PRIORITY_HIGH:
+            limit -= HIGH_PRIORITY_RESERVE
+        if any(self._waiting[p] for p in range(priority)):
+            # Someone more urgent is queued; let them go first
+            return max(0.05, self.private.wait_time(cost, limit, now)), []
+        wait = self.private.wait_time(cost, limit, now)
+        charges = [(self.private, cost)]
+        if endpoint in TRADING_ENDPOINTS:
+            counter = self._trading[(data or {}).get("pair", "")]
+            wait = max(wait, counter.wait_time(1, counter.max_count, now))
+            charges.append((counter, 1))
+        return wait, charges
+
+    def try_acquire(self, endpoint, data=None, priority=None):
+        """Spends the budget for one call if possible; otherwise returns the wait in seconds."""
+        priority = self.priority_for(endpoint) if priority is None else priority
+        with self._lock:
+            wait, charges = self._plan(endpoint, data, priority)
+            if wait > 0:
+                return wait
+            for counter, cost in charges:
+                counter.add(cost)
+            self._lock.notify_all()
+            return 0.0
+
+    def acquire(self, endpoint, data=None, priority=None):
+        """Blocks until the call fits within Kraken's limits, then spends its budget."""
+        priority = self.priority_for(endpoint) if priority is None else priority
+        start = time.monotonic()
+        with self._lock:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    self._waiting[priority] -= 1
+                    wait, charges = self._plan(endpoint, data, priority)
+                    self._waiting[priority] += 1
+                    if wait <= 0:
+                        for counter, cost in charges:
+                            counter.add(cost)
+                        break
+                    self._lock.wait(wait)
+            finally:
+                self._waiting[priority] -= 1
+                self._lock.notify_all()
+        self.waited += time.monotonic() - start
+
+    async def acquire_async(self, endpoint, data=None, priority=None):
+        """asyncio version of acquire(); sleeps on the loop instead of blocking it."""
+        priority = self.priority_for(endpoint) if priority is None else priority
+        start = time.monotonic()
+        with self._lock:
+            self._waiting[priority] += 1
+        try:
+            while True:
+                with self._lock:
+                    self._waiting[priority] -= 1
+                    wait = self.try_acquire(endpoint, data, priority)
+                    self._waiting[priority] += 1
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+        finally:
+            with self._lock:
+                self._waiting[priority] -= 1
+        self.waited += time.monotonic() - start
+
+    def penalise(self, endpoint, data=None, error=None):
+        """Called when Kraken answers a rate-limit error: assume the exceeded counter is full.
+
+        EOrder:Rate limit exceeded on an order endpoint is the pair's
+        trading counter (AddOrder costs nothing on the private one);
+        EAPI:Rate limit exceeded is the private or public call counter.
+        """
+        with self._lock:
+            if endpoint in TRADING_ENDPOINTS and not (error or '').startswith('EAPI:'):
+                counter = self._trading[(data or {}).get("pair", "")]
+            else:
+                counter = self.public if "/public/" in endpoint else self.private
+            counter.level()
+            counter.value = float(counter.max_count)
+
+    def utilisation(self):
+        """How close each counter is to its limit, from 0.0 (idle) to 1.0 (at the limit)."""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "private": self.private.level(now) / self.private.max_count,
+                "public": self.public.level(now) / self.public.max_count,
+                "trading": {pair: counter.level(now) / counter.max_count
+                            for pair, counter in self._trading.items()},
+                "waiting": {priority: count for priority, count in self._waiting.items() if count},
+            }
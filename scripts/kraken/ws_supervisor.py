@@ -0,0 +1,249 @@
+import asyncio
+import inspect
+import json
+import logging
+import random
+import time
+
+import websockets
+
+from scripts.kraken.messages import loads
+from scripts.uilities.latency import LatencyHistogram
+from scripts.uilities.metrics import metrics
+
+# ============================ Configuration ============================
+
+BACKOFF_BASE = 0.25      # seconds before the first retry
+BACKOFF_MAX = 30.0       # cap on the reconnect delay
+STALE_AFTER = 10.0       # seconds without any message (Kraken heartbeats ~1/s) before reconnecting
+PING_INTERVAL = 5.0      # WebSocket-level ping; a missed pong closes the connection
+PING_TIMEOUT = 5.0
+TOKEN_REFRESH = 600      # seconds; Kraken tokens must be used within 15 minutes of issue
+
+# ============================ Supervisor ============================
+
+class WebSocketSupervisor:
+    """Keeps one Kraken WebSocket connection and its subscriptions alive.
+
+    Reconnects with full-jitter exponential backoff (reset once a connection
+    delivers data), fetches a fresh auth token when the cached one is near
+    expiry (refreshing it in the background while connected, so a reconnect
+    never waits on REST), resubscribes every channel on each connect and
+    tears down connections that go quiet for STALE_AFTER seconds.
+
+    Sequenced private channels (ownTrades, openOrders) are checked for gaps;
+    `on_gap(channel, expected, received)` is called so the caller can
+    reconcile over REST, as is `on_reconnect()` after every reconnection,
+    since messages sent while disconnected are not replayed. The time from
+    starting a reconnect to the first channel data message on the new
+    connection is recorded in `reconnect_latency`.
+    """
+
+    def __init__(self, url, subscriptions, on_message, token_provider=None, token=None,
+                 on_gap=None, on_reconnect=None, name=None, stale_after=STALE_AFTER,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX, ping_interval=PING_INTERVAL):
+        self.url = url
+        self.subscriptions = list(subscriptions)
+        self.on_message = on_message
+        self.token_provider = token_provider
+        self.on_gap = on_gap
+        self.on_reconnect = on_reconnect
+        self.name = name or url
+        self.stale_after = stale_after
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.ping_interval = ping_interval
+
+        self.connected = False
+        self.connections = 0
+        self.reconnects = 0
+        self.stale_disconnects = 0
+        self.gaps = 0
+        self.messages = 0
+        self.last_message_at = 0.0
+        self.reconnect_latency = LatencyHistogram()
+        self._token = token
+        self._token_at = time.monotonic() if token else 0.0
+        self._sequences = {}
+        self._websocket = None
+        self._delivered = False
+        self._stopping = False
+        metrics.add_collector(self)
+
+    # ---- token ----
+
+    async def _fetch_token(self):
+        token = self.token_provider()
+        if inspect.isawaitable(token):
+            token = await token
+        if not token:
+            raise ConnectionError("Could not get a WebSocket token")
+        self._token, self._token_at = token, time.monotonic()
+        return token
+
+    async def token(self, force=False):
+        """The cached token, refetched when forced or older than TOKEN_REFRESH."""
+        if self.token_provider is None:
+            return None
+        if force or self._token is None or time.monotonic() - self._token_at > TOKEN_REFRESH:
+            await self._fetch_token()
+        return self._token
+
+    async def _refresh_token_loop(self):
+        while True:
+            await asyncio.sleep(max(1.0, TOKEN_REFRESH - (time.monotonic() - self._token_at)))
+            try:
+                await self._fetch_token()
+                logging.info(f"{self.name}: refreshed WebSocket token.")
+            except Exception as e:
+                logging.warning(f"{self.name}: token refresh failed: {e}")
+                await asyncio.sleep(30)
+
+    # ---- connection ----
+
+    def _subscribe_messages(self, token):
+        """One subscribe event per {"name": ..., ["pair": [...]], ...} subscription."""
+        for subscription in self.subscriptions:
+            details = dict(subscription)
+            pairs = details.pop("pair", None)
+            if token:
+                details["token"] = token
+            message = {"event": "subscribe", "subscription": details}
+            if pairs:
+                message["pair"] = list(pairs)
+            yield message
+
+    def _check_sequence(self, data):
+        """[payload, channelName, {"sequence": n}] on private channels."""
+        if len(data) < 3 or not isinstance(data[-1], dict) or "sequence" not in data[-1]:
+            return
+        channel, sequence = data[-2], data[-1]["sequence"]
+        expected = self._sequences.get(channel)
+        if expected is not None and sequence != expected:
+            self.gaps += 1
+            logging.warning(f"{self.name}: {channel} sequence gap, expected {expected} got {sequence}.")
+            if self.on_gap:
+                self.on_gap(channel, expected, sequence)
+        self._sequences[channel] = sequence + 1
+
+    async def _receive(self, websocket, started):
+        """Reads until the connection closes, goes stale or loses its token."""
+        while True:
+            # asyncio.wait rather than wait_for, which can swallow a cancel
+            receive = asyncio.ensure_future(websocket.recv())
+            try:
+                done, _ = await asyncio.wait({receive}, timeout=self.stale_after)
+            finally:
+                # Always collect recv()'s outcome, even when this task is being
+                # cancelled, or asyncio logs an unretrieved ConnectionClosed
+                if not receive.done():
+                    receive.cancel()
+                    await asyncio.gather(receive, return_exceptions=True)
+                elif not receive.cancelled():
+                    receive.exception()
+            if not done:
+                self.stale_disconnects += 1
+                logging.warning(f"{self.name}: no message for {self.stale_after}s; reconnecting.")
+                return
+            raw = receive.result()
+            self.last_message_at = time.monotonic()
+            data = loads(raw)
+            if isinstance(data, dict):
+                event = data.get("event")
+                if event == "subscriptionStatus" and data.get("status") == "error":
+                    message = data.get("errorMessage", "")
+                    logging.error(f"{self.name}: subscription failed: {message}")
+                    if "token" in message.lower():
+                        self._token = None     # fetch a new one on the next connect
+                        self._delivered = False  # and back off in case it keeps failing
+                        return
+                elif event not in ("heartbeat", "pong"):
+                    logging.info(f"{self.name}: {data}")
+                continue
+            if not self._delivered:
+                # Only channel data counts: a server that sends its status
+                # events and closes must still be backed off from
+                self.reconnect_latency.record(self.last_message_at - started)
+                self._delivered = True
+            self.messages += 1
+            self._check_sequence(data)
+            try:
+                self.on_message(data)
+            except Exception as e:
+                logging.error(f"{self.name}: message handler failed: {e!r}")
+
+    async def _connect_once(self, started):
+        self._delivered = False
+        token = await self.token()
+        async with websockets.connect(self.url, ping_interval=self.ping_interval,
+                                      ping_timeout=PING_TIMEOUT) as websocket:
+            self._websocket = websocket
+            self.connected = True
+            self.connections += 1
+            if self.connections > 1 and self.on_reconnect:
+                self.on_reconnect()
+            # A new subscription restarts each channel's sequence at 1
+            self._sequences.clear()
+            for message in self._subscribe_messages(token):
+                await websocket.send(json.dumps(message))
+            try:
+                await self._receive(websocket, started)
+            finally:
+                self.connected = False
+                self._websocket = None
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def run(self):
+        """Connects and reconnects until stop() is called or the task is cancelled."""
+        refresher = asyncio.create_task(self._refresh_token_loop()) if self.token_provider else None
+        attempt = 0
+        try:
+            while not self._stopping:
+                started = time.monotonic()
+                try:
+                    await self._connect_once(started)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logging.warning(f"{self.name}: connection lost: {e!r}")
+                if self._stopping:
+                    break
+                # A connection that delivered data resets the backoff
+                attempt = 0 if self._delivered else attempt + 1
+                self.reconnects += 1
+                delay = self._backoff(attempt) if attempt else 0.0
+                if delay:
+                    logging.info(f"{self.name}: reconnecting in {delay:.2f}s (attempt {attempt}).")
+                    await asyncio.sleep(delay)
+        finally:
+            if refresher:
+                refresher.cancel()
+
+    async def stop(self):
+        self._stopping = True
+        if self._websocket is not None:
+            await self._websocket.close()
+
+    def collect(self):
+        """Connection counters for the metrics endpoint."""
+        labels = {"feed": self.name}
+        yield 'ws_connections_total', labels, self.connections
+        yield 'ws_reconnects_total', labels, self.reconnects
+        yield 'ws_stale_disconnects_total', labels, self.stale_disconnects
+        yield 'ws_sequence_gaps_total', labels, self.gaps
+        yield 'ws_private_messages_total', labels, self.messages
+
+    def metrics(self):
+        return {
+            "connected": self.connected,
+            "connections": self.connections,
+            "reconnects": self.reconnects,
+            "stale_disconnects": self.stale_disconnects,
+            "sequence_gaps": self.gaps,
+            "messages": self.messages,
+            "seconds_since_message": (time.monotonic() - self.last_message_at
+                                      if self.last_message_at else None),
+            "reconnect_to_first_message_ms": self.reconnect_latency.snapshot(),
+        }
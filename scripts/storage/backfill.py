@@ -0,0 +1,298 @@
+"""Backfills Kraken's public Trades and OHLC history into per-pair column stores.
+
+    python -m scripts.storage.backfill [--pairs SHIB/USD XRP/USD] [--kinds trades ohlc]
+        [--start 2024-12-01] [--base-url URL] [--rate N] [--csv [PATH]] [--record PATH]
+
+Every (kind, pair) stream pages through its endpoint with `since`, and all
+streams run concurrently on one event loop, sharing the client's public
+rate limiter. Each page is sorted, deduplicated against the last committed
+row and appended to data/history/<kind>/<PAIR> together with the next
+`since` in the same meta.json commit, so an interrupted run resumes at the
+last committed page without writing a row twice.
+
+Kraken serves the whole trade history through Trades, but only the most
+recent 720 candles through OHLC; deep bar history comes from trades. --csv
+streams one pair into data/historical_data.csv as
+timestamp,open,high,low,close,volume bars (trades aggregated into
+--interval minute bars chunk by chunk), the format the backtester and
+trainer read. --record appends every page fetched as
+{"path", "params", "response"} JSON lines, which scripts.bench.fake_kraken
+serves back.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from scripts.backtesting.engine import HISTORICAL_DATA_FILE
+from scripts.kraken.async_client import AsyncKrakenClient
+from scripts.kraken.client import KRAKEN_API_URL, KrakenClient
+from scripts.kraken.rate_limit import PUBLIC_BURST, PUBLIC_RATE, RateLimiter
+from scripts.storage.columnar import ColumnStore
+from scripts.uilities.log_config import LOG_DIR, configure_logging
+
+# ============================ Configuration ============================
+
+HISTORY_DIR = os.path.join('data', 'history')
+DEFAULT_PAIRS = ("SHIB/USD", "XRP/USD", "XBT/USD")
+KINDS = ("trades", "ohlc")
+ENDPOINTS = {"trades": "/0/public/Trades", "ohlc": "/0/public/OHLC"}
+OHLC_INTERVAL = 1        # minutes
+DEFAULT_DAYS = 7         # trade history fetched when neither --start nor a checkpoint exists
+EXPORT_CHUNK_ROWS = 100_000
+CSV_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+# ============================ Pages ============================
+
+def store_dir(kind, pair, interval=OHLC_INTERVAL, history_dir=HISTORY_DIR):
+    name = f"ohlc-{interval}" if kind == 'ohlc' else kind
+    return os.path.join(history_dir, name, pair.replace('/', ''))
+
+def page_rows(result):
+    """(rows, last) from a Trades/OHLC result: {<Kraken pair name>: [...], "last": cursor}."""
+    rows = next((value for key, value in result.items() if key != 'last'), [])
+    return rows, result.get('last')
+
+def trade_records(rows, last=None):
+    """[price, volume, time, side, ordertype, misc, trade_id] rows as store records."""
+    return [{
+        'timestamp': int(round(float(row[2]) * 1e6)) * 1000,
+        'price': row[0],
+        'volume': row[1],
+        'side': 'buy' if row[3] == 'b' else 'sell',
+        'ordertype': 'market' if row[4] == 'm' else 'limit',
+        'trade_id': row[6] if len(row) > 6 else -1,
+    } for row in rows]
+
+def ohlc_records(rows, last=None):
+    """[time, open, high, low, close, vwap, volume, count] rows as store records.
+
+    The last candle Kraken returns is still open; only candles before
+    `last` are committed and kept.
+    """
+    committed = int(last) if last is not None else None
+    return [{
+        'timestamp': int(row[0]) * 10**9,
+        'open': row[1], 'high': row[2], 'low': row[3], 'close': row[4],
+        'vwap': row[5], 'volume': row[6], 'count': row[7],
+    } for row in rows if committed is None or int(row[0]) < committed]
+
+def trade_key(record):
+    # Trade ids are unique per pair; the rest only orders id-less (older) responses
+    return record['timestamp'], int(record['trade_id']), float(record['price']), float(record['volume'])
+
+def ohlc_key(record):
+    return record['timestamp'],
+
+PARSERS = {"trades": (trade_records, trade_key), "ohlc": (ohlc_records, ohlc_key)}
+
+def new_records(records, key, last_key=None):
+    """Records sorted by key, without duplicates and without anything up to last_key."""
+    records.sort(key=key)
+    fresh, previous = [], tuple(last_key) if last_key is not None else None
+    for record in records:
+        current = key(record)
+        if previous is None or current > previous:
+            fresh.append(record)
+            previous = current
+    return fresh
+
+def initial_since(kind, start):
+    """The first Trades `since` in nanoseconds; OHLC starts from whatever Kraken still serves."""
+    if kind == 'ohlc':
+        return None
+    if start is None:
+        return str(time.time_ns() - DEFAULT_DAYS * 86400 * 10**9)
+    return str(int(np.datetime64(start, 'ns').astype(np.int64)))
+
+# ============================ Backfill ============================
+
+class PageRecorder:
+    """Appends every fetched page as a JSON line for replay by a stand-in server."""
+
+    def __init__(self, path):
+        self.file = open(path, 'a')
+
+    def __call__(self, endpoint, params, response):
+        self.file.write(json.dumps({"path": endpoint, "params": params, "response": response}) + '\n')
+
+    def close(self):
+        self.file.close()
+
+async def backfill_stream(client, kind, pair, history_dir=HISTORY_DIR, start=None, end=None,
+                          interval=OHLC_INTERVAL, max_pages=None, recorder=None):
+    """Pages one (kind, pair) stream into its store; returns the number of rows added.
+
+    Stops at the first page that adds nothing, when `last` stops advancing,
+    once rows reach `end` (ns; the run's start time by default, so a live
+    run terminates) or after `max_pages`.
+    """
+    parse, key = PARSERS[kind]
+    store = ColumnStore(store_dir(kind, pair, interval, history_dir))
+    cursor = store.meta.get('cursor') or {}
+    since = cursor.get('since') or initial_since(kind, start)
+    end = time.time_ns() if end is None else end
+    params = {"pair": pair.replace('/', '')}
+    if kind == 'ohlc':
+        params["interval"] = interval
+    pages = added = 0
+    while max_pages is None or pages < max_pages:
+        request = dict(params, since=since) if since is not None else dict(params)
+        response = await client.public(ENDPOINTS[kind], request)
+        if recorder:
+            recorder(ENDPOINTS[kind], request, response)
+        if response.get('error'):
+            logging.error(f"Backfill {kind} {pair}: {response['error']}")
+            break
+        rows, last = page_rows(response.get('result') or {})
+        records = new_records(parse(rows, last), key, cursor.get('key'))
+        reached_end = bool(records) and records[-1]['timestamp'] >= end
+        if reached_end:
+            records = [record for record in records if record['timestamp'] < end]
+        advanced = last is not None and str(last) != str(since)
+        # Past `end` the page is refetched next run; the key skips what was kept
+        cursor = {"since": str(last) if advanced and not reached_end else since,
+                  "key": list(key(records[-1])) if records else cursor.get('key')}
+        store.commit(records, cursor)
+        pages += 1
+        added += len(records)
+        if not records or not advanced or reached_end:
+            break
+        since = cursor['since']
+    logging.info(f"Backfill {kind} {pair}: {added} rows in {pages} pages ({len(store)} stored).")
+    return added
+
+async def backfill(pairs=DEFAULT_PAIRS, kinds=KINDS, history_dir=HISTORY_DIR, start=None, end=None,
+                   interval=OHLC_INTERVAL, base_url=KRAKEN_API_URL, rate=PUBLIC_RATE,
+                   burst=PUBLIC_BURST, max_pages=None, record=None):
+    """Backfills every (kind, pair) stream concurrently; returns {(kind, pair): rows added}.
+
+    A failed stream is logged and reported as None; the others carry on.
+    """
+    client = KrakenClient(base_url, rate_limiter=RateLimiter(public_rate=rate, public_burst=burst))
+    async_client = AsyncKrakenClient(client)
+    recorder = PageRecorder(record) if record else None
+    streams = [(kind, pair) for kind in kinds for pair in pairs]
+    try:
+        results = await asyncio.gather(
+            *(backfill_stream(async_client, kind, pair, history_dir, start, end, interval,
+                              max_pages, recorder) for kind, pair in streams),
+            return_exceptions=True)
+    finally:
+        await async_client.close()
+        client.close()
+        if recorder:
+            recorder.close()
+    added = {}
+    for stream, result in zip(streams, results):
+        if isinstance(result, BaseException):
+            logging.error(f"Backfill {stream[0]} {stream[1]} failed: {result!r}")
+            result = None
+        added[stream] = result
+    return added
+
+# ============================ CSV Export ============================
+
+def _bars(times, price, volume, width):
+    """OHLCV bars from time-ordered trades (times in ns) bucketed by `width` ns."""
+    bucket = times // width
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(bucket)]
+    return {
+        'timestamp': bucket[starts] * width,
+        'open': price[starts],
+        'high': np.maximum.reduceat(price, starts),
+        'low': np.minimum.reduceat(price, starts),
+        'close': price[ends - 1],
+        'volume': np.add.reduceat(volume, starts),
+    }
+
+def trade_bars(store, seconds, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yields OHLCV bar chunks from a trades store, reading chunk_rows trades at a time.
+
+    The last bucket of a chunk may continue in the next one, so its trades
+    are carried over instead of emitted.
+    """
+    width = seconds * 10**9
+    rows = len(store)
+    carry = None
+    for lo in range(0, rows, chunk_rows):
+        hi = min(rows, lo + chunk_rows)
+        columns = store.columns(lo, hi, names=['timestamp', 'price', 'volume'])
+        times = np.asarray(columns['timestamp']).view('i8')
+        price, volume = np.asarray(columns['price']), np.asarray(columns['volume'])
+        if carry is not None:
+            times, price, volume = (np.concatenate(pair) for pair in zip(carry, (times, price, volume)))
+        cut = len(times) if hi == rows else int(np.searchsorted(times // width, times[-1] // width))
+        carry = times[cut:], price[cut:], volume[cut:]
+        if cut:
+            yield _bars(times[:cut], price[:cut], volume[:cut], width)
+
+def ohlc_bars(store, chunk_rows=EXPORT_CHUNK_ROWS):
+    rows = len(store)
+    for lo in range(0, rows, chunk_rows):
+        columns = store.columns(lo, min(rows, lo + chunk_rows), names=list(CSV_COLUMNS))
+        columns['timestamp'] = np.asarray(columns['timestamp']).view('i8')
+        yield columns
+
+def export_csv(source_dir, path=HISTORICAL_DATA_FILE, interval=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Streams a store into a timestamp,open,high,low,close,volume CSV; returns the bar count.
+
+    A trades store is aggregated into `interval`-minute bars; an OHLC store
+    is copied. Timestamps are Unix seconds. The file is replaced atomically.
+    """
+    store = ColumnStore(source_dir)
+    chunks = trade_bars(store, interval * 60, chunk_rows) if interval else ohlc_bars(store, chunk_rows)
+    tmp = path + '.tmp'
+    written = 0
+    with open(tmp, 'w') as file:
+        file.write(','.join(CSV_COLUMNS) + '\n')
+        for bars in chunks:
+            table = np.column_stack([bars['timestamp'] // 10**9] +
+                                    [np.asarray(bars[name], dtype=np.float64) for name in CSV_COLUMNS[1:]])
+            np.savetxt(file, table, fmt=['%d'] + ['%.12g'] * 5, delimiter=',')
+            written += len(table)
+    os.replace(tmp, path)
+    logging.info(f"Exported {written} bars from {source_dir} to {path}.")
+    return written
+
+# ============================ Main ============================
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill Kraken public trade and OHLC history.")
+    parser.add_argument('--pairs', nargs='+', default=list(DEFAULT_PAIRS))
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS))
+    parser.add_argument('--start', help=f"date or datetime to start from (default: {DEFAULT_DAYS} days ago)")
+    parser.add_argument('--interval', type=int, default=OHLC_INTERVAL, help="bar size in minutes")
+    parser.add_argument('--history-dir', default=HISTORY_DIR)
+    parser.add_argument('--base-url', default=KRAKEN_API_URL)
+    parser.add_argument('--rate', type=float, default=PUBLIC_RATE, help="public requests per second")
+    parser.add_argument('--burst', type=int, default=PUBLIC_BURST)
+    parser.add_argument('--max-pages', type=int, help="per stream, for a bounded run")
+    parser.add_argument('--record', help="append every page fetched to this JSON-lines file")
+    parser.add_argument('--csv', nargs='?', const=HISTORICAL_DATA_FILE,
+                        help=f"export the first pair's bars (default path {HISTORICAL_DATA_FILE})")
+    args = parser.parse_args()
+    configure_logging(os.path.join(LOG_DIR, 'backfill.log'), console=True)
+
+    started = time.perf_counter()
+    added = asyncio.run(backfill(args.pairs, args.kinds, args.history_dir, args.start, None,
+                                 args.interval, args.base_url, args.rate, args.burst,
+                                 args.max_pages, args.record))
+    for (kind, pair), rows in added.items():
+        print(f"{kind:7s} {pair:10s} {'failed' if rows is None else f'{rows:,} rows'}")
+    print(f"Backfill finished in {time.perf_counter() - started:.1f}s")
+
+    if args.csv:
+        trades = ColumnStore(store_dir('trades', args.pairs[0], history_dir=args.history_dir))
+        if len(trades):
+            export_csv(trades.directory, args.csv, interval=args.interval)
+        else:
+            export_csv(store_dir('ohlc', args.pairs[0], args.interval, args.history_dir), args.csv)
+
+if __name__ == "__main__":
+    main()
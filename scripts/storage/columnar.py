@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, one writer per store is assumed
+    fcntl = None
+
+# ============================ Configuration ============================
+
+META_FILE = 'meta.json'
+LOCK_FILE = 'write.lock'
+TIME_COLUMN = 'timestamp'
+TIME_DTYPE = 'M8[ns]'
+FLOAT_DTYPE = 'f8'
+TEXT_DTYPE = 'U32'  # pair names, order ids, sides; longer values are truncated
+
+# ============================ Helper Functions ============================
+
+def _infer_dtype(name, values):
+    if name == TIME_COLUMN:
+        return TIME_DTYPE
+    for value in values:
+        if value is None or value == '':
+            continue
+        try:
+            float(value)
+        except (TypeError, ValueError):
+            return TEXT_DTYPE
+    return FLOAT_DTYPE
+
+def _to_array(values, dtype):
+    if dtype == TIME_DTYPE:
+        return np.array([v if v not in (None, '') else 'NaT' for v in values],
+                        dtype='datetime64[ns]')
+    if dtype == FLOAT_DTYPE:
+        out = np.empty(len(values), dtype=FLOAT_DTYPE)
+        for i, value in enumerate(values):
+            try:
+                out[i] = float(value)
+            except (TypeError, ValueError):
+                out[i] = np.nan
+        return out
+    return np.array(['' if v is None else str(v) for v in values], dtype=dtype)
+
+def _empty_value(dtype):
+    if dtype == TIME_DTYPE:
+        return np.datetime64('NaT')
+    if dtype == FLOAT_DTYPE:
+        return np.nan
+    return ''
+
+# ============================ Column Store ============================
+
+class ColumnStore:
+    """Append-only columnar table backed by one raw binary file per column.
+
+    Columns are fixed-width NumPy arrays read through np.memmap, so a time
+    window or the last N rows is a slice of the mapped file rather than a
+    parse of the whole history. `timestamp` is the index column; while rows
+    arrive in time order a window lookup is a binary search.
+
+    meta.json is the commit point: it records the schema, the committed row
+    count and the journal cursor, and is replaced atomically after the column
+    files have been appended. Bytes past the committed row count (a crash
+    between the two) are truncated on the next append.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.meta = self._load_meta()
+
+    # ---- metadata ----
+
+    def _load_meta(self):
+        path = os.path.join(self.directory, META_FILE)
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                return json.load(file)
+        return {"schema": [], "rows": 0, "sorted": True, "cursor": None}
+
+    def _save_meta(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, META_FILE)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as file:
+            json.dump(self.meta, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, path)
+
+    def refresh(self):
+        """Re-reads meta.json to see rows committed by another process."""
+        self.meta = self._load_meta()
+
+    @contextmanager
+    def locked(self):
+        """Holds the store's exclusive write lock, then reloads meta.json.
+
+        Writers in different processes (e.g. several dashboard sessions)
+        serialise on LOCK_FILE, and each starts from the rows and cursor the
+        previous one committed.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, LOCK_FILE), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                yield self
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    @property
+    def schema(self):
+        return dict(self.meta['schema'])
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def _column_path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    # ---- writing ----
+
+    def append(self, records):
+        """Appends a batch of dict records and commits them."""
+        if not records:
+            return 0
+        rows = self.meta['rows']
+        schema = self.schema
+        names = list(schema)
+        for record in records:
+            for key in record:
+                if key not in schema:
+                    schema[key] = _infer_dtype(key, [r.get(key) for r in records])
+                    names.append(key)
+                    self._add_column(key, schema[key], rows)
+        if TIME_COLUMN not in schema:
+            schema[TIME_COLUMN] = TIME_DTYPE
+            names.insert(0, TIME_COLUMN)
+            self._add_column(TIME_COLUMN, TIME_DTYPE, rows)
+
+        now = np.datetime64(time.time_ns(), 'ns')
+        os.makedirs(self.directory, exist_ok=True)
+        for name in names:
+            dtype = schema[name]
+            values = _to_array([r.get(name) for r in records], dtype)
+            if name == TIME_COLUMN:
+                # Records without a timestamp are stamped at ingestion time
+                values[np.isnat(values)] = now
+                self._check_order(values, rows)
+            path = self._column_path(name)
+            self._truncate(path, rows, dtype)
+            with open(path, 'ab') as file:
+                file.write(values.astype(dtype, copy=False).tobytes())
+
+        self.meta['schema'] = [[name, schema[name]] for name in names]
+        self.meta['rows'] = rows + len(records)
+        self._save_meta()
+        return len(records)
+
+    def _add_column(self, name, dtype, rows):
+        """Creates a new column file backfilled for the existing rows."""
+        os.makedirs(self.directory, exist_ok=True)
+        filler = np.full(rows, _empty_value(dtype), dtype=dtype)
+        with open(self._column_path(name), 'wb') as file:
+            file.write(filler.tobytes())
+
+    def _truncate(self, path, rows, dtype):
+        committed = rows * np.dtype(dtype).itemsize
+        if os.path.exists(path) and os.path.getsize(path) > committed:
+            with open(path, 'rb+') as file:
+                file.truncate(committed)
+
+    def _check_order(self, values, rows):
+        if not self.meta.get('sorted', True):
+            return
+        ints = values.view('i8')
+        ordered = bool(np.all(ints[1:] >= ints[:-1])) if len(ints) > 1 else True
+        if ordered and rows:
+            ordered = ints[0] >= self._mapped(TIME_COLUMN)[-1].view('i8')
+        if not ordered:
+            logging.warning(f"Out-of-order timestamps in {self.directory}; "
+                            f"time windows fall back to a full scan.")
+            self.meta['sorted'] = False
+
+    def commit(self, records, cursor):
+        """Appends records and moves the cursor in the same meta.json commit.
+
+        A reader resuming from the cursor therefore never sees a row twice or
+        misses one, whichever side of the commit a crash lands on.
+        """
+        self.meta['cursor'] = cursor
+        if records:
+            return self.append(records)
+        self._save_meta()
+        return 0
+
+    def sync_from_journal(self, reader):
+        """Ingests journal records written since the last sync.
+
+        Only the bytes appended to the journal after the stored cursor are
+        parsed, so this costs O(new records) per call. Reading the cursor,
+        appending and committing happen under the write lock, so concurrent
+        syncs never ingest the same records twice.
+        """
+        with self.locked():
+            records, cursor = reader.read_since(self.meta.get('cursor'))
+            if cursor is not None:
+                cursor = list(cursor)
+            if records or cursor != self.meta.get('cursor'):
+                self.commit(records, cursor)
+        return len(records)
+
+    # ---- reading ----
+
+    def _mapped(self, name):
+        dtype = self.schema[name]
+        rows = self.meta['rows']
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._column_path(name), dtype=dtype, mode='r', shape=(rows,))
+
+    def index_range(self, start=None, end=None):
+        """Returns (lo, hi) row bounds for timestamps in [start, end)."""
+        rows = self.meta['rows']
+        if rows == 0 or TIME_COLUMN not in self.schema:
+            return 0, 0
+        times = self._mapped(TIME_COLUMN)
+        lo, hi = 0, rows
+        if start is not None:
+            lo = int(np.searchsorted(times, np.datetime64(start, 'ns'), side='left'))
+        if end is not None:
+            hi = int(np.searchsorted(times, np.datetime64(end, 'ns'), side='left'))
+        return lo, max(lo, hi)
+
+    def columns(self, lo=0, hi=None, names=None):
+        """Returns {name: array} views over rows [lo, hi) without copying."""
+        names = names or list(self.schema)
+        return {name: self._mapped(name)[lo:hi] for name in names}
+
+    def window(self, start=None, end=None, names=None):
+        """Returns column views for rows with start <= timestamp < end."""
+        if self.meta.get('sorted', True):
+            lo, hi = self.index_range(start, end)
+            return self.columns(lo, hi, names)
+        times = self._mapped(TIME_COLUMN)
+        mask = np.ones(len(times), dtype=bool)
+        if start is not None:
+            mask &= times >= np.datetime64(start, 'ns')
+        if end is not None:
+            mask &= times < np.datetime64(end, 'ns')
+        return {name: np.asarray(col)[mask] for name, col in self.columns(names=names).items()}
+
+    def last(self, n, names=None):
+        """Returns column views for the most recent `n` rows."""
+        rows = self.meta['rows']
+        return self.columns(max(0, rows - n), rows, names)
+
+    @staticmethod
+    def to_frame(columns):
+        """Builds a DataFrame from the arrays returned by window()/last()."""
+        import pandas as pd
+
+        return pd.DataFrame({name: np.asarray(values) for name, values in columns.items()})
@@ -0,0 +1,394 @@
+import atexit
+import csv
+import io
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+# ============================ Configuration ============================
+
+FSYNC_ALWAYS = 'always'      # fsync after every flushed batch
+FSYNC_INTERVAL = 'interval'  # fsync at most once every `fsync_interval` seconds
+FSYNC_NEVER = 'never'        # leave durability to the OS page cache
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER)
+
+DEFAULT_FLUSH_ROWS = 100
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_FSYNC_INTERVAL = 5.0
+DEFAULT_MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+
+# Sequence number used for a pre-journal file (e.g. an old trade_log.csv
+# written by the read-modify-write code). It is read first and never written.
+LEGACY_SEGMENT = -1
+
+# ============================ Segment Helpers ============================
+
+def segment_path(base_path, seq):
+    """Returns the file name of segment `seq`, e.g. trade_log.000003.csv."""
+    if seq == LEGACY_SEGMENT:
+        return base_path
+    stem, ext = os.path.splitext(base_path)
+    return f"{stem}.{seq:06d}{ext}"
+
+def list_segments(base_path):
+    """Returns [(seq, path), ...] for every segment of a journal, oldest first."""
+    directory = os.path.dirname(base_path) or '.'
+    stem, ext = os.path.splitext(os.path.basename(base_path))
+    pattern = re.compile(re.escape(stem) + r'\.(\d{6})' + re.escape(ext) + '$')
+    segments = []
+    if os.path.exists(base_path):
+        segments.append((LEGACY_SEGMENT, base_path))
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            match = pattern.match(name)
+            if match:
+                segments.append((int(match.group(1)), os.path.join(directory, name)))
+    segments.sort()
+    return segments
+
+def recover_segment(path):
+    """Truncates a torn trailing record left by a crash mid-write.
+
+    Every record is exactly one line, so anything after the last newline is
+    an incomplete write. Returns the number of bytes dropped.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0
+    with open(path, 'rb+') as file:
+        # Walk backwards in blocks until we find the last newline
+        pos = size
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            file.seek(pos)
+            block = file.read(step)
+            idx = block.rfind(b'\n')
+            if idx != -1:
+                keep = pos + idx + 1
+                break
+        else:
+            keep = 0
+        if keep < size:
+            file.truncate(keep)
+            file.flush()
+            os.fsync(file.fileno())
+            logging.warning(f"Recovered journal segment {path}: dropped {size - keep} "
+                            f"bytes of a partial trailing record.")
+        return size - keep
+
+def read_header(path):
+    """Returns the column names stored in the first line of a segment."""
+    with open(path, 'r', newline='') as file:
+        first = file.readline()
+    if not first.endswith('\n'):
+        return None
+    return next(csv.reader([first]))
+
+def _format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    text = str(value)
+    # One record per line is what makes recovery possible, so never let a
+    # field smuggle in a line break.
+    if '\n' in text or '\r' in text:
+        text = text.replace('\r', ' ').replace('\n', ' ')
+    return text
+
+# ============================ Writer ============================
+
+class JournalWriter:
+    """Buffered, append-only CSV journal.
+
+    Records are batched in memory and written as a single append, either when
+    `flush_rows` records are pending or `flush_interval` seconds after the first
+    pending record. Segments roll over at `max_segment_bytes`, and a new segment
+    is also started when a record introduces columns the current one lacks.
+    """
+
+    def __init__(self, base_path, fieldnames=None, flush_rows=DEFAULT_FLUSH_ROWS,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, fsync=FSYNC_INTERVAL,
+                 fsync_interval=DEFAULT_FSYNC_INTERVAL,
+                 max_segment_bytes=DEFAULT_MAX_SEGMENT_BYTES):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync!r}, expected one of {FSYNC_POLICIES}")
+        self.base_path = base_path
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_segment_bytes = max_segment_bytes
+
+        self._lock = threading.RLock()
+        self._pending = []
+        self._pending_since = None
+        self._file = None
+        self._seq = None
+        self._segment_bytes = 0
+        self._last_fsync = time.monotonic()
+        self._flusher = None
+        self._closed = False
+        atexit.register(self.close)
+
+    # ---- public API ----
+
+    def append(self, record):
+        """Queues one record (a dict) for writing."""
+        with self._lock:
+            if self._closed:
+                raise ValueError(f"Journal {self.base_path} is closed")
+            self._pending.append(dict(record))
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            if len(self._pending) >= self.flush_rows:
+                self.flush()
+            else:
+                self._ensure_flusher()
+
+    def flush(self):
+        """Writes all pending records to the active segment."""
+        with self._lock:
+            if not self._pending:
+                return
+            records, self._pending = self._pending, []
+            self._pending_since = None
+            self._open()
+            for chunk_fields, chunk in self._split_by_schema(records):
+                if chunk_fields != self.fieldnames:
+                    self.fieldnames = chunk_fields
+                    if self._segment_bytes == 0:
+                        self._write_header()
+                    else:
+                        self._rotate()
+                self._write_rows(chunk)
+            self._sync(force=self.fsync == FSYNC_ALWAYS)
+
+    def close(self):
+        """Flushes pending records and closes the active segment."""
+        with self._lock:
+            if self._closed:
+                return
+            self.flush()
+            if self._file is not None:
+                self._sync(force=self.fsync != FSYNC_NEVER)
+                self._file.close()
+                self._file = None
+            self._closed = True
+
+    @property
+    def active_segment(self):
+        return None if self._seq is None else segment_path(self.base_path, self._seq)
+
+    # ---- internals ----
+
+    def _ensure_flusher(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True,
+                                             name=f"journal-flush:{os.path.basename(self.base_path)}")
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed:
+            time.sleep(self.flush_interval / 2)
+            with self._lock:
+                if self._closed:
+                    return
+                if self._pending_since is not None and \
+                        time.monotonic() - self._pending_since >= self.flush_interval:
+                    try:
+                        self.flush()
+                    except OSError as e:
+                        logging.error(f"Journal flush failed for {self.base_path}: {e}")
+                if not self._pending:
+                    self._flusher = None
+                    return
+
+    def _open(self):
+        """Opens the newest segment for appending, recovering it first."""
+        if self._file is not None:
+            return
+        segments = [s for s in list_segments(self.base_path) if s[0] != LEGACY_SEGMENT]
+        if segments:
+            seq, path = segments[-1]
+            recover_segment(path)
+            header = read_header(path)
+            if header is None:
+                # Header itself was torn; start the segment over.
+                open(path, 'w').close()
+            elif self.fieldnames is None:
+                self.fieldnames = header
+            elif header != self.fieldnames:
+                # Caller asked for a different schema; keep the old segment intact.
+                seq += 1
+                path = segment_path(self.base_path, seq)
+        else:
+            legacy = read_header(self.base_path) if os.path.exists(self.base_path) else None
+            if self.fieldnames is None and legacy:
+                self.fieldnames = legacy
+            seq, path = 0, segment_path(self.base_path, 0)
+        self._open_segment(seq, path)
+
+    def _open_segment(self, seq, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', newline='')
+        self._seq = seq
+        self._segment_bytes = self._file.tell()
+        if self._segment_bytes == 0 and self.fieldnames:
+            self._write_header()
+
+    def _rotate(self):
+        if self._file is not None:
+            self._sync(force=self.fsync != FSYNC_NEVER)
+            self._file.close()
+            self._file = None
+        seq = 0 if self._seq is None else self._seq + 1
+        self._open_segment(seq, segment_path(self.base_path, seq))
+
+    def _write_header(self):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(self.fieldnames)
+        data = buffer.getvalue()
+        self._file.write(data)
+        self._segment_bytes += len(data.encode())
+
+    def _split_by_schema(self, records):
+        """Groups consecutive records so each group fits a single header."""
+        fields = list(self.fieldnames) if self.fieldnames else []
+        chunks = []
+        current = []
+        for record in records:
+            extra = [k for k in record if k not in fields]
+            if extra and (current or fields):
+                if current:
+                    chunks.append((list(fields), current))
+                    current = []
+            fields = fields + extra
+            current.append(record)
+        if current:
+            chunks.append((list(fields), current))
+        return chunks
+
+    def _write_rows(self, records):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            if self._segment_bytes + buffer.tell() >= self.max_segment_bytes:
+                self._commit(buffer.getvalue())
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                self._rotate()
+            writer.writerow([_format_value(record.get(k)) for k in self.fieldnames])
+        self._commit(buffer.getvalue())
+
+    def _commit(self, data):
+        if not data:
+            return
+        self._file.write(data)
+        self._file.flush()
+        self._segment_bytes += len(data.encode())
+
+    def _sync(self, force=False):
+        if self._file is None or self.fsync == FSYNC_NEVER:
+            return
+        now = time.monotonic()
+        if force or now - self._last_fsync >= self.fsync_interval:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+# ============================ Reader ============================
+
+class JournalReader:
+    """Reads the records of a journal written by JournalWriter.
+
+    Only complete lines are returned, so it is safe to read a journal while
+    the bot is appending to it. `read_since` lets callers pick up where they
+    left off instead of re-reading the whole history.
+    """
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+
+    def segments(self):
+        return list_segments(self.base_path)
+
+    def read_since(self, cursor=None):
+        """Returns (records, cursor) for everything written after `cursor`.
+
+        `cursor` is an opaque (seq, byte_offset) pair from a previous call;
+        None starts from the beginning of the journal.
+        """
+        start_seq, start_offset = cursor if cursor else (LEGACY_SEGMENT - 1, 0)
+        records = []
+        new_cursor = cursor
+        for seq, path in self.segments():
+            if seq < start_seq:
+                continue
+            offset = start_offset if seq == start_seq else 0
+            rows, end = self._read_segment(path, offset)
+            records.extend(rows)
+            new_cursor = (seq, end)
+        return records, new_cursor
+
+    def iter_records(self):
+        for _, path in self.segments():
+            rows, _ = self._read_segment(path, 0)
+            yield from rows
+
+    def tail(self, n):
+        """Returns the last `n` records, reading segments newest-first."""
+        collected = []
+        for _, path in reversed(self.segments()):
+            if len(collected) >= n:
+                break
+            rows, _ = self._read_segment(path, 0)
+            collected = rows[-(n - len(collected)):] + collected
+        return collected
+
+    def to_frame(self, parse_dates=None):
+        """Loads the journal into a DataFrame, as pd.read_csv did on the old file."""
+        import pandas as pd
+
+        records, _ = self.read_since()
+        df = pd.DataFrame.from_records(records)
+        if df.empty:
+            return df
+        for column in df.columns:
+            present = df[column].notna() & (df[column] != '')
+            values = df[column].where(present)
+            if parse_dates and column in parse_dates:
+                df[column] = pd.to_datetime(values)
+            else:
+                converted = pd.to_numeric(values, errors='coerce')
+                if converted.notna().sum() == present.sum():
+                    df[column] = converted
+        return df
+
+    @staticmethod
+    def _read_segment(path, offset):
+        """Parses complete records from `offset`, returning (rows, end_offset)."""
+        try:
+            with open(path, 'rb') as file:
+                header_line = file.readline()
+                if not header_line.endswith(b'\n'):
+                    return [], offset
+                offset = max(offset, len(header_line))
+                file.seek(offset)
+                data = file.read()
+        except FileNotFoundError:
+            return [], offset
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return [], offset
+        header = next(csv.reader([header_line.decode()]))
+        lines = data[:end].decode().splitlines()
+        rows = [dict(zip(header, values)) for values in csv.reader(lines) if values]
+        return rows, offset + end
@@ -0,0 +1,243 @@
+"""Index of the model checkpoints scattered over the repo.
+
+    python -m scripts.storage.model_registry [scan|list|best|compact --keep K [--apply]]
+
+The manifest records, per .pt/.h5 file, its size, modification time,
+SHA-256, format, epoch, loss, preprocessing and layer sizes. Readers pick
+a checkpoint from the manifest without opening the files; scan() only
+re-reads files whose size or modification time changed.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+
+# ============================ Configuration ============================
+
+CHECKPOINT_DIRS = [
+    os.path.join('scripts', 'checkpoints'),
+    os.path.join('scripts', 'models', 'models'),
+    os.path.join('scripts', 'models', 'saved_models'),
+    os.path.join('scripts', 'models', 'MODEL_SAVE_PATH'),
+]
+MANIFEST_FILE = os.path.join('scripts', 'models', 'manifest.json')
+CHECKPOINT_EXTENSIONS = ('.pt', '.pth', '.h5')
+METRIC_KEYS = ('val_loss', 'loss')   # recorded, lower is better
+RANK_METRIC = 'val_loss'              # training loss is never ranked: it rewards overfitting
+PREPROCESSING_KEYS = ('feature', 'window', 'return_scale')
+DEFAULT_KEEP = 3
+
+EPOCH_PATTERN = re.compile(r'epoch_(\d+)')
+
+# ============================ Inspection ============================
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_checkpoint(path, mmap=True):
+    """torch.load on CPU; with mmap the tensors stay on disk until touched."""
+    import torch
+
+    return torch.load(path, map_location='cpu', weights_only=True, mmap=mmap)
+
+def state_dict_of(checkpoint):
+    """The weights from either a bare state_dict or a training checkpoint dict."""
+    return checkpoint.get('model_state_dict', checkpoint)
+
+def architecture_of(state_dict):
+    """LSTM layer sizes read from the weight shapes, or None if it is not our LSTM."""
+    if 'lstm.weight_ih_l0' not in state_dict or 'fc.weight' not in state_dict:
+        return None
+    return {
+        "input_size": int(state_dict['lstm.weight_ih_l0'].shape[1]),
+        "hidden_size": int(state_dict['lstm.weight_hh_l0'].shape[1]),
+        "num_layers": sum(1 for key in state_dict if key.startswith('lstm.weight_ih_l')),
+        "output_size": int(state_dict['fc.weight'].shape[0]),
+    }
+
+def inspect_file(path):
+    """Manifest entry for one file. Only tensor metadata is read, via mmap."""
+    stat = os.stat(path)
+    entry = {
+        "path": path.replace(os.sep, '/'),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "sha256": file_sha256(path),
+        "format": None,
+        "epoch": None,
+        "metric": None,
+        "metric_name": None,
+        "architecture": None,
+        "preprocessing": None,
+    }
+    match = EPOCH_PATTERN.search(os.path.basename(path))
+    if match:
+        entry["epoch"] = int(match.group(1))
+    if stat.st_size == 0:
+        entry["format"] = "empty"
+        return entry
+    if path.endswith('.h5'):
+        entry["format"] = "keras"
+        return entry
+    try:
+        checkpoint = load_checkpoint(path)
+    except Exception as e:
+        logging.warning(f"Could not read checkpoint {path}: {e}")
+        entry["format"] = "unreadable"
+        return entry
+    if not isinstance(checkpoint, dict):
+        entry["format"] = "unreadable"
+        return entry
+    entry["format"] = "checkpoint" if 'model_state_dict' in checkpoint else "state_dict"
+    if checkpoint.get('epoch') is not None:
+        entry["epoch"] = int(checkpoint['epoch'])
+    for key in METRIC_KEYS:
+        if checkpoint.get(key) is not None:
+            entry["metric"], entry["metric_name"] = float(checkpoint[key]), key
+            break
+    entry["preprocessing"] = preprocessing_of(checkpoint)
+    entry["architecture"] = architecture_of(state_dict_of(checkpoint))
+    return entry
+
+def preprocessing_of(checkpoint):
+    """The input/target transform a checkpoint was trained with, or None (raw prices)."""
+    if checkpoint.get('feature') is None:
+        return None
+    return {key: checkpoint.get(key) for key in PREPROCESSING_KEYS}
+
+# ============================ Registry ============================
+
+class ModelRegistry:
+    """Manifest-backed view of every checkpoint under CHECKPOINT_DIRS."""
+
+    def __init__(self, manifest_path=MANIFEST_FILE, directories=None):
+        self.manifest_path = manifest_path
+        self.directories = directories or CHECKPOINT_DIRS
+        self.entries = []
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as file:
+                self.entries = json.load(file).get('checkpoints', [])
+
+    def _files(self):
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(CHECKPOINT_EXTENSIONS):
+                    yield os.path.join(directory, name)
+
+    def scan(self):
+        """Re-indexes new or changed files, drops deleted ones and saves the manifest."""
+        known = {entry["path"]: entry for entry in self.entries}
+        entries = []
+        for path in self._files():
+            entry = known.get(path.replace(os.sep, '/'))
+            stat = os.stat(path)
+            if entry is None or entry["size"] != stat.st_size or entry.get("mtime") != stat.st_mtime:
+                entry = inspect_file(path)
+            entries.append(entry)
+        self.entries = entries
+        self.save()
+        return self.entries
+
+    def save(self):
+        directory = os.path.dirname(self.manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump({"checkpoints": self.entries}, file, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def loadable(self, architecture=None):
+        """Readable LSTM checkpoints, optionally only those matching a layer layout."""
+        return [entry for entry in self.entries
+                if entry["format"] in ("checkpoint", "state_dict") and entry["architecture"]
+                and (architecture is None or entry["architecture"] == architecture)]
+
+    def ranked(self, architecture=None, preprocessing=None):
+        """Loadable checkpoints best first.
+
+        Validation losses are only comparable between models trained on the
+        same target, so only checkpoints with a val_loss and the given
+        `preprocessing` (default: that of the newest checkpoint with a
+        val_loss) are ranked by it, lowest first. Everything else follows,
+        latest epoch first. Byte-identical copies are listed once.
+        """
+        seen, unique = set(), []
+        for entry in self.loadable(architecture):
+            if entry["sha256"] not in seen:
+                seen.add(entry["sha256"])
+                unique.append(entry)
+        validated = [e for e in unique if e["metric_name"] == RANK_METRIC]
+        if preprocessing is None and validated:
+            preprocessing = max(validated, key=lambda e: e.get("mtime") or 0).get("preprocessing")
+        comparable = [e for e in validated if e.get("preprocessing") == preprocessing]
+        rest = [e for e in unique if e not in comparable]
+        return (sorted(comparable, key=lambda e: (e["metric"], -(e["epoch"] or 0)))
+                + sorted(rest, key=lambda e: -(e["epoch"] or 0)))
+
+    def best(self, architecture=None, preprocessing=None):
+        ranked = self.ranked(architecture, preprocessing)
+        return ranked[0] if ranked else None
+
+    def load_state_dict(self, entry=None, mmap=True):
+        """Weights of an entry (default: best()), memory-mapped rather than read into RAM."""
+        entry = entry or self.best()
+        if entry is None:
+            raise FileNotFoundError(f"No loadable checkpoint in {self.directories}")
+        return state_dict_of(load_checkpoint(entry["path"], mmap=mmap))
+
+    def compact(self, keep=DEFAULT_KEEP, apply=False):
+        """Files to delete so that only the `keep` best checkpoints remain.
+
+        Empty files, Keras leftovers, unreadable files and duplicate copies
+        go too. Nothing is removed unless apply=True.
+        """
+        keep_paths = {entry["path"] for entry in self.ranked()[:keep]}
+        doomed = [entry for entry in self.entries if entry["path"] not in keep_paths]
+        if apply:
+            for entry in doomed:
+                try:
+                    os.remove(entry["path"])
+                except FileNotFoundError:
+                    pass
+                logging.info(f"Removed checkpoint {entry['path']} ({entry['size']} bytes).")
+            self.entries = [entry for entry in self.entries if entry["path"] in keep_paths]
+            self.save()
+        return doomed
+
+def main():
+    parser = argparse.ArgumentParser(description="Index, rank and compact model checkpoints.")
+    parser.add_argument('command', nargs='?', default='list', choices=['scan', 'list', 'best', 'compact'])
+    parser.add_argument('--manifest', default=MANIFEST_FILE)
+    parser.add_argument('--keep', type=int, default=DEFAULT_KEEP)
+    parser.add_argument('--apply', action='store_true', help="actually delete files when compacting")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.manifest)
+    if args.command == 'scan' or not registry.entries:
+        registry.scan()
+    if args.command == 'best':
+        print(json.dumps(registry.best(), indent=2))
+    elif args.command == 'compact':
+        doomed = registry.compact(args.keep, args.apply)
+        freed = sum(entry["size"] for entry in doomed)
+        verb = "Removed" if args.apply else "Would remove"
+        for entry in doomed:
+            print(f"{verb} {entry['path']} ({entry['format']}, {entry['size']:,} bytes)")
+        print(f"{verb} {len(doomed)} files, {freed:,} bytes; kept {args.keep} best checkpoints.")
+    else:
+        for entry in registry.entries:
+            metric = f"{entry['metric_name']}={entry['metric']:.6f}" if entry['metric'] is not None else ""
+            print(f"{entry['path']:55s} {entry['format']:11s} epoch={entry['epoch']!s:5s} "
+                  f"{entry['size']:>8,} {metric}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import time
+
+import requests
+
+from scripts.kraken.async_client import AsyncKrakenClient
+from scripts.kraken.signing import get_signing_context
+from scripts.uilities.metrics import TickTrace
+from scripts.xrp_ml_model import BUY_THRESHOLD, SELL_THRESHOLD, TRADE_AMOUNT_USD, price_signal
+
+# ============================ Configuration ============================
+
+CYCLE_INTERVAL = 60       # seconds between strategy cycles
+PAIR_TIMEOUT = 20         # seconds the cycle waits for a pair before moving on without it
+MAX_PAIR_BACKOFF = 600    # seconds a repeatedly failing pair is rested at most
+
+# SHIBSnipingBot's rule is the default for any pair without its own thresholds
+DEFAULT_PAIR_SETTINGS = {
+    "SHIB/USD": {"buy_threshold": BUY_THRESHOLD, "sell_threshold": SELL_THRESHOLD},
+}
+
+# ============================ Helper Functions ============================
+
+def split_pair(pair):
+    base, _, quote = pair.partition('/')
+    return base, quote
+
+def asset_balance(balance, asset):
+    """Balance of an asset under Kraken's plain or X/Z-prefixed code."""
+    for code in (asset, 'X' + asset, 'Z' + asset):
+        if code in balance:
+            return float(balance[code])
+    return 0.0
+
+def ticker_key(pair, result):
+    """The key Kraken used for a pair in a multi-pair Ticker response."""
+    base, quote = split_pair(pair)
+    for key in (base + quote, 'X' + base + 'Z' + quote, pair):
+        if key in result:
+            return key
+    return None
+
+def open_order_pairs(open_orders):
+    """Pairs (without the slash) that already have a resting order."""
+    return {order.get('descr', {}).get('pair', '') for order in open_orders.values()}
+
+def pair_settings(config, pair):
+    """Per-pair settings from config['pairs'] (a list or a {pair: settings} dict)."""
+    pairs = config.get('pairs') or {}
+    own = pairs.get(pair, {}) if isinstance(pairs, dict) else {}
+    return dict(DEFAULT_PAIR_SETTINGS.get(pair, {}), **(own or {}))
+
+# ============================ Strategies ============================
+
+def threshold_strategy(pair, price, snapshot, settings):
+    """SHIBSnipingBot.trade_decision generalised to any pair and sized from the snapshot."""
+    if 'buy_threshold' not in settings or 'sell_threshold' not in settings:
+        return None
+    base, quote = split_pair(pair)
+    amount = settings.get('trade_amount_usd', TRADE_AMOUNT_USD)
+    signal = price_signal(price, settings['buy_threshold'], settings['sell_threshold'])
+    if signal > 0 and asset_balance(snapshot.balance, quote) >= amount:
+        side, volume = 'buy', amount / price
+    elif signal < 0 and asset_balance(snapshot.balance, base) > 0:
+        side, volume = 'sell', min(asset_balance(snapshot.balance, base), amount / price)
+    else:
+        return None
+    return {"ordertype": "limit", "type": side, "volume": f"{volume:.8f}",
+            "pair": pair, "price": f"{price:.10g}"}
+
+# ============================ Engine ============================
+
+class Snapshot:
+    """Account state fetched once per cycle and shared by every pair."""
+
+    def __init__(self, balance=None, open_orders=None, prices=None, ticks=None):
+        self.balance = balance or {}
+        self.open_orders = open_orders or {}
+        self.prices = prices or {}
+        self.ticks = ticks or {}   # pair -> (source, time.perf_counter() the price arrived)
+        self.fetched_at = time.time()
+
+class PairState:
+    """Everything the engine tracks for one pair; never shared between pairs."""
+
+    def __init__(self, pair, settings):
+        self.pair = pair
+        self.settings = settings
+        self.task = None
+        self.failures = 0
+        self.resting_until = 0.0
+        self.orders = 0
+        self.fills = 0
+        self.last_order = None
+        self.last_error = None
+        self.last_run = None
+
+class MultiPairEngine:
+    """Runs a per-pair strategy over many pairs concurrently from one loop.
+
+    Each cycle fetches one account snapshot (balance, open orders and a
+    single multi-pair Ticker for pairs the WebSocket feed has no price for)
+    and then evaluates every pair as its own task. The cycle waits at most
+    PAIR_TIMEOUT for them; a slower pair is left to finish rather than
+    cancelled, since an AddOrder cancelled mid-request may still reach
+    Kraken, and it is skipped until it has. A pair that raises is rested
+    with exponential backoff. The other pairs are unaffected either way.
+    Fills are counted but do not start a cycle: an order that fills must
+    not immediately place the next one.
+    """
+
+    def __init__(self, config, pairs=None, strategy=threshold_strategy, client=None,
+                 market_data=None, account=None, interval=None, pair_timeout=PAIR_TIMEOUT):
+        self.config = config
+        pairs = pairs or list(config.get('pairs') or [])
+        self.pairs = {pair: PairState(pair, pair_settings(config, pair)) for pair in pairs}
+        self.strategy = strategy
+        self.client = client or AsyncKrakenClient()
+        self.market_data = market_data
+        self.account = account
+        self.interval = config.get('cycle_interval', CYCLE_INTERVAL) if interval is None else interval
+        self.pair_timeout = pair_timeout
+        self.signer = get_signing_context(config['api_key'], config['api_secret'])
+        self.snapshot = Snapshot()
+        self.cycles = 0
+
+    # ---- snapshot ----
+
+    async def _private(self, endpoint, data=None):
+        try:
+            response = await self.client.private(endpoint, data or {}, self.signer)
+        except requests.RequestException as e:
+            logging.error(f"API request to {endpoint} failed: {e}")
+            return {'error': [str(e)]}
+        if response.get('error'):
+            logging.error(f"API Error on {endpoint}: {response['error']}")
+        return response
+
+    async def _ticker_prices(self, pairs):
+        if not pairs:
+            return {}
+        try:
+            response = await self.client.public('/0/public/Ticker', {'pair': ','.join(pairs)})
+        except requests.RequestException as e:
+            logging.error(f"Ticker request failed: {e}")
+            return {}
+        result = response.get('result') or {}
+        prices = {}
+        for pair in pairs:
+            key = ticker_key(pair, result)
+            if key:
+                prices[pair] = float(result[key]['c'][0])
+        return prices
+
+    async def refresh_snapshot(self):
+        """Balance, open orders and missing prices, fetched concurrently, once.
+
+        With a WebSocket-fed AccountState, balance and open orders are read
+        from it and only prices may need a REST call.
+        """
+        feed_prices, ticks = {}, {}
+        if self.market_data:
+            for pair in self.pairs:
+                price = self.market_data.mid(pair)
+                if price:
+                    feed_prices[pair] = price
+                    ticks[pair] = ("ws", self.market_data.tick_time(pair))
+        missing = [pair for pair in self.pairs if pair not in feed_prices]
+        if self.account is not None and self.account.synced:
+            ticker_prices = await self._ticker_prices(missing)
+            ticks.update(self._rest_ticks(ticker_prices))
+            self.snapshot = Snapshot(dict(self.account.balance), self.account.open_orders(),
+                                     dict(ticker_prices, **feed_prices), ticks)
+            return self.snapshot
+        balance, open_orders, ticker_prices = await asyncio.gather(
+            self._private('/0/private/Balance'),
+            self._private('/0/private/OpenOrders'),
+            self._ticker_prices(missing),
+        )
+        ticks.update(self._rest_ticks(ticker_prices))
+        previous = self.snapshot
+        self.snapshot = Snapshot(
+            {k: float(v) for k, v in balance['result'].items()}
+            if not balance.get('error') else previous.balance,
+            open_orders['result']['open'] if not open_orders.get('error') else previous.open_orders,
+            dict(ticker_prices, **feed_prices),
+            ticks,
+        )
+        return self.snapshot
+
+    @staticmethod
+    def _rest_ticks(prices):
+        now = time.perf_counter()
+        return {pair: ("rest", now) for pair in prices}
+
+    # ---- per-pair evaluation ----
+
+    async def evaluate(self, state, snapshot):
+        """Runs the strategy for one pair and places its order, if any."""
+        state.last_run = time.time()
+        price = snapshot.prices.get(state.pair)
+        if not price:
+            return None
+        if state.pair.replace('/', '') in open_order_pairs(snapshot.open_orders):
+            return None  # wait for the resting order to fill or be cancelled
+        trace = TickTrace(*snapshot.ticks.get(state.pair, ("rest", None)))
+        order = self.strategy(state.pair, price, snapshot, state.settings)
+        trace.mark('decision')
+        if not order or not self.config.get('live_trading'):
+            return order
+        response = await self._private('/0/private/AddOrder', order)
+        trace.finish()
+        if response.get('error'):
+            raise RuntimeError(f"AddOrder rejected: {response['error']}")
+        state.orders += 1
+        state.last_order = order
+        logging.info(f"{state.pair}: placed {order['type']} {order['volume']} @ "
+                     f"{order.get('price', 'market')}: {response.get('result')}")
+        return order
+
+    async def _run_pair(self, state, snapshot):
+        try:
+            await self.evaluate(state, snapshot)
+            state.failures = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            state.failures += 1
+            state.last_error = repr(e)
+            backoff = min(MAX_PAIR_BACKOFF, self.interval * 2 ** (state.failures - 1))
+            state.resting_until = time.monotonic() + backoff
+            logging.error(f"{state.pair}: strategy failed ({state.failures} in a row), "
+                          f"resting {backoff:.0f}s: {e!r}")
+
+    def _due(self, state, now):
+        busy = state.task is not None and not state.task.done()
+        return not busy and now >= state.resting_until
+
+    async def cycle(self):
+        """One snapshot and one evaluation of every due pair; returns the pairs started."""
+        snapshot = await self.refresh_snapshot()
+        now = time.monotonic()
+        started = []
+        for state in self.pairs.values():
+            if self._due(state, now):
+                state.task = asyncio.create_task(self._run_pair(state, snapshot),
+                                                 name=f"pair-{state.pair}")
+                started.append(state.task)
+        if started:
+            # Never cancelled: a pair still running is skipped by _due until it finishes
+            _, pending = await asyncio.wait(started, timeout=self.pair_timeout)
+            for task in pending:
+                logging.warning(f"{task.get_name()} still running after {self.pair_timeout}s; "
+                                f"moving on without it.")
+        self.cycles += 1
+        return started
+
+    def on_fill(self, fill):
+        """Records a fill from ownTrades against its pair; the next cycle sees it."""
+        pair = fill.get('pair', '')
+        for state in self.pairs.values():
+            if state.pair == pair or state.pair.replace('/', '') == pair:
+                state.fills += 1
+
+    async def run(self):
+        """Cycles every `interval` seconds until cancelled."""
+        logging.info(f"Trading {len(self.pairs)} pairs: {', '.join(self.pairs)}")
+        try:
+            while True:
+                started = time.monotonic()
+                await self.cycle()
+                remaining = self.interval - (time.monotonic() - started)
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+        finally:
+            tasks = [s.task for s in self.pairs.values() if s.task and not s.task.done()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def status(self):
+        """Per-pair counters for logging and the dashboard."""
+        return {pair: {"orders": s.orders, "fills": s.fills, "failures": s.failures,
+                       "last_error": s.last_error, "last_run": s.last_run}
+                for pair, s in self.pairs.items()}
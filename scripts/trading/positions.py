@@ -0,0 +1,294 @@
+import logging
+import threading
+import time
+
+# ============================ Configuration ============================
+
+RECONCILE_INTERVAL = 300   # seconds between REST reconciliations
+MAX_SEEN_TRADES = 10_000   # trade ids remembered to ignore replays; the oldest are forgotten first
+MAX_ORDERS = 1_000         # orders kept; finished ones beyond this are dropped, oldest first
+OPEN_STATES = ('pending', 'open')
+FINAL_STATES = ('closed', 'canceled', 'expired')
+QUOTE_CURRENCIES = ('USDT', 'USDC', 'USD', 'EUR', 'GBP', 'CAD', 'JPY', 'XBT', 'ETH')
+
+# ============================ Helper Functions ============================
+
+def normalise_pair(name):
+    """'XBT/USD' for the WebSocket name, the REST name ('XXBTZUSD') or the altname ('SHIBUSD')."""
+    if not name or '/' in name:
+        return name
+    if len(name) == 8 and name[0] in 'XZ' and name[4] in 'XZ':
+        return f"{name[1:4]}/{name[5:]}"
+    for quote in QUOTE_CURRENCIES:
+        if name.endswith(quote) and len(name) > len(quote):
+            return f"{name[:-len(quote)]}/{quote}"
+    return name
+
+# ============================ Orders and Positions ============================
+
+class Order:
+    """One order's lifecycle as reported by openOrders, ownTrades and REST."""
+
+    def __init__(self, txid, pair=None, side=None, ordertype=None, price=0.0, volume=0.0):
+        self.txid = txid
+        self.pair = pair
+        self.side = side
+        self.ordertype = ordertype
+        self.price = price
+        self.volume = volume
+        self.vol_exec = 0.0
+        self.filled = 0.0   # volume booked from ownTrades fills
+        self.avg_price = 0.0
+        self.status = 'pending'
+        self.updated_at = time.time()
+
+    @property
+    def is_open(self):
+        return self.status in OPEN_STATES
+
+    @property
+    def remaining(self):
+        return max(0.0, self.volume - self.vol_exec)
+
+    def update(self, fields):
+        """Merges an openOrders / REST order dict; updates may carry only changed fields."""
+        descr = fields.get('descr') or {}
+        if descr.get('pair'):
+            self.pair = normalise_pair(descr['pair'])
+        self.side = descr.get('type', self.side)
+        self.ordertype = descr.get('ordertype', self.ordertype)
+        if descr.get('price') not in (None, '', '0', '0.0'):
+            self.price = float(descr['price'])
+        if 'vol' in fields:
+            self.volume = float(fields['vol'])
+        if 'vol_exec' in fields:
+            self.vol_exec = max(self.vol_exec, float(fields['vol_exec']))
+        if float(fields.get('avg_price') or 0):
+            self.avg_price = float(fields['avg_price'])
+        if 'status' in fields:
+            self.status = fields['status']
+        self.updated_at = time.time()
+
+    def as_dict(self):
+        return {"txid": self.txid, "pair": self.pair, "side": self.side,
+                "ordertype": self.ordertype, "price": self.price, "volume": self.volume,
+                "vol_exec": self.vol_exec, "avg_price": self.avg_price, "status": self.status}
+
+class Position:
+    """Net position in one pair with average-cost realised/unrealised PnL in the quote currency."""
+
+    def __init__(self, pair):
+        self.pair = pair
+        self.quantity = 0.0      # base units; negative when net short
+        self.avg_entry = 0.0
+        self.realised_pnl = 0.0  # after fees
+        self.fees = 0.0
+        self.fills = 0
+
+    def apply_fill(self, side, price, volume, fee=0.0):
+        signed = volume if side == 'buy' else -volume
+        if self.quantity == 0 or (self.quantity > 0) == (signed > 0):
+            total = abs(self.quantity) + volume
+            self.avg_entry = (abs(self.quantity) * self.avg_entry + volume * price) / total
+            self.quantity += signed
+        else:
+            closing = min(volume, abs(self.quantity))
+            direction = 1.0 if self.quantity > 0 else -1.0
+            self.realised_pnl += closing * (price - self.avg_entry) * direction
+            self.quantity += signed
+            if abs(self.quantity) < 1e-12:
+                self.quantity, self.avg_entry = 0.0, 0.0
+            elif volume > closing:
+                self.avg_entry = price   # flipped: the remainder opens at this price
+        self.realised_pnl -= fee
+        self.fees += fee
+        self.fills += 1
+
+    def unrealised_pnl(self, mark):
+        if not self.quantity or mark is None:
+            return 0.0
+        return (mark - self.avg_entry) * self.quantity
+
+# ============================ Account State ============================
+
+class AccountState:
+    """In-memory orders, positions and balances driven by the private WebSocket feeds.
+
+    openOrders updates drive the order lifecycle and ownTrades fills drive
+    positions; every trade id is applied once, so replays after a reconnect
+    or a REST reconciliation never double count. REST is only needed for
+    the periodic reconcile() and before the first WebSocket snapshot.
+    Methods are safe to call from the WebSocket thread and the trading
+    thread at the same time.
+
+    Only trades from `since` (a Unix time, by default when the state is
+    created) are booked: earlier ones are the account's history, whose
+    matching buys and sells TradesHistory may not return together.
+    """
+
+    def __init__(self, since=None):
+        self.orders = {}
+        self.positions = {}
+        self.balance = {}
+        self.since = time.time() if since is None else since
+        self.last_trade_time = self.since
+        self.synced = False
+        self.reconciled_at = 0.0
+        self._seen_trades = {}   # trade id -> None, in the order booked
+        self._lock = threading.RLock()
+
+    def position(self, pair):
+        pair = normalise_pair(pair)
+        with self._lock:
+            if pair not in self.positions:
+                self.positions[pair] = Position(pair)
+            return self.positions[pair]
+
+    # ---- WebSocket feeds ----
+
+    def apply_open_orders(self, entries):
+        """Applies openOrders payload entries: [{txid: fields}, ...]."""
+        with self._lock:
+            for entry in entries:
+                for txid, fields in entry.items():
+                    order = self.orders.get(txid) or Order(txid)
+                    order.update(fields)
+                    self.orders[txid] = order
+                    if order.status in FINAL_STATES:
+                        logging.info(f"Order {txid} {order.status}: {order.vol_exec}/{order.volume} "
+                                     f"{order.pair} @ {order.avg_price or order.price}")
+            self._prune_orders()
+            self.synced = True
+
+    def _prune_orders(self):
+        """Drops the oldest finished orders once more than MAX_ORDERS are kept. Lock held."""
+        if len(self.orders) <= MAX_ORDERS:
+            return
+        excess = len(self.orders) - MAX_ORDERS * 9 // 10   # with headroom, so this runs rarely
+        finished = [txid for txid, order in self.orders.items() if not order.is_open][:excess]
+        for txid in finished:
+            del self.orders[txid]
+
+    def apply_own_trades(self, entries):
+        """Applies ownTrades payload entries: [{trade_id: trade}, ...]; returns new fills."""
+        fills = []
+        for entry in entries:
+            for trade_id, trade in entry.items():
+                if self.apply_fill(trade_id, trade):
+                    fills.append(dict(trade, txid=trade_id))
+        return fills
+
+    def apply_fill(self, trade_id, trade, adjust_balance=True):
+        """Books one fill against its position, order and balances; False if already seen.
+
+        REST reconciliation passes adjust_balance=False: its Balance result
+        already includes the trades it reports. Trades from before `since`
+        are ignored.
+        """
+        with self._lock:
+            if trade_id in self._seen_trades or float(trade.get('time') or self.since) < self.since:
+                return False
+            self._seen_trades[trade_id] = None
+            if len(self._seen_trades) > MAX_SEEN_TRADES:
+                del self._seen_trades[next(iter(self._seen_trades))]
+            pair = normalise_pair(trade['pair'])
+            volume, price = float(trade['vol']), float(trade['price'])
+            self.position(pair).apply_fill(trade['type'], price, volume, float(trade.get('fee') or 0))
+            self.last_trade_time = max(self.last_trade_time, float(trade.get('time') or 0))
+            if adjust_balance:
+                base, _, quote = pair.partition('/')
+                cost, fee = float(trade.get('cost') or price * volume), float(trade.get('fee') or 0)
+                sign = 1.0 if trade['type'] == 'buy' else -1.0
+                self._adjust_balance(base, sign * volume)
+                self._adjust_balance(quote, -sign * cost - fee)
+            order = self.orders.get(trade.get('ordertxid'))
+            if order is not None:
+                # openOrders may already have reported this volume; never count it twice
+                filled = order.filled + volume
+                if filled > order.vol_exec:
+                    order.avg_price = (order.avg_price * order.filled + price * volume) / filled
+                order.filled = filled
+                order.vol_exec = max(order.vol_exec, filled)
+                if order.volume and order.vol_exec >= order.volume:
+                    order.status = 'closed'
+                order.updated_at = time.time()
+            return True
+
+    def _adjust_balance(self, asset, delta):
+        for code in (asset, 'X' + asset, 'Z' + asset):
+            if code in self.balance:
+                self.balance[code] += delta
+                return
+        self.balance[asset] = delta
+
+    # ---- REST reconciliation ----
+
+    def reconcile(self, balance=None, open_orders=None, trades=None):
+        """Corrects local state from REST Balance / OpenOrders / TradesHistory results.
+
+        REST open orders are authoritative: local orders REST no longer
+        lists are closed, missing ones are added. Trades the feed missed are
+        booked; ones already seen are ignored. Returns the fills booked, shaped
+        like apply_own_trades' fills, so callers journal them the same way.
+        """
+        with self._lock:
+            if balance is not None:
+                self.balance = {asset: float(amount) for asset, amount in balance.items()}
+            if open_orders is not None:
+                for txid, order in self.orders.items():
+                    if order.is_open and txid not in open_orders:
+                        logging.warning(f"Order {txid} missing from REST OpenOrders; marking closed.")
+                        order.status = 'closed'
+                self.apply_open_orders([open_orders])
+            fills = []
+            for trade_id, trade in sorted((trades or {}).items(), key=lambda t: float(t[1].get('time', 0))):
+                if self.apply_fill(trade_id, trade, adjust_balance=False):
+                    fills.append(dict(trade, txid=trade_id, pair=normalise_pair(trade['pair'])))
+            if fills:
+                logging.warning(f"Reconciliation booked {len(fills)} fills the WebSocket feed missed.")
+            self.reconciled_at = time.time()
+            return fills
+
+    def history_request(self):
+        """TradesHistory parameters for the trades this account has not booked yet."""
+        return {'start': self.last_trade_time}
+
+    def reconcile_due(self, interval=RECONCILE_INTERVAL):
+        return time.time() - self.reconciled_at >= interval
+
+    def request_reconcile(self, *_):
+        """Makes the next reconcile_due() true, e.g. after a feed gap or reconnect."""
+        self.reconciled_at = 0.0
+
+    # ---- views ----
+
+    def open_orders(self):
+        """Open orders in the REST OpenOrders shape, for code written against it."""
+        with self._lock:
+            return {txid: {"status": o.status, "vol": str(o.volume), "vol_exec": str(o.vol_exec),
+                           "descr": {"pair": (o.pair or '').replace('/', ''), "type": o.side,
+                                     "ordertype": o.ordertype, "price": str(o.price)}}
+                    for txid, o in self.orders.items() if o.is_open}
+
+    def pnl(self, marks=None):
+        """{pair: {quantity, avg_entry, realised, unrealised, fees}} valued at `marks` prices."""
+        marks = marks or {}
+        with self._lock:
+            return {pair: {"quantity": p.quantity, "avg_entry": p.avg_entry,
+                           "realised": p.realised_pnl, "unrealised": p.unrealised_pnl(marks.get(pair)),
+                           "fees": p.fees}
+                    for pair, p in self.positions.items()}
+
+def reconcile_from_rest(account, private_call):
+    """Runs one REST reconciliation and returns the fills it booked.
+
+    private_call(endpoint, data) returns the decoded response.
+    """
+    balance = private_call('/0/private/Balance', {})
+    open_orders = private_call('/0/private/OpenOrders', {})
+    history = private_call('/0/private/TradesHistory', account.history_request())
+    return account.reconcile(
+        balance['result'] if not balance.get('error') else None,
+        open_orders['result']['open'] if not open_orders.get('error') else None,
+        history['result']['trades'] if not history.get('error') else None,
+    )
@@ -1,17 +1,19 @@
 import os
 import json
 import time
-import hmac
-import hashlib
-import base64
-import urllib.parse
 import threading
 import asyncio
-import websockets
 import logging
 from datetime import datetime
-import requests
-import pandas as pd
+
+# requests, websockets, the Kraken clients and the trading engine (numpy)
+# are imported where first used, so main() can exit without loading them.
+from scripts.kraken.messages import Dispatcher
+from scripts.kraken.signing import get_signing_context
+from scripts.storage.journal import JournalWriter
+from scripts.trading.positions import RECONCILE_INTERVAL, AccountState, reconcile_from_rest
+from scripts.uilities.log_config import configure_logging
+from scripts.uilities.metrics import METRICS_PORT, TickTrace, serve_metrics
 
 # ============================ Configuration ============================
 
@@ -20,12 +22,17 @@ TRADE_LOG_FILE = 'trade_log.csv'
 PORTFOLIO_FILE = 'portfolio_values.csv'
 LOG_FILE = 'bot.log'
 
-# Setup logging
-logging.basicConfig(filename=LOG_FILE, level=logging.INFO,
-                    format='%(asctime)s %(levelname)s %(message)s')
+STRATEGY_INTERVAL = 60  # seconds between strategy evaluations
+RECONCILE_CHECK_INTERVAL = 5  # seconds between checks for a due/requested reconciliation
+
+# No ownTrades snapshot: past trades are booked by reconciliation, not replayed as new fills
+PRIVATE_SUBSCRIPTIONS = [{"name": "ownTrades", "snapshot": False}, {"name": "openOrders"}]
 
 # Global variables
 ws_stop_event = threading.Event()
+trade_journal = JournalWriter(TRADE_LOG_FILE)
+portfolio_journal = JournalWriter(PORTFOLIO_FILE, fieldnames=['timestamp', 'Portfolio_Value'])
+account = AccountState()  # orders, fills and positions from ownTrades/openOrders
 
 # ============================ Helper Functions ============================
 
@@ -44,25 +51,18 @@ def load_config():
         }
     return config
 
-def get_kraken_signature(url_path, data, secret):
-    """Generates Kraken API signature."""
-    postdata = urllib.parse.urlencode(data)
-    encoded = (str(data['nonce']) + postdata).encode()
-    message = url_path.encode() + hashlib.sha256(encoded).digest()
-    mac = hmac.new(base64.b64decode(secret), message, hashlib.sha512)
-    sigdigest = base64.b64encode(mac.digest())
-    return sigdigest.decode()
-
 def kraken_private_api(endpoint, data, config):
     """Makes a private API call to Kraken."""
-    url = f"https://api.kraken.com{endpoint}"
-    data['nonce'] = str(int(time.time() * 1000))
-    headers = {
-        'API-Key': config['api_key'],
-        'API-Sign': get_kraken_signature(endpoint, data, config['api_secret'])
-    }
-    response = requests.post(url, headers=headers, data=data)
-    response_json = response.json()
+    import requests
+
+    from scripts.kraken.client import get_shared_client
+
+    signer = get_signing_context(config['api_key'], config['api_secret'])
+    try:
+        response_json = get_shared_client().private(endpoint, data, signer)
+    except requests.RequestException as e:
+        logging.error(f"API request to {endpoint} failed: {e}")
+        return {'error': [str(e)]}
     if response_json.get('error'):
         logging.error(f"API Error: {response_json['error']}")
     return response_json
@@ -76,22 +76,18 @@ def get_ws_token(config):
     return response['result']['token']
 
 def log_trade(trade_info):
-    if os.path.exists(TRADE_LOG_FILE):
-        trade_df = pd.read_csv(TRADE_LOG_FILE)
-    else:
-        trade_df = pd.DataFrame()
-    trade_df = trade_df.append(trade_info, ignore_index=True)
-    trade_df.to_csv(TRADE_LOG_FILE, index=False)
+    """Journals a fill stamped with its execution time.
+
+    'timestamp' is what the trade store is indexed by. It is local time, like
+    the portfolio snapshots, converted from the fill's UTC epoch 'time'.
+    """
+    if trade_info.get('time') is not None:
+        trade_info = dict(trade_info, timestamp=datetime.fromtimestamp(float(trade_info['time'])))
+    trade_journal.append(trade_info)
 
 def update_portfolio_value(value):
     timestamp = datetime.now()
-    data = {'timestamp': timestamp, 'Portfolio_Value': value}
-    if os.path.exists(PORTFOLIO_FILE):
-        portfolio_df = pd.read_csv(PORTFOLIO_FILE)
-    else:
-        portfolio_df = pd.DataFrame()
-    portfolio_df = portfolio_df.append(data, ignore_index=True)
-    portfolio_df.to_csv(PORTFOLIO_FILE, index=False)
+    portfolio_journal.append({'timestamp': timestamp, 'Portfolio_Value': value})
 
 # ============================ Kraken API Functions ============================
 
@@ -108,69 +104,223 @@ def kraken_cancel_all(config):
 
 # ============================ WebSocket Functions ============================
 
-async def kraken_ws_subscribe(token, ws_stop_event):
-    uri = 'wss://ws-auth.kraken.com/'
-    try:
-        async with websockets.connect(uri) as websocket:
-            # Subscribe to desired channels
-            subscribe_msg = {
-                "event": "subscribe",
-                "subscription": {"name": "ownTrades", "token": token}
-            }
-            await websocket.send(json.dumps(subscribe_msg))
-            logging.info("Subscribed to ownTrades channel.")
-
-            while not ws_stop_event.is_set():
-                try:
-                    message = await asyncio.wait_for(websocket.recv(), timeout=1)
-                    data = json.loads(message)
-                    if isinstance(data, dict) and data.get("event"):
-                        # Handle subscription status and other events
-                        logging.info(f"WebSocket event: {data}")
-                    else:
-                        # Handle trade data
-                        process_ws_message(data)
-                except asyncio.TimeoutError:
-                    continue
-                except websockets.exceptions.ConnectionClosed:
-                    logging.warning("WebSocket connection closed.")
-                    break
-    except Exception as e:
-        logging.error(f"WebSocket error: {e}")
-
-def process_ws_message(data):
-    # Process incoming WebSocket messages (trades, balance updates, etc.)
-    logging.info(f"WebSocket data received: {data}")
-    # Example: Update trade log or portfolio value
-    # Implement processing logic as per requirements
-
-def start_ws_listener(token):
+def record_fill(fill):
+    log_trade(fill)
+    logging.info(f"Fill {fill['txid']}: {fill.get('type')} {fill.get('vol')} "
+                 f"{fill.get('pair')} @ {fill.get('price')}")
+
+def private_dispatcher(on_fill):
+    """Applies ownTrades / openOrders messages to the account; new fills go to on_fill."""
+    dispatcher = Dispatcher("Private feed")
+
+    def own_trades(channel, pair, data):
+        for fill in account.apply_own_trades(data[0]):
+            on_fill(fill)
+
+    dispatcher.on('ownTrades', own_trades)
+    dispatcher.on('openOrders', lambda channel, pair, data: account.apply_open_orders(data[0]))
+    return dispatcher
+
+def private_feed_supervisor(on_message, token_provider, token=None):
+    """Supervised ownTrades + openOrders connection; gaps and reconnects trigger a reconcile."""
+    from scripts.kraken.async_client import KRAKEN_WS_AUTH_URL
+    from scripts.kraken.ws_supervisor import WebSocketSupervisor
+
+    return WebSocketSupervisor(KRAKEN_WS_AUTH_URL, PRIVATE_SUBSCRIPTIONS, on_message,
+                               token_provider=token_provider, token=token,
+                               on_gap=account.request_reconcile,
+                               on_reconnect=account.request_reconcile, name="private feed")
+
+async def supervise_until_stopped(supervisor, stop_event):
+    task = asyncio.create_task(supervisor.run())
+    while not stop_event.is_set() and not task.done():
+        await asyncio.sleep(0.5)
+    await supervisor.stop()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    logging.info(f"Private feed: {supervisor.metrics()}")
+
+def start_ws_listener(token, config):
+    async def fetch_token():
+        return await asyncio.get_running_loop().run_in_executor(None, get_ws_token, config)
+
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
-    loop.run_until_complete(kraken_ws_subscribe(token, ws_stop_event))
+    supervisor = private_feed_supervisor(private_dispatcher(record_fill).dispatch, fetch_token, token)
+    loop.run_until_complete(supervise_until_stopped(supervisor, ws_stop_event))
     loop.close()
 
 # ============================ Trading Logic ============================
 
+def strategy_order(config):
+    """Returns the order the strategy wants to place now, or None."""
+    # This is a placeholder for the actual trading logic
+    # Example action: Place a market buy order
+    if not config['live_trading']:
+        return None
+    return {
+        "ordertype": "market",
+        "type": "buy",
+        "volume": "0.5",
+        "pair": "XRPUSD"
+    }
+
 def trading_strategy(config):
     # Implement your trading strategy here
-    # This is a placeholder for the actual trading logic
     # For example, periodically check market data and place orders
     while not ws_stop_event.is_set():
-        # Example action: Place a market buy order
-        if config['live_trading']:
-            order_details = {
-                "ordertype": "market",
-                "type": "buy",
-                "volume": "0.5",
-                "pair": "XRPUSD"
-            }
+        if account.reconcile_due():
+            private_call = lambda endpoint, data: kraken_private_api(endpoint, data, config)
+            for fill in reconcile_from_rest(account, private_call):
+                record_fill(fill)
+        trace = TickTrace("strategy")
+        order_details = strategy_order(config)
+        trace.mark("decision")
+        if order_details:
             response = kraken_add_order(order_details, config)
+            trace.finish()
             logging.info(f"Order placed: {response}")
         # Wait before next action
-        time.sleep(60)  # Adjust the interval as needed
+        time.sleep(STRATEGY_INTERVAL)  # Adjust the interval as needed
+
+# ============================ Async Runner ============================
+
+async def async_private_api(client, endpoint, data, config):
+    """Async counterpart of kraken_private_api."""
+    import requests
+
+    signer = get_signing_context(config['api_key'], config['api_secret'])
+    try:
+        response_json = await client.private(endpoint, data, signer)
+    except requests.RequestException as e:
+        logging.error(f"API request to {endpoint} failed: {e}")
+        return {'error': [str(e)]}
+    if response_json.get('error'):
+        logging.error(f"API Error: {response_json['error']}")
+    return response_json
+
+async def reconcile_task(client, config, on_fill):
+    """Corrects the WebSocket-fed account from REST every RECONCILE_INTERVAL, or on request.
+
+    Fills the feed missed go to on_fill, like the feed's own.
+    """
+    while True:
+        if not account.reconcile_due():
+            await asyncio.sleep(RECONCILE_CHECK_INTERVAL)
+            continue
+        history_request = account.history_request()
+        balance, open_orders, history = await asyncio.gather(
+            async_private_api(client, '/0/private/Balance', {}, config),
+            async_private_api(client, '/0/private/OpenOrders', {}, config),
+            async_private_api(client, '/0/private/TradesHistory', history_request, config),
+        )
+        missed = account.reconcile(
+            balance['result'] if not balance.get('error') else None,
+            open_orders['result']['open'] if not open_orders.get('error') else None,
+            history['result']['trades'] if not history.get('error') else None,
+        )
+        for fill in missed:
+            on_fill(fill)
+        logging.info(f"Positions: {account.pnl()}")
+
+async def strategy_task(client, config, fills):
+    """Runs the strategy every STRATEGY_INTERVAL and logs the fills that arrive in between.
+
+    A fill only updates the account (record_fill/on_fill did that) and is
+    logged here; it does not re-run the strategy, whose market order would
+    fill and trigger the next one.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        trace = TickTrace("strategy")
+        order_details = strategy_order(config)
+        trace.mark("decision")
+        if order_details:
+            response = await async_private_api(client, '/0/private/AddOrder', order_details, config)
+            trace.finish()
+            logging.info(f"Order placed: {response}")
+        due = loop.time() + STRATEGY_INTERVAL
+        while loop.time() < due:
+            # asyncio.wait rather than wait_for: wait_for can swallow a cancel
+            # that arrives just as a fill does, leaving this task unstoppable.
+            next_fill = asyncio.ensure_future(fills.get())
+            try:
+                await asyncio.wait({next_fill}, timeout=due - loop.time())
+            finally:
+                next_fill.cancel()
+            if next_fill.done() and not next_fill.cancelled():
+                fill = next_fill.result()
+                logging.info(f"Fill {fill.get('txid')}: {fill.get('type')} {fill.get('vol')} "
+                             f"{fill.get('pair')} @ {fill.get('price')}")
+
+async def engine_fills_task(engine, fills):
+    while True:
+        engine.on_fill(await fills.get())
+
+async def run_bot_async(config):
+    """Runs strategy, order placement, balance polling and ownTrades on one loop.
+
+    Orders, fills and positions come from the ownTrades/openOrders feeds;
+    REST only reconciles them every RECONCILE_INTERVAL. With `pairs` in
+    config.json, a MultiPairEngine trades every listed pair concurrently.
+    """
+    from scripts.kraken.async_client import AsyncKrakenClient
+    from scripts.trading.engine import MultiPairEngine
+
+    client = AsyncKrakenClient()
+    response = await async_private_api(client, '/0/private/GetWebSocketsToken', {}, config)
+    if response.get('error'):
+        logging.error("Could not get WebSocket token. Exiting bot.")
+        await client.close()
+        return
+
+    fills = asyncio.Queue()
+
+    def on_fill(fill):
+        log_trade(fill)
+        fills.put_nowait(fill)
+
+    async def fetch_token():
+        token_response = await async_private_api(client, '/0/private/GetWebSocketsToken', {}, config)
+        return None if token_response.get('error') else token_response['result']['token']
+
+    supervisor = private_feed_supervisor(private_dispatcher(on_fill).dispatch, fetch_token,
+                                         response['result']['token'])
+    tasks = [
+        asyncio.create_task(supervisor.run(), name="private-feed"),
+        asyncio.create_task(reconcile_task(client, config, on_fill), name="reconcile"),
+    ]
+    if config.get('pairs'):
+        engine = MultiPairEngine(config, client=client, account=account)
+        tasks += [
+            asyncio.create_task(engine.run(), name="engine"),
+            asyncio.create_task(engine_fills_task(engine, fills), name="engine-fills"),
+        ]
+    else:
+        tasks.append(asyncio.create_task(strategy_task(client, config, fills), name="strategy"))
+    try:
+        # Every task runs until cancelled; if one ends, stop the others with it
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception():
+                logging.error(f"Bot task {task.get_name()} failed: {task.exception()!r}")
+            else:
+                logging.error(f"Bot task {task.get_name()} returned unexpectedly; stopping the bot.")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logging.info(f"Private feed: {supervisor.metrics()}")
+        await client.close()
+
+def log_client_stats():
+    from scripts.kraken.client import get_shared_client
+
+    logging.info(f"REST latency: {get_shared_client().latency_snapshot()}")
+    logging.info(f"Rate limit utilisation: {get_shared_client().rate_limiter.utilisation()}")
 
 def main():
+    configure_logging(LOG_FILE)
     config = load_config()
 
     # Check if live trading is enabled
@@ -178,6 +328,18 @@ def main():
         logging.info("Live trading is disabled. Exiting bot.")
         return
 
+    # Prometheus text on /metrics, summaries on /metrics.json (read by the dashboard)
+    if config.get('metrics_port', METRICS_PORT):
+        serve_metrics(config.get('metrics_port', METRICS_PORT))
+
+    if config.get('async_runner') or config.get('pairs'):
+        try:
+            asyncio.run(run_bot_async(config))
+        except KeyboardInterrupt:
+            log_client_stats()
+            logging.info("Bot stopped.")
+        return
+
     # Get WebSocket token
     token = get_ws_token(config)
     if not token:
@@ -185,7 +347,7 @@ def main():
         return
 
     # Start WebSocket listener in a background thread
-    ws_thread = threading.Thread(target=start_ws_listener, args=(token,), daemon=True)
+    ws_thread = threading.Thread(target=start_ws_listener, args=(token, config), daemon=True)
     ws_thread.start()
 
     try:
@@ -195,6 +357,7 @@ def main():
         logging.info("Stopping trading bot...")
         ws_stop_event.set()
         ws_thread.join()
+        log_client_stats()
         logging.info("Bot stopped.")
 
 if __name__ == "__main__":
@@ -0,0 +1,272 @@
+"""Trains the LSTM return predictor on the historical bar store.
+
+    python -m scripts.training.models.train [--epochs N] [--workers N] [--resume]
+
+Bars are imported once from data/historical_data.csv into a ColumnStore
+(history/bars) and read back through np.memmap: DataLoader workers each
+stream their own shard of the history in chunks, so memory use does not
+grow with the length of the history. Inputs are windows of simple returns
+(the same definition as scripts.features.pipeline), scaled by RETURN_SCALE;
+the target is the next bar's scaled return.
+
+Checkpoints use the registry format ({'epoch', 'model_state_dict',
+'optimizer_state_dict', 'loss', 'val_loss', 'window', 'feature',
+'return_scale'}) and the registry manifest is rescanned at the end. The
+registry ranks checkpoints by val_loss among those with the same
+preprocessing, and MLModel applies that preprocessing when serving, so
+get_model() serves the best model from the default --checkpoint-dir. The
+resume state is not a checkpoint and is kept where the registry does not
+index it.
+"""
+import argparse
+import logging
+import math
+import os
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, IterableDataset
+
+from scripts.backtesting.engine import HISTORICAL_DATA_FILE
+from scripts.storage.columnar import ColumnStore
+from scripts.storage.model_registry import ModelRegistry
+from scripts.uilities.log_config import configure_logging
+from scripts.xrp_ml_model import build_network, scaled_returns
+
+# ============================ Configuration ============================
+
+HISTORY_STORE_DIR = os.path.join('history', 'bars')
+CHECKPOINT_DIR = os.path.join('scripts', 'checkpoints')
+RESUME_FILE = 'train_last.resume'   # not a CHECKPOINT_EXTENSIONS name: never indexed or served
+
+WINDOW = 60             # bars of returns per sample
+RETURN_SCALE = 100.0    # train on percent returns
+HIDDEN_SIZE = 50
+NUM_LAYERS = 2
+BATCH_SIZE = 256
+CHUNK_BATCHES = 16      # batches read from the store per chunk
+VAL_FRACTION = 0.1      # most recent windows held out for validation
+LEARNING_RATE = 1e-3
+EPOCHS = 50
+PATIENCE = 5            # epochs without validation improvement before stopping
+IMPORT_CHUNK_ROWS = 100_000
+
+# ============================ Data ============================
+
+def import_history(csv_path=HISTORICAL_DATA_FILE, store_dir=HISTORY_STORE_DIR,
+                   chunk_rows=IMPORT_CHUNK_ROWS):
+    """Appends CSV bars newer than the store's last row, reading the CSV in chunks."""
+    import pandas as pd
+
+    store = ColumnStore(store_dir)
+    last = store.last(1, names=['timestamp'])['timestamp'] if len(store) else None
+    last = last[0] if last is not None and len(last) else None
+    added = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        chunk.columns = [c.strip().lower() for c in chunk.columns]
+        time_col = next(c for c in ('timestamp', 'time', 'date') if c in chunk.columns)
+        if pd.api.types.is_numeric_dtype(chunk[time_col]):
+            times = pd.to_datetime(chunk[time_col], unit='s')
+        else:
+            times = pd.to_datetime(chunk[time_col])
+        price_col = 'close' if 'close' in chunk.columns else 'price'
+        frame = pd.DataFrame({
+            'timestamp': times.to_numpy(dtype='datetime64[ns]'),
+            'close': chunk[price_col].astype(float),
+            'volume': chunk['volume'].astype(float) if 'volume' in chunk.columns else 0.0,
+        })
+        if last is not None:
+            frame = frame[frame['timestamp'] > last]
+        if len(frame):
+            added += store.append(frame.to_dict('records'))
+    logging.info(f"Imported {added} bars from {csv_path} into {store_dir} ({len(store)} total).")
+    return store
+
+class ReturnWindows(IterableDataset):
+    """Yields (inputs, targets) batches of return windows from a ColumnStore.
+
+    Covers window start indices [start, stop). Each DataLoader worker takes
+    every num_workers-th chunk; with shuffle=True the chunk order and the
+    samples within each chunk are permuted per epoch (see set_epoch). The
+    store is opened inside the worker, so only paths are pickled.
+    """
+
+    def __init__(self, store_dir, start, stop, window=WINDOW, batch_size=BATCH_SIZE,
+                 shuffle=False, seed=0):
+        self.store_dir = store_dir
+        self.start, self.stop = start, stop
+        self.window = window
+        self.batch_size = batch_size
+        self.chunk = batch_size * CHUNK_BATCHES
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        return max(0, self.stop - self.start)
+
+    def _chunks(self):
+        starts = np.arange(self.start, self.stop, self.chunk)
+        if self.shuffle:
+            np.random.default_rng((self.seed, self.epoch)).shuffle(starts)
+        info = torch.utils.data.get_worker_info()
+        if info is not None:
+            starts = starts[info.id::info.num_workers]
+        return starts
+
+    def __iter__(self):
+        close = ColumnStore(self.store_dir).columns(names=['close'])['close']
+        rng = np.random.default_rng((self.seed, self.epoch, 1))
+        window = self.window
+        for lo in self._chunks():
+            hi = min(lo + self.chunk, self.stop)
+            # window + 1 returns per sample: `window` inputs and the target
+            prices = np.asarray(close[lo:hi + window + 1], dtype=np.float64)
+            returns = scaled_returns(prices, RETURN_SCALE)
+            samples = np.lib.stride_tricks.sliding_window_view(returns, window + 1)[:hi - lo]
+            order = rng.permutation(len(samples)) if self.shuffle else np.arange(len(samples))
+            for b in range(0, len(order), self.batch_size):
+                batch = np.ascontiguousarray(samples[order[b:b + self.batch_size]], dtype=np.float32)
+                inputs = torch.from_numpy(batch[:, :window]).unsqueeze(-1)
+                targets = torch.from_numpy(batch[:, window:])
+                yield inputs, targets
+
+def make_loaders(store, window, batch_size, workers, seed):
+    """Train/validation loaders split by time: the newest windows validate."""
+    windows = len(store) - window - 1
+    if windows <= 0:
+        raise ValueError(f"Need more than {window + 1} bars in {store.directory}, have {len(store)}")
+    split = int(windows * (1 - VAL_FRACTION))
+    train_set = ReturnWindows(store.directory, 0, split, window, batch_size, shuffle=True, seed=seed)
+    val_set = ReturnWindows(store.directory, split, windows, window, batch_size)
+    options = dict(batch_size=None, num_workers=workers, pin_memory=torch.cuda.is_available())
+    if workers:
+        options["prefetch_factor"] = 4
+    return train_set, DataLoader(train_set, **options), DataLoader(val_set, **options)
+
+# ============================ Training ============================
+
+def tune_threads(threads):
+    """Intra-op threads for the LSTM kernels; a single inter-op thread is enough."""
+    threads = threads or max(1, (os.cpu_count() or 1) // 2)
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already fixed once parallel work has started
+    return threads
+
+def save_checkpoint(path, state):
+    tmp_path = path + '.tmp'
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+
+def run_epoch(model, loader, optimizer=None):
+    """One pass over a loader; trains when an optimizer is given. Returns (loss, samples)."""
+    loss_fn = torch.nn.MSELoss(reduction='sum')
+    total, samples = 0.0, 0
+    model.train(optimizer is not None)
+    with torch.set_grad_enabled(optimizer is not None):
+        for inputs, targets in loader:
+            loss = loss_fn(model(inputs), targets)
+            if optimizer is not None:
+                optimizer.zero_grad(set_to_none=True)
+                (loss / len(inputs)).backward()
+                optimizer.step()
+            total += loss.item()
+            samples += len(inputs)
+    return total / max(1, samples), samples
+
+def train(store_dir=HISTORY_STORE_DIR, checkpoint_dir=CHECKPOINT_DIR, epochs=EPOCHS,
+          window=WINDOW, hidden_size=HIDDEN_SIZE, num_layers=NUM_LAYERS, batch_size=BATCH_SIZE,
+          learning_rate=LEARNING_RATE, patience=PATIENCE, workers=2, threads=None,
+          resume=False, seed=0):
+    """Trains with early stopping; returns the path of the best checkpoint written."""
+    threads = tune_threads(threads)
+    torch.manual_seed(seed)
+    store = ColumnStore(store_dir)
+    train_set, train_loader, val_loader = make_loaders(store, window, batch_size, workers, seed)
+
+    model = build_network(1, hidden_size, num_layers, 1)
+    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    resume_path = os.path.join(checkpoint_dir, RESUME_FILE)
+    first_epoch, best_loss, best_path, stale = 1, math.inf, None, 0
+    if resume and os.path.exists(resume_path):
+        state = torch.load(resume_path, map_location='cpu', weights_only=True)
+        model.load_state_dict(state['model_state_dict'])
+        optimizer.load_state_dict(state['optimizer_state_dict'])
+        first_epoch = state['epoch'] + 1
+        best_loss, best_path, stale = state['best_val_loss'], state['best_path'], state['stale_epochs']
+        logging.info(f"Resuming from {resume_path} at epoch {first_epoch}.")
+
+    logging.info(f"Training on {len(train_set)} windows with {workers} loader workers "
+                 f"and {threads} threads.")
+    for epoch in range(first_epoch, epochs + 1):
+        train_set.set_epoch(epoch)
+        started = time.perf_counter()
+        train_loss, samples = run_epoch(model, train_loader, optimizer)
+        elapsed = time.perf_counter() - started
+        val_loss, _ = run_epoch(model, val_loader)
+
+        improved = val_loss < best_loss
+        if improved:
+            best_loss, stale = val_loss, 0
+        else:
+            stale += 1
+        state = {
+            'epoch': epoch,
+            'model_state_dict': model.state_dict(),
+            'optimizer_state_dict': optimizer.state_dict(),
+            'loss': train_loss,
+            'val_loss': val_loss,
+            'window': window,
+            'feature': 'return',
+            'return_scale': RETURN_SCALE,
+        }
+        if improved:
+            best_path = os.path.join(checkpoint_dir, f"xrp_lstm_epoch_{epoch}.pt")
+            save_checkpoint(best_path, state)
+        save_checkpoint(resume_path, dict(state, best_val_loss=best_loss, best_path=best_path,
+                                          stale_epochs=stale))
+        logging.info(f"Epoch {epoch}: train_loss={train_loss:.6f} val_loss={val_loss:.6f} "
+                     f"{samples / elapsed:,.0f} samples/sec{' (best)' if improved else ''}")
+        print(f"epoch {epoch:3d}  train {train_loss:.6f}  val {val_loss:.6f}  "
+              f"{samples / elapsed:10,.0f} samples/sec{'  *' if improved else ''}")
+        if stale >= patience:
+            logging.info(f"No validation improvement for {patience} epochs; stopping.")
+            break
+
+    ModelRegistry().scan()
+    return best_path
+
+def main():
+    configure_logging('training.log', fmt='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Train the LSTM predictor on historical bars.")
+    parser.add_argument('--data', default=HISTORICAL_DATA_FILE)
+    parser.add_argument('--store', default=HISTORY_STORE_DIR)
+    parser.add_argument('--checkpoint-dir', default=CHECKPOINT_DIR)
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--window', type=int, default=WINDOW)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--lr', type=float, default=LEARNING_RATE)
+    parser.add_argument('--patience', type=int, default=PATIENCE)
+    parser.add_argument('--workers', type=int, default=2, help="DataLoader worker processes")
+    parser.add_argument('--threads', type=int, help="torch intra-op threads (default: half the cores)")
+    parser.add_argument('--resume', action='store_true', help=f"continue from {RESUME_FILE}")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if os.path.exists(args.data) and os.path.getsize(args.data):
+        import_history(args.data, args.store)
+    best = train(args.store, args.checkpoint_dir, args.epochs, args.window,
+                 batch_size=args.batch_size, learning_rate=args.lr, patience=args.patience,
+                 workers=args.workers, threads=args.threads, resume=args.resume, seed=args.seed)
+    print(f"Best checkpoint: {best}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+
+# ============================ Configuration ============================
+
+CHART_POINTS = 1200   # roughly the chart's width in pixels; more points are not visible
+MAX_MARKERS = 400     # trade markers drawn per chart; evenly thinned beyond this
+
+# ============================ Cache Keys ============================
+
+def file_signature(*paths):
+    """(path, size, mtime_ns) per path; changes whenever a file is appended to or replaced."""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+# ============================ Downsampling ============================
+
+def _as_float(times):
+    """Datetimes as float seconds from the first point; numbers are returned as floats."""
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.datetime64):
+        ints = times.astype('M8[ns]').view('i8')
+        return (ints - ints[0]) / 1e9 if len(ints) else ints.astype(np.float64)
+    return times.astype(np.float64)
+
+def lttb(times, values, threshold):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps out of len(values).
+
+    Keeps the first and last point and, from each of threshold - 2 equal
+    buckets, the point forming the largest triangle with the previously
+    kept point and the next bucket's average, which preserves peaks,
+    troughs and the overall shape far better than striding.
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = _as_float(times)
+    y = np.asarray(values, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_lo, next_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        if next_hi <= next_lo:
+            next_hi = next_lo + 1
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+def minmax_indices(values, buckets):
+    """Indices of the minimum and maximum of each of `buckets` equal buckets, in order.
+
+    Cheaper than LTTB and guarantees every extreme survives, which is what a
+    drawdown chart needs.
+    """
+    n = len(values)
+    if buckets * 2 >= n:
+        return np.arange(n)
+    y = np.asarray(values, dtype=np.float64)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+    bucket_of = np.repeat(np.arange(buckets), np.diff(np.append(edges, n)))
+    keep = [np.array([0, n - 1])]
+    for reduce, missing in ((np.minimum, np.inf), (np.maximum, -np.inf)):
+        filled = np.where(np.isnan(y), missing, y)
+        extreme = reduce.reduceat(filled, edges)
+        hits = np.flatnonzero(filled == extreme[bucket_of])
+        # first occurrence of the extreme in each bucket
+        _, first = np.unique(bucket_of[hits], return_index=True)
+        keep.append(hits[first])
+    return np.unique(np.concatenate(keep))
+
+def downsample(times, values, points=CHART_POINTS, method='lttb'):
+    """(times, values) reduced to about `points` points with LTTB or min/max buckets."""
+    if method == 'minmax':
+        index = minmax_indices(values, max(1, points // 2))
+    else:
+        index = lttb(times, values, points)
+    return np.asarray(times)[index], np.asarray(values)[index]
+
+# ============================ Series ============================
+
+def drawdown(values):
+    """Fraction below the running peak (0 at a new high, -0.25 when 25% down)."""
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return values
+    peak = np.fmax.accumulate(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(peak > 0, values / peak - 1.0, 0.0)
+
+def trade_markers(trade_times, sides, times, values, limit=MAX_MARKERS):
+    """{'buy'/'sell': (times, y)} with y the portfolio value interpolated at each trade."""
+    markers = {}
+    if not len(trade_times) or not len(times):
+        return markers
+    x = np.asarray(times).astype('M8[ns]').view('i8').astype(np.float64)
+    trade_x = np.asarray(trade_times).astype('M8[ns]').view('i8').astype(np.float64)
+    y = np.interp(trade_x, x, np.asarray(values, dtype=np.float64))
+    sides = np.asarray(sides)
+    for side in ('buy', 'sell'):
+        index = np.flatnonzero(sides == side)
+        if len(index) > limit:
+            index = index[np.linspace(0, len(index) - 1, limit).astype(np.int64)]
+        if len(index):
+            markers[side] = (np.asarray(trade_times)[index], y[index])
+    return markers
@@ -0,0 +1,95 @@
+import bisect
+import threading
+
+# ============================ Configuration ============================
+
+# Bucket upper bounds in seconds: 50us to ~2 minutes, growing by ~19% per
+# bucket (4 buckets per doubling), which keeps percentile error under 10%.
+MIN_BOUND = 50e-6
+GROWTH = 2 ** 0.25
+BUCKET_COUNT = 90
+
+def _bounds():
+    bounds = []
+    value = MIN_BOUND
+    for _ in range(BUCKET_COUNT):
+        bounds.append(value)
+        value *= GROWTH
+    return bounds
+
+BUCKET_BOUNDS = _bounds()
+
+# ============================ Histogram ============================
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with cheap, thread-safe recording."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (BUCKET_COUNT + 1)  # last bucket is overflow
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        index = bisect.bisect_left(BUCKET_BOUNDS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (BUCKET_COUNT + 1)
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+    def merge(self, other):
+        """Adds another histogram's observations to this one."""
+        with other._lock:
+            counts, count, total, maximum = list(other.counts), other.count, other.total, other.max
+        with self._lock:
+            self.counts = [a + b for a, b in zip(self.counts, counts)]
+            self.count += count
+            self.total += total
+            self.max = max(self.max, maximum)
+        return self
+
+    def percentile(self, pct):
+        """Returns the upper bound (seconds) of the bucket holding the pct-th percentile."""
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            rank = pct / 100.0 * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank and count:
+                    return min(BUCKET_BOUNDS[index], self.max) if index < BUCKET_COUNT else self.max
+            return self.max
+
+    def cumulative(self):
+        """[(upper bound in seconds, observations <= bound)], then (inf, count), plus the sum."""
+        with self._lock:
+            counts, total = list(self.counts), self.total
+        buckets, seen = [], 0
+        for bound, count in zip(BUCKET_BOUNDS, counts):
+            seen += count
+            buckets.append((bound, seen))
+        buckets.append((float('inf'), seen + counts[-1]))
+        return buckets, total
+
+    def snapshot(self):
+        """Summary in milliseconds, suitable for logging."""
+        count = self.count
+        return {
+            "count": count,
+            "mean_ms": (self.total / count * 1000) if count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p90_ms": self.percentile(90) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+        }
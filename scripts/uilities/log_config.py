@@ -0,0 +1,151 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+# ============================ Configuration ============================
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(message)s'
+MAX_BYTES = 20 * 1024 * 1024   # rotate a log file at this size...
+BACKUP_COUNT = 5               # ...keeping this many old files
+RATE_LIMIT = 50                # records/second per module below WARNING...
+RATE_BURST = 200               # ...after an initial burst of this many
+
+# Shared logs/ files are anchored at the repository root, not the working directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+LOG_DIR = os.path.join(REPO_ROOT, 'logs')
+
+# ============================ Formatting and Filtering ============================
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, module, message and exc_info if any."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "module": record.module,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per source module for records below WARNING.
+
+    Warnings and errors always pass. Dropped records are counted and the
+    count is appended to the module's next record that gets through.
+    """
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST, rates=None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.rates = rates or {}   # module -> records/second, overriding `rate`
+        self._buckets = {}          # module -> [tokens, last refill, dropped]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.module, self.rate)
+        if not rate:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(record.module)
+            if bucket is None:
+                bucket = self._buckets[record.module] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            dropped, bucket[2] = bucket[2], 0
+        if dropped:
+            record.msg = f"{record.getMessage()} [{dropped} earlier {record.module} messages suppressed]"
+            record.args = None
+        return True
+
+# ============================ Setup ============================
+
+_listener = None
+_setup_lock = threading.RLock()
+
+def _file_handler(filename, max_bytes, backup_count, when):
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(filename, when=when, backupCount=backup_count,
+                                                         encoding='utf-8')
+    return logging.handlers.RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count,
+                                                encoding='utf-8')
+
+def configure_logging(filename, level=logging.INFO, fmt=LOG_FORMAT, datefmt=None, json_lines=False,
+                      max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT, when=None, rate=RATE_LIMIT,
+                      rates=None, console=False):
+    """Routes all logging through a queue to a rotating file written by a background thread.
+
+    Log calls only format the record and put it on a queue; a QueueListener
+    thread does the file I/O. Files rotate at `max_bytes`, or on a schedule
+    when `when` is given ('midnight', 'H', ...). json_lines writes one JSON
+    object per line. Records below WARNING are rate limited per module
+    (`rate` per second, `rates` per module; 0 disables).
+
+    Call it once from each entry point. Calling it again replaces the
+    previous configuration, so an imported module can never claim the log
+    file first.
+    """
+    global _listener
+    with _setup_lock:
+        handlers = [_file_handler(filename, max_bytes, backup_count, when)]
+        if console:
+            handlers.append(logging.StreamHandler())
+        formatter = JsonFormatter(datefmt=datefmt) if json_lines else logging.Formatter(fmt, datefmt)
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(rate, RATE_BURST, rates))
+
+        _stop_listener()
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+            handler.close()
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    return _listener
+
+def ensure_logging(filename, **options):
+    """configure_logging() unless an entry point has already configured logging."""
+    with _setup_lock:
+        if not logging.getLogger().handlers:
+            configure_logging(filename, **options)
+
+def _stop_listener():
+    """Drains the queue and closes the files of the current listener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+def shutdown_logging():
+    with _setup_lock:
+        _stop_listener()
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,147 @@
+import logging
+import os
+import re
+import threading
+from collections import deque
+
+# ============================ Configuration ============================
+
+DEFAULT_MAX_LINES = 2000
+DEFAULT_BACKFILL_BYTES = 256 * 1024   # history loaded the first time a file is seen
+DEFAULT_MAX_READ_BYTES = 4 * 1024 * 1024  # cap per poll; older bytes are skipped
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+_LEVEL_RE = re.compile(r"\b(DEBUG|INFO|WARNING|ERROR|CRITICAL)\b")
+# A record starts with its asctime ('2024-12-27 10:00:00,123') or is a JSON line
+_RECORD_START_RE = re.compile(r"\d{4}-\d\d-\d\d[ T]\d\d:\d\d|\{")
+
+# ============================ Log Tailer ============================
+
+def parse_level(line, previous=None):
+    """Returns the numeric level of a formatted log line (INFO if none is found).
+
+    Lines that do not start a record, such as traceback lines, belong to the
+    record before them and take its level, `previous`, when it is known.
+    """
+    if previous is not None and not _RECORD_START_RE.match(line):
+        return previous
+    match = _LEVEL_RE.search(line, 0, 80)
+    return LEVELS[match.group(1)] if match else LEVELS["INFO"]
+
+class LogTailer:
+    """Follows a log file like `tail -F`, keeping only the most recent lines.
+
+    Each poll() reads just the bytes appended since the previous poll, so the
+    cost depends on how much was logged in between, not on the file size.
+    The file is identified by (device, inode): when it is rotated or
+    truncated, the rest of the old file is drained through the handle that is
+    still open and the new file is read from the start.
+    """
+
+    def __init__(self, path, max_lines=DEFAULT_MAX_LINES,
+                 backfill_bytes=DEFAULT_BACKFILL_BYTES,
+                 max_read_bytes=DEFAULT_MAX_READ_BYTES):
+        self.path = path
+        self.max_read_bytes = max_read_bytes
+        self.backfill_bytes = backfill_bytes
+        self._lines = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self._file = None
+        self._identity = None
+        self._offset = 0
+        self._partial = b""
+        self._level = None   # level of the last record, inherited by its continuation lines
+
+    # ---- reading ----
+
+    def poll(self):
+        """Reads newly appended lines. Returns how many complete lines were added."""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return 0
+            identity = (stat.st_dev, stat.st_ino)
+            added = 0
+            if self._file is None:
+                added += self._open(identity, stat.st_size, backfill=True)
+            elif identity != self._identity:
+                # Rotated: finish the old file, then follow the new one
+                added += self._read_available()
+                self._flush_partial()
+                self._close()
+                added += self._open(identity, stat.st_size, backfill=False)
+            elif stat.st_size < self._offset:
+                # Truncated in place (copytruncate rotation)
+                logging.info(f"Log file {self.path} was truncated; re-reading from start.")
+                self._offset = 0
+                self._partial = b""
+            added += self._read_available()
+            return added
+
+    def _open(self, identity, size, backfill):
+        self._file = open(self.path, 'rb')
+        self._identity = identity
+        self._partial = b""
+        self._offset = 0
+        if backfill and size > self.backfill_bytes:
+            # Start mid-file and discard the first, probably partial, line
+            self._offset = size - self.backfill_bytes
+            self._file.seek(self._offset)
+            skipped = self._file.readline()
+            self._offset += len(skipped)
+        return 0
+
+    def _read_available(self):
+        self._file.seek(0, os.SEEK_END)
+        end = self._file.tell()
+        if end - self._offset > self.max_read_bytes:
+            # Too far behind to be worth reading everything; jump ahead
+            self._offset = end - self.max_read_bytes
+            self._partial = b""
+            self._file.seek(self._offset)
+            self._offset += len(self._file.readline())
+        self._file.seek(self._offset)
+        data = self._file.read(end - self._offset)
+        self._offset += len(data)
+        if not data:
+            return 0
+        data = self._partial + data
+        *complete, self._partial = data.split(b"\n")
+        for raw in complete:
+            self._append(raw)
+        return len(complete)
+
+    def _flush_partial(self):
+        if self._partial:
+            self._append(self._partial)
+            self._partial = b""
+
+    def _append(self, raw):
+        line = raw.decode('utf-8', errors='replace').rstrip('\r')
+        if line:
+            self._level = parse_level(line, self._level)
+            self._lines.append((self._level, line))
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    # ---- querying ----
+
+    def lines(self, min_level=None, contains=None, limit=None):
+        """Returns buffered lines at or above `min_level` that contain `contains`."""
+        threshold = LEVELS.get(min_level, 0) if isinstance(min_level, str) else (min_level or 0)
+        needle = contains.lower() if contains else None
+        with self._lock:
+            selected = [line for level, line in self._lines
+                        if level >= threshold and (needle is None or needle in line.lower())]
+        return selected[-limit:] if limit else selected
+
+    def text(self, min_level=None, contains=None, limit=None):
+        return "\n".join(self.lines(min_level, contains, limit))
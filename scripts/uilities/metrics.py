@@ -0,0 +1,218 @@
+import json
+import logging
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+from scripts.uilities.latency import LatencyHistogram
+
+# ============================ Configuration ============================
+
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = 9108
+PREFIX = 'kraken_bot_'
+
+# ============================ Registry ============================
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+class Metrics:
+    """Process-wide counters and latency histograms, exported in Prometheus text format.
+
+    Recording is a dict lookup plus a histogram bucket increment. Objects
+    that already keep their own counts (feeds, supervisors) register as
+    collectors instead and are only read when the endpoint is scraped.
+    """
+
+    def __init__(self):
+        self.counters = defaultdict(float)
+        self.histograms = defaultdict(LatencyHistogram)
+        self._collectors = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] += value
+
+    def observe(self, name, seconds, **labels):
+        self.histograms[_key(name, labels)].record(seconds)
+
+    def histogram(self, name, **labels):
+        return self.histograms[_key(name, labels)]
+
+    def span(self, name, **labels):
+        """Times a block: `with metrics.span('decision_seconds'): ...`."""
+        return Span(self.histograms[_key(name, labels)])
+
+    def add_collector(self, collector):
+        """Registers an object whose collect() yields (name, labels, value) counter samples."""
+        self._collectors.add(collector)
+        return collector
+
+    def _collected(self):
+        samples = defaultdict(float)
+        for collector in list(self._collectors):
+            try:
+                for name, labels, value in collector.collect():
+                    samples[_key(name, labels)] += value
+            except Exception as e:
+                logging.error(f"Metrics collector {collector!r} failed: {e}")
+        return samples
+
+    def reset(self):
+        """Zeroes every counter and histogram, e.g. after a benchmark's warm-up.
+
+        Histograms are emptied in place, so references held by callers
+        (signing's sign_seconds) keep recording into the registry.
+        """
+        with self._lock:
+            self.counters.clear()
+        for histogram in list(self.histograms.values()):
+            histogram.reset()
+
+    def prometheus(self):
+        """The exposition text served on /metrics."""
+        with self._lock:
+            counters = dict(self.counters)
+        for key, value in self._collected().items():
+            counters[key] = counters.get(key, 0) + value
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            for (sample, labels), value in sorted(counters.items()):
+                if sample == name:
+                    lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value:g}")
+        histograms = dict(self.histograms)
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for (sample, labels), histogram in sorted(histograms.items(), key=lambda item: item[0]):
+                if sample != name:
+                    continue
+                buckets, total = histogram.cumulative()
+                for bound, count in buckets:
+                    le = '+Inf' if bound == float('inf') else f"{bound:.6g}"
+                    lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, {'le': le})} {count}")
+                lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {total:.9g}")
+                lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {buckets[-1][1]}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """{'counters': {...}, 'latency': {...}} with histogram summaries in ms, for /metrics.json."""
+        def label(name, labels):
+            return name + _format_labels(labels)
+
+        with self._lock:
+            counters = dict(self.counters)
+        for key, value in self._collected().items():
+            counters[key] = counters.get(key, 0) + value
+        return {
+            "counters": {label(*key): value for key, value in sorted(counters.items())},
+            "latency": {label(*key): hist.snapshot() for key, hist in sorted(self.histograms.items())},
+        }
+
+class Span:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.started)
+        return False
+
+metrics = Metrics()
+
+# ============================ Tick-to-Order Tracing ============================
+
+class TickTrace:
+    """Follows one price tick to the order it caused.
+
+    Created when the price arrives (pass the arrival time from the feed if
+    it arrived earlier), marked after each stage, and finished once the
+    AddOrder response is back. Each stage's duration goes to
+    stage_seconds{stage=...} and the total to tick_to_order_seconds.
+    Signing is timed inside SigningContext as sign_seconds.
+    """
+
+    __slots__ = ('source', 'started', 'last')
+
+    def __init__(self, source, started=None):
+        self.source = source
+        self.started = started if started is not None else time.perf_counter()
+        self.last = self.started
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        metrics.observe('stage_seconds', now - self.last, stage=stage, source=self.source)
+        self.last = now
+        return now
+
+    def finish(self):
+        """Marks the order stage and records the whole tick-to-order latency."""
+        now = self.mark('order')
+        metrics.observe('tick_to_order_seconds', now - self.started, source=self.source)
+        return now - self.started
+
+# ============================ HTTP Endpoint ============================
+
+def serve_metrics(port=METRICS_PORT, host=METRICS_HOST):
+    """Serves /metrics (Prometheus) and /metrics.json from a daemon thread; returns the server."""
+    # Imported here: http.server is slow to import and only the bot process serves
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path == '/metrics':
+                body, content_type = metrics.prometheus(), 'text/plain; version=0.0.4'
+            elif path == '/metrics.json':
+                body, content_type = json.dumps(metrics.snapshot()), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            data = body.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass  # scrapes every few seconds would flood the bot log
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logging.error(f"Could not serve metrics on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    logging.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+def fetch_metrics(port=METRICS_PORT, host=METRICS_HOST, timeout=0.5):
+    """The /metrics.json snapshot of a running bot, or None if it is not reachable."""
+    import urllib.error
+    import urllib.request
+
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics.json", timeout=timeout) as response:
+            return json.load(response)
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
@@ -1,15 +1,15 @@
 import logging
+import os
 
-# Configure logging
-logging.basicConfig(
-    filename="../../logs/xrp_trading.log",
-    filemode="a",
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-)
+from scripts.uilities.log_config import LOG_DIR, ensure_logging
+
+# Used only when no entry point has configured logging (see log_config)
+LOG_FILE = os.path.join(LOG_DIR, "xrp_trading.log")
 
 def log_info(message):
-    logging.info(message)
+    ensure_logging(LOG_FILE)
+    logging.info(message, stacklevel=2)
 
 def log_error(message):
-    logging.error(message)
+    ensure_logging(LOG_FILE)
+    logging.error(message, stacklevel=2)
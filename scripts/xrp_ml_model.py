@@ -1,18 +1,18 @@
 import logging
-import json
-import requests
-import hashlib
-import hmac
-import base64
+import os
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import Future
 
-# Logging Configuration
-logging.basicConfig(
-    filename="shib_sniping_bot.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+import numpy as np
+
+from scripts.kraken.client import get_shared_client
+from scripts.kraken.market_data import MarketDataFeed
+from scripts.kraken.signing import get_signing_context
+from scripts.trading.positions import AccountState
+from scripts.uilities.log_config import configure_logging
+from scripts.uilities.metrics import TickTrace, serve_metrics
 
 # Constants
 BUY_THRESHOLD = 0.0000075
@@ -20,39 +20,44 @@ SELL_THRESHOLD = 0.0000085
 MIN_TRADE_VOLUME = 5000  # Minimum SHIB volume for trades
 TRADE_AMOUNT_USD = 3.0  # Maximum trade amount in USD
 TARGET_PROFIT = 100.0  # Target profit in USD
-API_CALL_LIMIT_SHORT = 5.0  # Minimum seconds between short API calls
-API_CALL_LIMIT_LONG = 10.0  # Minimum seconds between long API calls
+LOOP_INTERVAL = 1.0  # Seconds between strategy checks
+
+# Model inference
+MODEL_CHECKPOINT = os.path.join("scripts", "checkpoints", "xrp_predictor.pt")
+MAX_BATCH_SIZE = 64       # windows per forward pass
+MAX_BATCH_WAIT = 0.005    # seconds the batcher waits for more requests
+PREDICTION_CACHE_SIZE = 1024
+
+def price_signal(price, buy_threshold=BUY_THRESHOLD, sell_threshold=SELL_THRESHOLD):
+    """Return 1 to buy, -1 to sell, 0 to hold.
+
+    Works on a single price or a NumPy array of prices, so the backtester
+    evaluates exactly the rule the live bot trades on.
+    """
+    return (price < buy_threshold) * 1 - (price > sell_threshold) * 1
 
 class SHIBSnipingBot:
-    def __init__(self, api_key, private_key):
+    def __init__(self, api_key, private_key, market_data=None, buy_threshold=None, sell_threshold=None):
         self.api_key = api_key
         self.private_key = private_key
         self.wallet_balance = {}
-        self.last_api_call = 0
         self.open_orders = []
         self.pnl = 0.0
-
-    def throttle_api_calls(self, long_interval=False):
-        """Ensure we respect Kraken's API call limits."""
-        now = time.time()
-        elapsed = now - self.last_api_call
-        limit = API_CALL_LIMIT_LONG if long_interval else API_CALL_LIMIT_SHORT
-        if elapsed < limit:
-            time.sleep(limit - elapsed)
-        self.last_api_call = time.time()
+        self.client = get_shared_client()
+        self.signer = get_signing_context(api_key, private_key)
+        self.market_data = market_data
+        self.account = AccountState()
+        self.trace = None   # TickTrace of the price the current decision is based on
+        self.buy_threshold = BUY_THRESHOLD if buy_threshold is None else buy_threshold
+        self.sell_threshold = SELL_THRESHOLD if sell_threshold is None else sell_threshold
 
     def fetch_wallet_balance(self):
         """Fetch wallet balance for all assets."""
-        self.throttle_api_calls()
-        url = "https://api.kraken.com/0/private/Balance"
-        payload = {"nonce": int(time.time() * 1000)}
-        headers = self._generate_headers("/0/private/Balance", payload)
-
         try:
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
-            response_data = response.json()
-            if response.status_code == 200 and not response_data.get("error"):
-                self.wallet_balance = {k: float(v) for k, v in response_data["result"].items()}
+            response_data = self.client.private("/0/private/Balance", {}, self.signer)
+            if not response_data.get("error"):
+                self.account.reconcile(balance=response_data["result"])
+                self.wallet_balance = dict(self.account.balance)
                 logging.info(f"Wallet balance: {self.wallet_balance}")
                 print(f"Wallet balance: {self.wallet_balance}")
             else:
@@ -63,15 +68,10 @@ class SHIBSnipingBot:
 
     def fetch_open_orders(self):
         """Fetch open orders from Kraken."""
-        self.throttle_api_calls()
-        url = "https://api.kraken.com/0/private/OpenOrders"
-        payload = {"nonce": int(time.time() * 1000)}
-        headers = self._generate_headers("/0/private/OpenOrders", payload)
-
         try:
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
-            response_data = response.json()
-            if response.status_code == 200 and not response_data.get("error"):
+            response_data = self.client.private("/0/private/OpenOrders", {}, self.signer)
+            if not response_data.get("error"):
+                self.account.reconcile(open_orders=response_data["result"]["open"])
                 self.open_orders = response_data["result"]["open"]
                 logging.info(f"Open orders: {self.open_orders}")
                 print("Open Orders:")
@@ -83,22 +83,42 @@ class SHIBSnipingBot:
             logging.error(f"Error fetching open orders: {e}")
             print(f"Error fetching open orders: {e}")
 
-    def update_pnl(self, trade_profit):
-        """Update PnL based on trade profit."""
-        self.pnl += trade_profit
-        logging.info(f"Updated PnL: {self.pnl}")
-        print(f"Current PnL: {self.pnl} USD")
+    def fetch_trade_history(self):
+        """Book fills since the last known trade into the account."""
+        payload = self.account.history_request()
+        try:
+            response_data = self.client.private("/0/private/TradesHistory", payload, self.signer)
+            if not response_data.get("error"):
+                for fill in self.account.reconcile(trades=response_data["result"]["trades"]):
+                    logging.info(f"Fill {fill['txid']}: {fill.get('type')} {fill.get('vol')} "
+                                 f"{fill.get('pair')} @ {fill.get('price')}")
+            else:
+                logging.error(f"Error fetching trade history: {response_data}")
+        except Exception as e:
+            logging.error(f"Error fetching trade history: {e}")
+
+    def reconcile(self):
+        """Refresh balance, open orders and fills from REST."""
+        self.fetch_wallet_balance()
+        self.fetch_open_orders()
+        self.fetch_trade_history()
+
+    def update_pnl(self, pair="SHIB/USD"):
+        """Update PnL from the realised PnL of actual fills."""
+        pnl = self.account.position(pair).realised_pnl
+        if pnl != self.pnl:
+            self.pnl = pnl
+            logging.info(f"Updated PnL: {self.pnl}")
+            print(f"Current PnL: {self.pnl} USD")
 
     @staticmethod
     def fetch_price(pair):
         """Fetch current price of a trading pair using REST API."""
-        url = "https://api.kraken.com/0/public/Ticker"
         payload = {"pair": pair}
 
         try:
-            response = requests.get(url, params=payload)
-            response_data = response.json()
-            if response.status_code == 200 and not response_data.get("error"):
+            response_data = get_shared_client().public("/0/public/Ticker", payload)
+            if not response_data.get("error"):
                 price = float(response_data["result"][list(response_data["result"].keys())[0]]["c"][0])
                 logging.info(f"Fetched price for {pair}: {price}")
                 return price
@@ -109,12 +129,20 @@ class SHIBSnipingBot:
             print(f"Error fetching price for {pair}: {e}")
         return None
 
-    def execute_trade_rest(self, side, volume, price=None, pair="SHIB/USD"):
-        """Execute a trade using Kraken's REST API."""
-        self.throttle_api_calls()
-        url = "https://api.kraken.com/0/private/AddOrder"
+    def current_price(self, pair):
+        """Price from the WebSocket market data feed, falling back to REST."""
+        if self.market_data:
+            price = self.market_data.mid(pair)
+            if price:
+                self.trace = TickTrace("ws", self.market_data.tick_time(pair))
+                return price
+        price = self.fetch_price(pair)
+        self.trace = TickTrace("rest")
+        return price
+
+    def execute_trade_rest(self, side, volume, price=None, pair="SHIB/USD", trace=None):
+        """Execute a trade using Kraken's REST API; `trace` is finished when AddOrder answers."""
         payload = {
-            "nonce": int(time.time() * 1000),
             "ordertype": "limit" if price else "market",
             "type": side,
             "volume": str(volume),
@@ -123,11 +151,11 @@ class SHIBSnipingBot:
         if price:
             payload["price"] = str(price)
 
-        headers = self._generate_headers("/0/private/AddOrder", payload)
         try:
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
-            response_data = response.json()
-            if response.status_code == 200 and not response_data.get("error"):
+            response_data = self.client.private("/0/private/AddOrder", payload, self.signer)
+            if trace:
+                trace.finish()
+            if not response_data.get("error"):
                 logging.info(f"Trade executed: {response_data}")
                 print(f"Trade executed successfully: {response_data}")
             else:
@@ -137,53 +165,273 @@ class SHIBSnipingBot:
             logging.error(f"Error executing trade: {e}")
             print(f"Exception during trade execution: {e}")
 
-    def _generate_headers(self, endpoint, payload):
-        """Generate headers for Kraken API requests."""
-        post_data = json.dumps(payload)
-        message = (str(payload['nonce']) + post_data).encode()
-        sha256_hash = hashlib.sha256(message).digest()
-        mac = hmac.new(base64.b64decode(self.private_key), endpoint.encode() + sha256_hash, hashlib.sha512)
-        api_sign = base64.b64encode(mac.digest()).decode()
-
-        return {
-            'Content-Type': 'application/json',
-            'API-Key': self.api_key,
-            'API-Sign': api_sign
-        }
-
     def start_trading(self):
-        """Main trading loop."""
-        profit = 0.0
-        while profit < TARGET_PROFIT:
-            self.fetch_wallet_balance()
-            self.fetch_open_orders()
-            for asset, asset_balance in self.wallet_balance.items():
-                if asset == "SHIB" and asset_balance >= MIN_TRADE_VOLUME:
-                    pair = "SHIB/USD"
-                    current_price = self.fetch_price(pair)
-                    if current_price:
-                        max_volume = TRADE_AMOUNT_USD / current_price
-                        volume = min(asset_balance, max_volume)
-                        trade_profit = self.trade_decision(volume, current_price)
-                        if trade_profit:
-                            profit += trade_profit
-                            self.update_pnl(trade_profit)
+        """Main trading loop.
+
+        Balance and open orders are read from the local account, which is
+        reconciled over REST periodically and right after each order,
+        instead of being refetched on every iteration.
+        """
+        pair = "SHIB/USD"
+        while self.pnl < TARGET_PROFIT:
+            if self.account.reconcile_due():
+                self.reconcile()
+            asset_balance = self.account.balance.get("SHIB", 0.0)
+            resting = any(order.pair == pair and order.is_open for order in self.account.orders.values())
+            if asset_balance >= MIN_TRADE_VOLUME and not resting:
+                current_price = self.current_price(pair)
+                if current_price:
+                    max_volume = TRADE_AMOUNT_USD / current_price
+                    volume = min(asset_balance, max_volume)
+                    if self.trade_decision(volume, current_price):
+                        self.reconcile()
+            self.update_pnl(pair)
+            time.sleep(LOOP_INTERVAL)
 
     def trade_decision(self, volume, current_price):
         """Make trade decisions based on current price."""
-        print(f"Current price: {current_price}, Buy Threshold: {BUY_THRESHOLD}, Sell Threshold: {SELL_THRESHOLD}")
+        print(f"Current price: {current_price}, Buy Threshold: {self.buy_threshold}, "
+              f"Sell Threshold: {self.sell_threshold}")
         print(f"Available Volume: {volume} SHIB")
-        if current_price < BUY_THRESHOLD:
+        signal = price_signal(current_price, self.buy_threshold, self.sell_threshold)
+        trace, self.trace = self.trace, None
+        if trace:
+            trace.mark("decision")
+        if signal > 0:
             print("Placing buy order...")
-            self.execute_trade_rest("buy", volume, current_price)
+            self.execute_trade_rest("buy", volume, current_price, trace=trace)
             return -TRADE_AMOUNT_USD
-        elif current_price > SELL_THRESHOLD:
+        elif signal < 0:
             print("Placing sell order...")
-            self.execute_trade_rest("sell", volume, current_price)
+            self.execute_trade_rest("sell", volume, current_price, trace=trace)
             return TRADE_AMOUNT_USD
         return 0
 
+class MLModel:
+    """LSTM price predictor served from one warm-loaded checkpoint.
+
+    The checkpoint is loaded once, on CPU, and the network is kept in eval
+    mode; every forward pass runs under torch.inference_mode(). Both the
+    bare state_dicts and the {'epoch', 'model_state_dict', ...} checkpoints
+    in scripts/checkpoints are accepted, and the layer sizes are read from
+    the weights, so any of them can be chosen without code changes.
+
+    Windows are raw prices and predictions are the next price, whatever
+    the model was trained on: a checkpoint's 'feature'/'window'/
+    'return_scale' metadata (scripts.training.models.train) is applied
+    here, turning the last `window` + 1 prices into scaled returns and the
+    predicted scaled return back into a price. Checkpoints without that
+    metadata were trained on raw prices and see them unchanged.
+
+    predict() may be called from many threads (one per pair, or the web
+    server's request threads): concurrent calls are gathered for up to
+    `max_wait` seconds into a single batched forward pass. Results for
+    recently seen price windows are served from an LRU cache.
+    """
+
+    def __init__(self, checkpoint_path=MODEL_CHECKPOINT, max_batch=MAX_BATCH_SIZE,
+                 max_wait=MAX_BATCH_WAIT, cache_size=PREDICTION_CACHE_SIZE):
+        self.checkpoint_path = checkpoint_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.cache_size = cache_size
+        self.network, self.preprocessing = self.load(checkpoint_path)
+        self.input_size = self.network.lstm.input_size
+        self.feature = self.preprocessing.get('feature')
+        self.window = self.preprocessing.get('window')
+        self.return_scale = self.preprocessing.get('return_scale') or 1.0
+        if self.feature not in (None, 'return'):
+            raise ValueError(f"Checkpoint {checkpoint_path} uses unknown feature {self.feature!r}")
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pending = []
+        self._pending_ready = threading.Condition()
+        self.stats = {"requests": 0, "cache_hits": 0, "batches": 0, "batched_windows": 0}
+        self._batcher = threading.Thread(target=self._batch_loop, name="ml-batcher", daemon=True)
+        self._batcher.start()
+
+    @staticmethod
+    def load(checkpoint_path):
+        """Builds the network described by a checkpoint and loads its weights.
+
+        Returns (network, preprocessing), the latter the checkpoint's
+        feature/window/return_scale entries ({} for raw-price models).
+        """
+        import torch
+
+        from scripts.storage.model_registry import load_checkpoint, preprocessing_of, state_dict_of
+
+        if not os.path.getsize(checkpoint_path):
+            raise ValueError(f"Checkpoint {checkpoint_path} is empty")
+        checkpoint = load_checkpoint(checkpoint_path)
+        state_dict = state_dict_of(checkpoint)
+        num_layers = sum(1 for key in state_dict if key.startswith("lstm.weight_ih_l"))
+        network = build_network(
+            input_size=state_dict["lstm.weight_ih_l0"].shape[1],
+            hidden_size=state_dict["lstm.weight_hh_l0"].shape[1],
+            num_layers=num_layers,
+            output_size=state_dict["fc.weight"].shape[0],
+        )
+        network.load_state_dict(state_dict)
+        network.eval()
+        torch.set_num_threads(max(1, min(4, os.cpu_count() or 1)))
+        preprocessing = preprocessing_of(checkpoint) or {}
+        logging.info(f"Loaded model from {checkpoint_path} "
+                     f"(epoch {checkpoint.get('epoch', 'n/a')}, {num_layers} LSTM layers, "
+                     f"feature {preprocessing.get('feature') or 'price'}).")
+        return network, preprocessing
+
+    def _as_window(self, window):
+        """(network input, last price) for one window of raw prices; last is None for price models."""
+        window, last = np.asarray(window, dtype=np.float64), None
+        if self.feature == 'return':
+            if window.ndim != 1 or len(window) < (self.window or 1) + 1:
+                raise ValueError(f"Expected at least {(self.window or 1) + 1} prices, got {window.shape}")
+            if self.window:
+                window = window[-(self.window + 1):]
+            window, last = scaled_returns(window, self.return_scale), float(window[-1])
+        window = window.astype(np.float32)
+        if window.ndim == 1:
+            window = window.reshape(-1, 1)
+        if window.ndim != 2 or window.shape[1] != self.input_size:
+            raise ValueError(f"Expected a (timesteps, {self.input_size}) window, got {window.shape}")
+        return np.ascontiguousarray(window), last
+
+    def _as_price(self, prediction, last):
+        """Undoes the output scaling: a predicted scaled return becomes a price."""
+        if self.feature == 'return':
+            return last * (1.0 + np.asarray(prediction, dtype=np.float64) / self.return_scale)
+        return prediction
+
+    # ---- Prediction ----
+
+    def predict(self, window, timeout=None):
+        """Next-price prediction for one price window of shape (timesteps,) or (timesteps, features)."""
+        return self.submit(window).result(timeout)
+
+    def submit(self, window):
+        """Queues one window for the next batch and returns a Future for its prediction."""
+        window, last = self._as_window(window)
+        key = (window.shape, window.tobytes(), last)
+        future = Future()
+        with self._cache_lock:
+            self.stats["requests"] += 1
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                future.set_result(self._cache[key])
+                return future
+        with self._pending_ready:
+            self._pending.append((key, window, future, last))
+            self._pending_ready.notify()
+        return future
+
+    def predict_batch(self, windows):
+        """Runs equally long price windows through one forward pass, bypassing queue and cache."""
+        inputs, lasts = zip(*(self._as_window(w) for w in windows))
+        return np.array([self._as_price(prediction, last)
+                         for prediction, last in zip(self._forward(inputs), lasts)])
+
+    def _forward(self, inputs):
+        """Raw network outputs for equally long prepared inputs."""
+        import torch
+
+        batch = torch.from_numpy(np.stack(inputs))
+        with torch.inference_mode():
+            output = self.network(batch)
+        return output.numpy().squeeze(-1) if output.shape[-1] == 1 else output.numpy()
+
+    def _batch_loop(self):
+        while True:
+            with self._pending_ready:
+                while not self._pending:
+                    self._pending_ready.wait()
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._pending_ready.wait(remaining)
+                requests, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self._run_batch(requests)
+
+    def _run_batch(self, requests):
+        # Windows of different lengths cannot share a tensor
+        by_shape = {}
+        for request in requests:
+            by_shape.setdefault(request[1].shape, []).append(request)
+        for group in by_shape.values():
+            try:
+                predictions = self._forward([window for _, window, _, _ in group])
+            except Exception as e:
+                logging.error(f"Model inference failed for {len(group)} windows: {e}")
+                for _, _, future, _ in group:
+                    future.set_exception(e)
+                continue
+            self.stats["batches"] += 1
+            self.stats["batched_windows"] += len(group)
+            with self._cache_lock:
+                for (key, _, future, last), prediction in zip(group, predictions):
+                    prediction = self._as_price(prediction, last)
+                    prediction = prediction.item() if np.ndim(prediction) == 0 else prediction
+                    self._cache[key] = prediction
+                    self._cache.move_to_end(key)
+                    future.set_result(prediction)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+def scaled_returns(prices, scale):
+    """Simple returns between consecutive prices, times `scale`: the LSTM's input feature.
+
+    Training (scripts.training.models.train) and MLModel both use this, so
+    the model is served exactly the inputs it was trained on.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    return (prices[1:] / prices[:-1] - 1.0) * scale
+
+def build_network(input_size, hidden_size, num_layers, output_size):
+    """LSTM over the window followed by a linear head on the last timestep."""
+    from torch import nn
+
+    class LSTMPredictor(nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True)
+            self.fc = nn.Linear(hidden_size, output_size)
+
+        def forward(self, x):
+            output, _ = self.lstm(x)
+            return self.fc(output[:, -1, :])
+
+    return LSTMPredictor()
+
+_models = {}
+_models_lock = threading.Lock()
+
+def get_model(checkpoint_path=None):
+    """Returns the process-wide MLModel for a checkpoint, loading it on first use.
+
+    Without a path, the model registry's best checkpoint is used, falling
+    back to MODEL_CHECKPOINT when there is no manifest yet.
+    """
+    if checkpoint_path is None:
+        from scripts.storage.model_registry import ModelRegistry
+
+        best = ModelRegistry().best()
+        checkpoint_path = best["path"] if best else MODEL_CHECKPOINT
+    with _models_lock:
+        model = _models.get(checkpoint_path)
+        if model is None:
+            model = _models[checkpoint_path] = MLModel(checkpoint_path)
+        return model
+
 if __name__ == "__main__":
+    configure_logging(
+        "shib_sniping_bot.log",
+        fmt="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
     print("Welcome to the SHIB Sniping Bot!")
     print("Please enter your Kraken API credentials to proceed.")
 
@@ -194,7 +442,15 @@ if __name__ == "__main__":
         print("API Key and Secret are required to proceed. Exiting.")
         exit(1)
 
-    bot = SHIBSnipingBot(API_KEY, PRIVATE_KEY)
+    serve_metrics()
+    market_data = MarketDataFeed(["SHIB/USD"])
+    market_data.start_in_thread()
+    # Thresholds tuned by scripts.backtesting.sweep --write-best, if any
+    from scripts.backtesting.engine import load_thresholds
+
+    buy_threshold, sell_threshold = load_thresholds("SHIB/USD")
+    bot = SHIBSnipingBot(API_KEY, PRIVATE_KEY, market_data=market_data,
+                         buy_threshold=buy_threshold, sell_threshold=sell_threshold)
 
     print("Starting SHIB trading bot...")
     bot.start_trading()